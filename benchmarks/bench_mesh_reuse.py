@@ -0,0 +1,74 @@
+"""Benchmarks updating a load in the CalculiX input deck against writing the deck again.
+
+Uses a synthetic deck shaped like the ones written by FreeCAD (nodes, tetra
+elements, one ConstraintForce), so the measured time is only the deck I/O. In a
+real run, writing the deck again also means recomputing and remeshing the
+model, which the in-place update skips as well.
+
+    python benchmarks/bench_mesh_reuse.py --nodes 200000 --loaded-nodes 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from FreecadParametricFEA.inp_deck import InputDeck
+
+SEPARATOR = "*" * 59 + "\n"
+
+
+def write_deck(filename, n_nodes, n_loaded_nodes, force):
+    with open(filename, "w", encoding="utf8") as f:
+        f.write("** written by the mesh reuse benchmark\n*NODE, NSET=Nall\n")
+        for i in range(1, n_nodes + 1):
+            f.write(f"{i}, {i * 0.001:.13E}, {i * 0.002:.13E}, {i * 0.003:.13E}\n")
+        f.write("*ELEMENT, TYPE=C3D10, ELSET=Eall\n")
+        for i in range(1, n_nodes - 9, 10):
+            f.write(", ".join(str(i + j) for j in range(11)) + "\n")
+        f.write(SEPARATOR + "** Node sets for loads\n** ConstraintForce\n")
+        f.write("*NSET,NSET=ConstraintForce\n")
+        f.write("".join(f"{i},\n" for i in range(1, n_loaded_nodes + 1)))
+        f.write(SEPARATOR + "** Node loads Constraints\n*CLOAD\n** ConstraintForce\n")
+        nodal_force = force / n_loaded_nodes
+        for i in range(1, n_loaded_nodes + 1):
+            f.write(f"{i},1,{nodal_force:.13E}\n")
+        f.write(SEPARATOR + "*END STEP\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=200000)
+    parser.add_argument("--loaded-nodes", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "FEMMeshGmsh.inp")
+
+        start_time = time.perf_counter()
+        for i in range(args.repeats):
+            write_deck(filename, args.nodes, args.loaded_nodes, 1000.0 + i)
+        rewrite_time = (time.perf_counter() - start_time) / args.repeats
+
+        start_time = time.perf_counter()
+        for i in range(args.repeats):
+            deck = InputDeck(filename)
+            assert deck.scale_section("ConstraintForce", 1.5), "no load found"
+            deck.save()
+        update_time = (time.perf_counter() - start_time) / args.repeats
+
+        # the scaled deck must hold the same loads as a deck written from scratch
+        scaled_lines = InputDeck(filename).lines
+        write_deck(filename, args.nodes, args.loaded_nodes, (1000.0 + args.repeats - 1) * 1.5 ** args.repeats)
+        for (scaled, written) in zip(scaled_lines, InputDeck(filename).lines):
+            if scaled != written:
+                assert abs(float(scaled.split(",")[2]) / float(written.split(",")[2]) - 1) < 1e-9
+
+    print(f"{'method':>10} {'time [ms]':>10}")
+    print(f"{'rewrite':>10} {rewrite_time * 1000:>10.1f}")
+    print(f"{'update':>10} {update_time * 1000:>10.1f}")
+    print(f"speedup: {rewrite_time / update_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmarks the orchestration of a parametric sweep, without FreeCAD.
+
+Runs run_parametric() on the stub solver backend, and measures:
+  - the overhead per test case, i.e. the wall time not spent in the solver
+  - the throughput with several worker processes
+  - the effectiveness of the result cache when a sweep is run again
+
+    python benchmarks/bench_orchestration.py --cases 64 --latency 0.05
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from FreecadParametricFEA.parametric import parametric
+from FreecadParametricFEA.result_cache import ResultCache
+from FreecadParametricFEA.solver_backend import StubBackend
+
+
+def make_sweep(backend, n_cases, result_cache=None):
+    fea = parametric()
+    fea.set_model(backend)
+    fea.set_variables(
+        [
+            {
+                "object_name": "Pad",
+                "constraint_name": "Length",
+                "constraint_values": np.linspace(10, 30, n_cases),
+            }
+        ]
+    )
+    fea.set_result_cache(result_cache)
+    return fea
+
+
+def time_sweep(fea, n_workers=1):
+    start_time = time.perf_counter()
+    results = fea.run_parametric(quiet_mode=True, n_workers=n_workers)
+    return time.perf_counter() - start_time, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub solve time [s]")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        model_file = os.path.join(folder, "stub.FCStd")
+        with open(model_file, "wb") as f:
+            f.write(b"stub model")  # hashed by the result cache
+
+        # overhead: everything but the (zero) solve time
+        elapsed, _ = time_sweep(make_sweep(StubBackend(filename=model_file), args.cases))
+        print(f"overhead per case: {elapsed / args.cases * 1e3:.2f} ms")
+
+        print(f"\n{'workers':>8} {'time [s]':>10} {'cases/s':>8} {'efficiency':>10}")
+        for n_workers in args.workers:
+            backend = StubBackend(latency=args.latency, filename=model_file)
+            elapsed, results = time_sweep(make_sweep(backend, args.cases), n_workers)
+            assert results["Msg"].eq("").all(), "stub solves failed"
+            ideal_time = args.cases * args.latency / n_workers
+            print(
+                f"{n_workers:>8} {elapsed:>10.2f} {args.cases / elapsed:>8.1f} "
+                f"{ideal_time / elapsed:>10.0%}"
+            )
+
+        cache = ResultCache(os.path.join(folder, "cache.db"))
+        print(f"\n{'run':>8} {'time [s]':>10} {'hit rate':>8}")
+        for run in ("cold", "warm"):
+            backend = StubBackend(latency=args.latency, filename=model_file)
+            elapsed, _ = time_sweep(make_sweep(backend, args.cases, cache))
+            hit_rate = 1 - backend.n_solves / args.cases
+            print(f"{run:>8} {elapsed:>10.2f} {hit_rate:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmarks the parallel evaluation of a GA generation on the evaluator pool.
+
+Uses the stub solver backend in place of FreeCAD/CalculiX: each solve just
+sleeps for a fixed time, so the measured speedup is the one the pool can
+deliver when the solver dominates the runtime.
+
+    python benchmarks/bench_parallel_ga.py --population 32 --latency 0.25
+"""
+import argparse
+import time
+
+from FreecadParametricFEA.output import Output
+from FreecadParametricFEA.solver_backend import StubBackend
+from FreecadParametricFEA.variable import Variable
+from FreecadParametricFEA.worker_pool import EvaluatorPool, ModelEvaluator
+
+
+def time_generation(n_workers, population, latency):
+    variables = [Variable("Pad", "Length", []), Variable("Pocket", "Depth", [])]
+    with EvaluatorPool(
+        "", StubBackend(latency=latency), variables, [Output("vonMises", max)], n_workers=n_workers
+    ) as pool:
+        # same call the GA makes through toolbox.map, minus the FreeCAD import
+        start_time = time.perf_counter()
+        results = pool.map(ModelEvaluator.evaluate, population)
+        elapsed = time.perf_counter() - start_time
+    return elapsed, [case_results["max(vonMises)"] for case_results in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--population", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.25, help="stub solve time [s]")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    population = [[float(i), float(i % 7)] for i in range(args.population)]
+
+    print(f"{'workers':>8} {'time [s]':>10} {'speedup':>8} {'efficiency':>10}")
+    serial_time = None
+    serial_fitnesses = None
+    for n_workers in args.workers:
+        elapsed, fitnesses = time_generation(n_workers, population, args.latency)
+        if serial_time is None:
+            # the first run is the reference, assumed to scale perfectly
+            serial_time = elapsed * n_workers
+            serial_fitnesses = fitnesses
+        # results must come back in population order, whatever the worker count
+        assert fitnesses == serial_fitnesses, "evaluation order changed"
+        speedup = serial_time / elapsed
+        print(f"{n_workers:>8} {elapsed:>10.2f} {speedup:>8.2f} {speedup / n_workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmarks the reduction of result fields to the outputs of a test case.
+
+Compares calling the user's reduction functions on the raw result lists (as
+FreeCAD returns them) with reduce_outputs(), which converts each field to a
+NumPy array once and computes the common reductions with NumPy.
+
+    python benchmarks/bench_reductions.py --nodes 500000
+"""
+import argparse
+import functools
+import time
+
+import numpy as np
+
+from FreecadParametricFEA.reductions import ResultFields, reduce_outputs
+
+
+class StubResults:
+    def __init__(self, values):
+        self.values = values
+
+    def getPropertyByName(self, name):
+        return self.values[name]
+
+
+OUTPUTS = [
+    {"output_var": "vonMises", "reduction_fun": max},
+    {"output_var": "vonMises", "reduction_fun": min},
+    {"output_var": "vonMises", "reduction_fun": functools.partial(np.percentile, q=95)},
+    {"output_var": "vonMises", "reduction_fun": functools.partial(np.percentile, q=99)},
+    {"output_var": "DisplacementLengths", "reduction_fun": max},
+    {"output_var": "DisplacementLengths", "reduction_fun": np.linalg.norm},
+]
+
+
+def reduce_lists(results, outputs):
+    return [
+        output["reduction_fun"](results.getPropertyByName(output["output_var"]))
+        for output in outputs
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=500000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = StubResults(
+        {
+            "vonMises": rng.random(args.nodes).tolist(),
+            "DisplacementLengths": rng.random(args.nodes).tolist(),
+        }
+    )
+
+    start_time = time.perf_counter()
+    for _ in range(args.repeats):
+        expected = reduce_lists(results, OUTPUTS)
+    list_time = (time.perf_counter() - start_time) / args.repeats
+
+    start_time = time.perf_counter()
+    for _ in range(args.repeats):
+        values = reduce_outputs(ResultFields(results), OUTPUTS)
+    numpy_time = (time.perf_counter() - start_time) / args.repeats
+
+    assert np.allclose(values, expected), "reductions differ"
+
+    print(f"{'method':>10} {'time [ms]':>10}")
+    print(f"{'lists':>10} {list_time * 1000:>10.1f}")
+    print(f"{'numpy':>10} {numpy_time * 1000:>10.1f}")
+    print(f"speedup: {list_time / numpy_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
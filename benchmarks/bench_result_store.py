@@ -0,0 +1,88 @@
+"""Benchmarks filling in the results of a sweep and of a GA run.
+
+Compares per-cell DataFrame.loc writes and per-generation pd.concat with the
+preallocated ResultStore, for the same number of cases and output columns.
+
+    python benchmarks/bench_result_store.py --cases 20000 --generations 200
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from FreecadParametricFEA.result_store import ResultStore
+
+COLUMNS = ["max(vonMises)", "max(DisplacementLengths)", "Msg", "FEA_Runtime"]
+
+
+def case_results(idx):
+    return {"max(vonMises)": idx * 0.5, "max(DisplacementLengths)": idx * 1e-3, "Msg": "", "FEA_Runtime": 1.0}
+
+
+def fill_dataframe(test_matrix):
+    df = test_matrix.copy()
+    for idx in range(len(df)):
+        for (column, value) in case_results(idx).items():
+            df.loc[idx, column] = value
+    return df
+
+
+def fill_store(test_matrix):
+    store = ResultStore.from_dataframe(test_matrix)
+    for idx in range(len(store)):
+        store.set_row(idx, case_results(idx))
+    return store.to_dataframe()
+
+
+def append_dataframe(generations, population):
+    all_results = pd.DataFrame()
+    for gen in range(generations):
+        rows = [{"L [mm]": float(i), "vonMises [MPa]": i * 0.5, "generation": f"gen {gen}"} for i in range(population)]
+        all_results = pd.concat([all_results, pd.DataFrame(rows)], ignore_index=True)
+    return all_results
+
+
+def append_store(generations, population):
+    all_results = ResultStore()
+    for gen in range(generations):
+        all_results.extend(
+            {"L [mm]": float(i), "vonMises [MPa]": i * 0.5, "generation": f"gen {gen}"} for i in range(population)
+        )
+    return all_results.to_dataframe()
+
+
+def timed(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start_time, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", type=int, default=20000)
+    parser.add_argument("--generations", type=int, default=200)
+    parser.add_argument("--population", type=int, default=50)
+    args = parser.parse_args()
+
+    test_matrix = pd.DataFrame({"Pad.Length": np.arange(args.cases, dtype=float)})
+    for column in COLUMNS:
+        test_matrix[column] = "" if column == "Msg" else 0.0
+
+    loc_time, expected = timed(fill_dataframe, test_matrix)
+    store_time, filled = timed(fill_store, test_matrix)
+    pd.testing.assert_frame_equal(filled, expected)
+
+    concat_time, expected = timed(append_dataframe, args.generations, args.population)
+    extend_time, appended = timed(append_store, args.generations, args.population)
+    pd.testing.assert_frame_equal(appended, expected)
+
+    print(f"{'pattern':>22} {'time [s]':>10}")
+    print(f"{'sweep: DataFrame.loc':>22} {loc_time:>10.3f}")
+    print(f"{'sweep: ResultStore':>22} {store_time:>10.3f}")
+    print(f"{'GA: pd.concat':>22} {concat_time:>10.3f}")
+    print(f"{'GA: ResultStore':>22} {extend_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""Benchmarks the end-to-end throughput of sweeps and GA runs, without FreeCAD.
+
+Runs parametric.run_parametric(), RunAllAnalysis.run() and
+GeneticAlgorithm.run() on the stub solver backend at several problem sizes,
+each in a fresh process, and measures:
+  - cases_per_s: test cases (or GA individuals) completed per second
+  - overhead_ms: wall time per case not spent in the stub solver
+  - first_result_s: time until the first result was written to disk
+  - peak_rss_mb: peak resident memory of the run's processes
+
+Results are written as JSON with --output. With --baseline, they are compared
+with the run stored for this machine (its host name and CPU count), and the
+script exits with 1 if any metric regressed by more than --tolerance. A
+machine without a stored run is not checked. Store a run in the baseline
+file with --save-baseline, on each benchmark machine.
+
+    python benchmarks/bench_suite.py --sizes 16 64 256 --baseline benchmarks/baseline.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+SCENARIOS = ("sweep", "run_all", "ga")
+
+# (metric, True if higher is better, absolute change always ignored as noise)
+METRICS = (
+    ("cases_per_s", True, 0.0),
+    ("overhead_ms", False, 2.0),
+    ("first_result_s", False, 0.05),
+    ("peak_rss_mb", False, 10.0),
+)
+
+GA_POPULATION = 8
+
+
+def install_standin_freecad(size):
+    """registers a FreeCAD module with just what RunAllAnalysis and
+    GeneticAlgorithm read from the document: a spreadsheet with one variable
+    of `size` steps. The solves themselves run on the StubBackend
+    """
+    cells = {"A2": "Pad", "B2": "Length", "C2": "10", "D2": "30", "E2": size, "F2": "mm", "G2": 2}
+    spreadsheet = types.SimpleNamespace(Label="Spreadsheet", get=cells.__getitem__)
+    document = types.SimpleNamespace(Objects=[spreadsheet], saveAs=lambda filename: None)
+    sys.modules["FreeCAD"] = types.SimpleNamespace(openDocument=lambda filename: document)
+
+
+def time_first_result():
+    """records when the first result is appended to a results log
+
+    Returns:
+        list: filled with the perf_counter() time of the first append
+    """
+    from FreecadParametricFEA.result_log import ResultLog
+
+    first_append = []
+    append = ResultLog.append
+
+    def timed_append(self, record):
+        if not first_append:
+            first_append.append(time.perf_counter())
+        return append(self, record)
+
+    ResultLog.append = timed_append
+    return first_append
+
+
+def run_scenario(scenario, size, latency, n_workers):
+    """runs one benchmark, in the current process
+
+    Returns:
+        dict: the metrics of the run
+    """
+    install_standin_freecad(size)
+    import numpy as np
+
+    from FreecadParametricFEA.parametric import parametric
+    from FreecadParametricFEA.solver_backend import StubBackend
+
+    first_append = time_first_result()
+    folder = tempfile.mkdtemp(prefix="bench_")
+    model_file = os.path.join(folder, "stub.FCStd")
+    backend = StubBackend(latency=latency, filename=model_file)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start_time = time.perf_counter()
+        if scenario == "sweep":
+            fea = parametric()
+            fea.set_model(backend)
+            fea.set_variables([{"object_name": "Pad", "constraint_name": "Length",
+                                "constraint_values": np.linspace(10, 30, size)}])
+            fea.run_parametric(quiet_mode=True, n_workers=n_workers,
+                               results_file=os.path.join(folder, "results.jsonl"))
+            n_cases = size
+        elif scenario == "run_all":
+            from FreecadParametricFEA.run_all import RunAllAnalysis
+
+            RunAllAnalysis("", model_file, n_workers=n_workers, backend=backend).run()
+            n_cases = size
+        else:
+            from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+            generations = max(1, size // GA_POPULATION)
+            GeneticAlgorithm("", model_file, population_size=GA_POPULATION, generations=generations,
+                             n_workers=n_workers, checkpoint_every=0, backend=backend).run()
+            n_cases = GA_POPULATION * generations
+        elapsed = time.perf_counter() - start_time
+    shutil.rmtree(folder, ignore_errors=True)
+
+    solver_time = n_cases * latency / n_workers
+    return {
+        "scenario": scenario,
+        "size": size,
+        "n_cases": n_cases,
+        "n_workers": n_workers,
+        "latency": latency,
+        "wall_time_s": elapsed,
+        "cases_per_s": n_cases / elapsed,
+        "overhead_ms": max(elapsed - solver_time, 0.0) / n_cases * 1e3,
+        "first_result_s": first_append[0] - start_time if first_append else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # kilobytes on Linux, bytes on macOS
+    return usage / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def machine_key():
+    """
+    Returns:
+        str: the machine a baseline was stored on, since the metrics of
+            different machines can't be compared
+    """
+    return f"{platform.node()} ({os.cpu_count()} CPUs)"
+
+
+def read_baselines(filename):
+    """
+    Returns:
+        dict: machine keys mapped to their stored results, empty if there is
+            no baseline file
+    """
+    if not os.path.isfile(filename):
+        return {}
+    with open(filename, encoding="utf8") as f:
+        return json.load(f)["machines"]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns:
+        list of str: the metrics that regressed against the baseline
+    """
+    reference = {(run["scenario"], run["size"], run["n_workers"]): run for run in baseline["runs"]}
+    regressions = []
+    for run in results["runs"]:
+        previous = reference.get((run["scenario"], run["size"], run["n_workers"]))
+        if previous is None:
+            continue
+        for (metric, higher_is_better, noise) in METRICS:
+            (new, old) = (run[metric], previous[metric])
+            if new is None or old is None or abs(new - old) <= noise:
+                continue
+            change = (new - old) / old if old else 0.0
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(
+                    f"{run['scenario']} size {run['size']}: {metric} {old:.3g} -> {new:.3g} ({change:+.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--latency", type=float, default=0.005, help="stub solve time [s]")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", default="", help="JSON file for the results")
+    parser.add_argument("--baseline", default="", help="JSON results to compare against")
+    parser.add_argument("--save-baseline", default="", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="relative change flagged as a regression")
+    parser.add_argument("--child", nargs=2, metavar=("SCENARIO", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # a single run, in its own process so peak memory isn't shared
+        print(json.dumps(run_scenario(args.child[0], int(args.child[1]), args.latency, args.workers)))
+        return 0
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "runs": [],
+    }
+    print(f"{'scenario':>8} {'size':>6} {'cases/s':>9} {'overhead [ms]':>14} {'first [s]':>10} {'RSS [MB]':>9}")
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            command = [sys.executable, os.path.abspath(__file__), "--child", scenario, str(size),
+                       "--latency", str(args.latency), "--workers", str(args.workers)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            results["runs"].append(run)
+            first = "-" if run["first_result_s"] is None else f"{run['first_result_s']:.3f}"
+            rss = "-" if run["peak_rss_mb"] is None else f"{run['peak_rss_mb']:.0f}"
+            print(f"{scenario:>8} {size:>6} {run['cases_per_s']:>9.1f} {run['overhead_ms']:>14.2f} {first:>10} {rss:>9}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.save_baseline:
+        # the runs of the other machines are kept
+        baselines = read_baselines(args.save_baseline)
+        baselines[machine_key()] = results
+        with open(args.save_baseline, "w", encoding="utf8") as f:
+            json.dump({"machines": baselines}, f, indent=2, sort_keys=True)
+        print(f"Baseline of {machine_key()} saved to {args.save_baseline}")
+
+    if args.baseline:
+        baseline = read_baselines(args.baseline).get(machine_key())
+        if baseline is None:
+            print(f"No baseline for {machine_key()} in {args.baseline}, regression check skipped. "
+                  "Store one with --save-baseline (make bench-baseline)")
+            return 0
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regression against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,10 @@
 from .parametric import parametric, FreecadModel
+from .solver_backend import RetryPolicy, SolverBackend, StubBackend
+
+__all__ = [
+    "parametric",
+    "FreecadModel",
+    "RetryPolicy",
+    "SolverBackend",
+    "StubBackend",
+]
@@ -0,0 +1,186 @@
+import os
+from os import path
+import numpy as np
+from tqdm import tqdm
+from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+from FreecadParametricFEA.result_cache import ResultCache
+from FreecadParametricFEA.result_log import ResultLog
+from FreecadParametricFEA.result_store import ResultStore
+from FreecadParametricFEA.sampling import sample_unit_cube
+from FreecadParametricFEA.surrogate import propose_batch
+from FreecadParametricFEA.worker_pool import EvaluatorPool
+from FreecadParametricFEA.variable import Variable
+from FreecadParametricFEA.output import Output
+# The genetic_algorithm import adds the FreeCAD Python libraries to sys.path
+import FreeCAD
+
+
+class BayesianOptimisation(GeneticAlgorithm):
+    """Sample-efficient alternative to the GA: a Gaussian process fitted on
+    every solve so far proposes the next designs by expected improvement. Uses
+    the same spreadsheet variables, results CSV format and best model saving
+    as the GA."""
+    model_suffix = "BO"  # Appended to the name of the best model saved
+
+    def __init__(self, freecad_path, model_file, n_evaluations=50,
+                 n_initial=10, batch_size=None, n_workers=1, cache_file=None,
+                 solver_timeout=None, resume=False, seed=None, backend=None,
+                 **ga_options):
+        # The GA's evolution options (steady_state, snap_to_steps,
+        # multi_objective, job_queue...) don't apply here
+        unsupported = sorted(name for name, value in ga_options.items()
+                             if value)
+        if unsupported:
+            raise ValueError(f"BayesianOptimisation doesn't support "
+                             f"{', '.join(unsupported)}")
+        super().__init__(freecad_path, model_file, n_workers=n_workers,
+                         cache_file=cache_file, solver_timeout=solver_timeout,
+                         resume=resume, backend=backend, **ga_options)
+        self.n_evaluations = n_evaluations  # Total number of FEA solves
+        # Solves of the initial Latin hypercube design
+        self.n_initial = n_initial
+        # Designs proposed at a time, one per worker by default
+        self.batch_size = batch_size or n_workers
+        # Seed of the initial design and of the candidate points
+        self.seed = seed
+
+    def run(self):
+        doc = FreeCAD.openDocument(self.model_file)
+        spreadsheet = None
+        for obj in doc.Objects:
+            if obj.Label == "Spreadsheet":
+                spreadsheet = obj
+                break
+
+        variables = []
+        min_values = []
+        max_values = []
+        constraint_names_with_units = []
+
+        for row in range(2, spreadsheet.get('G2') + 1):
+            (object_name, original_constraint_name, constraint_name_with_unit,
+             min_value, max_value, _) = self.get_spreadsheet_data(
+                spreadsheet, row)
+            variable = Variable(object_name, original_constraint_name,
+                                [min_value, max_value])
+            variables.append(variable)
+            min_values.append(min_value)
+            max_values.append(max_value)
+            constraint_names_with_units.append(constraint_name_with_unit)
+        bounds = (np.array(min_values), np.array(max_values))
+
+        # Start the evaluator workers, each opening the model only once
+        output1 = Output("vonMises", max)
+        result_cache = (ResultCache(self.cache_file) if self.cache_file
+                        else None)
+        self.evaluator_pool = EvaluatorPool(
+            self.freecad_path, self.backend or self.model_file, variables,
+            [output1], n_workers=self.n_workers, result_cache=result_cache,
+            solver_timeout=self.solver_timeout)
+
+        # Store to collect results; each batch is also streamed to disk as
+        # soon as it is solved
+        all_results = ResultStore(capacity=self.n_evaluations)
+        results_folder = path.join(path.dirname(self.model_file), "results")
+        result_log = ResultLog(path.join(results_folder, "bo_results.jsonl"))
+
+        try:
+            # Without a seed, one is drawn and logged, so a resumed run
+            # carries on with the same design
+            seed = (self.seed if self.seed is not None
+                    else int(np.random.SeedSequence().entropy % 2**32))
+            rng = np.random.default_rng(seed)
+            batch_number = 0
+            for record in result_log.open(resume=self.resume):
+                all_results.extend(record["rows"])
+                batch_number = record["batch"]
+                if "rng_state" in record:
+                    seed = record["seed"]
+                    # Continue the candidate draws where they stopped
+                    rng.bit_generator.state = record["rng_state"]
+
+            unit_design = sample_unit_cube("lhs", self.n_initial,
+                                           len(min_values), seed)
+            initial_design = bounds[0] + unit_design * (bounds[1] - bounds[0])
+
+            with tqdm(total=self.n_evaluations, initial=len(all_results),
+                      desc="Bayesian Optimisation Progress",
+                      ncols=100) as pbar:
+                while len(all_results) < self.n_evaluations:
+                    n_solved = len(all_results)
+                    batch_size = min(self.batch_size,
+                                     self.n_evaluations - n_solved)
+                    if n_solved < self.n_initial:
+                        # Space-filling initial design, before the surrogate
+                        # has anything to learn from
+                        batch = initial_design[n_solved:n_solved + batch_size]
+                    else:
+                        X = np.column_stack(
+                            [all_results.column(name)
+                             for name in constraint_names_with_units])
+                        batch = propose_batch(
+                            X, all_results.column('vonMises [MPa]'), bounds,
+                            batch_size, rng)
+
+                    fitnesses = self.evaluator_pool.map(
+                        self.genetic_algorithm_fitness,
+                        [list(point) for point in batch])
+
+                    batch_number += 1
+                    batch_results = []
+                    for point, fitness in zip(batch, fitnesses):
+                        point_data = dict(zip(constraint_names_with_units,
+                                              map(float, point)))
+                        point_data['vonMises [MPa]'] = fitness[0]
+                        point_data['generation'] = f'batch {batch_number}'
+                        batch_results.append(point_data)
+                    all_results.extend(batch_results)
+                    result_log.append({"batch": batch_number,
+                                       "rows": batch_results, "seed": seed,
+                                       "rng_state": rng.bit_generator.state})
+                    pbar.update(len(batch_results))
+
+            result_log.close()
+            if result_cache is not None:
+                print(f"Result cache: {result_cache.stats()}")
+            all_results = all_results.to_dataframe()
+
+            # Move 'vonMises [MPa]' column to the last position, as in the GA
+            # results
+            cols = [col for col in all_results.columns
+                    if col != 'vonMises [MPa]'] + ['vonMises [MPa]']
+            all_results = all_results[cols]
+
+            # Create a folder for results if it doesn't exist
+            if not os.path.exists(results_folder):
+                os.makedirs(results_folder)
+
+            # Save results to CSV
+            all_results.to_csv(path.join(results_folder, "bo_results.csv"),
+                               index=False)
+
+            print(f"Results saved to "
+                  f"{path.join(results_folder, 'bo_results.csv')}")
+
+            # Find the row with the minimum von Mises stress, among the
+            # successful solves
+            solved = all_results[np.isfinite(all_results['vonMises [MPa]'])]
+            if solved.empty:
+                print("Every solve failed, no best model to save.")
+                return
+            best_row = solved.loc[solved['vonMises [MPa]'].idxmin()]
+
+            # Extract the best values from the row
+            # Exclude von Mises and generation columns from the best values
+            best_values = best_row[:-2].values
+
+            # Save the best model with a dynamic filename
+            self.save_best_model(doc, best_values, constraint_names_with_units)
+
+            print("Bayesian optimisation completed, results saved, and best "
+                  "model saved.")
+        finally:
+            # Release the workers even if the run fails, after the best model
+            # is saved
+            result_log.close()
+            self.evaluator_pool.close()
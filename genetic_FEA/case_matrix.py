@@ -0,0 +1,126 @@
+"""Provides the test matrix of a sweep without materialising it. The parameter
+    values of a grid test case are decoded from its number, like the digits of
+    a mixed-radix number, so the matrix takes constant memory whatever its
+    size, and any case can be looked up directly (e.g. by a shard or on
+    resume).
+"""
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from .sampling import sample_variables
+
+
+class CaseMatrix:
+    """Sequence of the parameter values of each test case"""
+
+    def __init__(
+        self,
+        variables: list,
+        sampling: str = "grid",
+        n_samples: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            variables (list of dict): variables as defined in
+                parametric.set_variables()
+            ?sampling (str): "grid" (default) for every combination of the
+                variables' constraint_values, or a space-filling design, see
+                sampling.sample_unit_cube()
+            ?n_samples (int): number of test cases of a sampled design
+            ?seed (int): seed of a sampled design. Defaults to None
+
+        Raises:
+            ValueError: if a sampled design is asked for without n_samples
+        """
+        self.sampling = sampling
+        self._samples = None
+
+        if sampling == "grid":
+            self._levels = [
+                np.asarray(v["constraint_values"]) for v in variables
+            ]
+            # same case order as np.meshgrid(...).ravel(): the last axis
+            # varies fastest, and meshgrid swaps the first two
+            axes = list(range(len(variables)))
+            if len(axes) >= 2:
+                axes[0], axes[1] = axes[1], axes[0]
+            self._strides = [0] * len(variables)
+            stride = 1
+            for axis in reversed(axes):
+                self._strides[axis] = stride
+                stride *= len(self._levels[axis])
+            self._n_cases = stride if variables else 0
+        else:
+            if n_samples < 1:
+                raise ValueError(f"{sampling} sampling needs n_samples")
+            self._samples = sample_variables(
+                variables, sampling, n_samples, seed
+            )
+            self._n_cases = n_samples
+
+    def __len__(self) -> int:
+        return self._n_cases
+
+    def __getitem__(self, idx: int) -> list:
+        """
+        Args:
+            idx (int): test case number
+
+        Returns:
+            list: the value of each variable in the test case
+        """
+        if idx < 0:
+            idx += self._n_cases
+        if not 0 <= idx < self._n_cases:
+            raise IndexError(
+                f"Test case {idx} out of range for {self._n_cases} cases"
+            )
+        if self._samples is not None:
+            return self._samples[idx].tolist()
+        return [
+            levels[(idx // stride) % len(levels)].item()
+            for (levels, stride) in zip(self._levels, self._strides)
+        ]
+
+    def __iter__(self) -> Iterator:
+        return (self[idx] for idx in range(self._n_cases))
+
+    def cases(self, indices: Optional[Iterable] = None) -> Iterator:
+        """iterates over some of the test cases
+
+        Args:
+            ?indices (iterable of int): test case numbers. Defaults to all
+
+        Yields:
+            tuple: (test case number, list of parameter values)
+        """
+        if indices is None:
+            indices = range(self._n_cases)
+        return ((idx, self[idx]) for idx in indices)
+
+    def column(self, variable_idx: int) -> np.ndarray:
+        """materialises the values of one variable over all the test cases
+
+        Args:
+            variable_idx (int): position of the variable
+
+        Returns:
+            np.ndarray: one value per test case
+        """
+        if self._samples is not None:
+            return self._samples[:, variable_idx].copy()
+        levels = self._levels[variable_idx]
+        case_numbers = np.arange(self._n_cases)
+        digits = case_numbers // self._strides[variable_idx]
+        return levels[digits % len(levels)]
+
+    def dtype(self, variable_idx: int) -> np.dtype:
+        """
+        Returns:
+            np.dtype: type of the values of a variable
+        """
+        if self._samples is not None:
+            return self._samples.dtype
+        return self._levels[variable_idx].dtype
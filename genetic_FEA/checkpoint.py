@@ -0,0 +1,59 @@
+"""Provides atomic checkpoint files for long optimisation runs. A checkpoint is
+    written to a temporary file and moved over the previous one, so an
+    interruption while saving leaves the last complete checkpoint in place.
+"""
+import os
+import pickle
+import random
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+
+def save_checkpoint(filename: str, state: dict):
+    """saves the state of a run, together with the `random` and NumPy
+    global RNG states
+
+    Args:
+        filename (str): path to the checkpoint file
+        state (dict): picklable run state (population, generation...)
+    """
+    folder = os.path.dirname(filename)
+    if folder != "":
+        os.makedirs(folder, exist_ok=True)
+
+    checkpoint = dict(
+        state,
+        random_state=random.getstate(),
+        numpy_random_state=np.random.get_state(),
+    )
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as f:
+        pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)
+    logger.debug(f"Checkpoint saved to {filename}")
+
+
+def load_checkpoint(filename: str) -> Optional[dict]:
+    """loads a checkpoint and restores the `random` and NumPy global RNG
+    states it was saved with
+
+    Args:
+        filename (str): path to the checkpoint file
+
+    Returns:
+        dict or None: the run state passed to save_checkpoint(), None if
+            there is no checkpoint
+    """
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "rb") as f:
+        checkpoint = pickle.load(f)
+    random.setstate(checkpoint.pop("random_state"))
+    np.random.set_state(checkpoint.pop("numpy_random_state"))
+    logger.info(f"Checkpoint loaded from {filename}")
+    return checkpoint
@@ -1,12 +1,89 @@
 import os
 import contextlib
+import multiprocessing
+import subprocess
+import time
 from .loghandler import logger
 from .register_freecad import register_freecad
-from typing import Tuple
-import numpy as np
-
-class FreecadModel:
-    """FreecadModel class"""
+from .inp_deck import InputDeck
+from .reductions import ResultFields
+from .solver_backend import (
+    FILE_LOCK,
+    MESH_FAILURE,
+    MISSING_RESULTS,
+    PROCESS_CRASH,
+    SOLVER_DIVERGENCE,
+    SOLVER_ERROR,
+    ZERO_FIELD,
+    SolverBackend,
+    SolverFailure,
+    SolverTimeoutError,
+)
+from typing import Optional, Tuple
+
+
+# CalculiX messages (lower case) and the failure cause they point to, in order
+# of precedence
+CCX_FAILURE_MESSAGES = (
+    ("nonpositive jacobian", MESH_FAILURE),
+    ("too many cutbacks", SOLVER_DIVERGENCE),
+    ("increment size smaller than minimum", SOLVER_DIVERGENCE),
+    ("did not converge", SOLVER_DIVERGENCE),
+    ("divergence", SOLVER_DIVERGENCE),
+    ("permission denied", FILE_LOCK),
+    ("being used by another process", FILE_LOCK),
+    ("resource temporarily unavailable", FILE_LOCK),
+    ("*error", SOLVER_ERROR),
+)
+
+
+def _ccx_failure_cause(output: str, returncode: int) -> str:
+    """classifies a failed CalculiX run
+
+    Args:
+        output (str): what ccx printed
+        returncode (int): exit code of ccx
+
+    Returns:
+        str: the failure cause, see solver_backend
+    """
+    if returncode < 0:
+        return PROCESS_CRASH  # killed by a signal
+    output = output.lower()
+    for (message, cause) in CCX_FAILURE_MESSAGES:
+        if message in output:
+            return cause
+    # exited without saying why, e.g. out of memory
+    return PROCESS_CRASH if returncode != 0 else MISSING_RESULTS
+
+
+def _ccx_environment() -> dict:
+    """environment ccx is run in, set up the same way as
+    FemToolsCcx.start_ccx(): OpenMP uses the number of CPUs picked in the FEM
+    CalculiX preferences, or all of them if none was picked
+
+    Returns:
+        dict: a copy of os.environ with OMP_NUM_THREADS set
+    """
+    ccx_prefs = FreeCAD.ParamGet(
+        "User parameter:BaseApp/Preferences/Mod/Fem/Ccx"
+    )
+    num_cpu_pref = ccx_prefs.GetInt("AnalysisNumCPUs", 1)
+    env = os.environ.copy()
+    env["OMP_NUM_THREADS"] = str(
+        num_cpu_pref if num_cpu_pref > 1 else multiprocessing.cpu_count()
+    )
+    return env
+
+
+def _same_file(filename: str, other: str) -> bool:
+    return os.path.normcase(os.path.abspath(filename)) == os.path.normcase(
+        os.path.abspath(other)
+    )
+
+
+class FreecadModel(SolverBackend):
+    """FreecadModel class, the FreeCAD/CalculiX solver backend"""
 
     def __init__(self, document_path: str, freecad_path: str = "") -> None:
         """initialises a FreecadModel object
@@ -15,16 +92,30 @@ def __init__(self, document_path: str, freecad_path: str = "") -> None:
             document_path (str): path to the FreeCAD file
             freecad_path (str): path to the FreeCAD Python libraries
         """
-        self.filename = document_path
+        super().__init__(document_path)
 
         global FreeCAD, femtools, vtkResults
         (FreeCAD, femtools, vtkResults) = register_freecad(freecad_path=freecad_path)
 
+        # FreeCAD hands back the document if the caller already has it open,
+        # e.g. a GA evaluating in its own process; that one isn't ours to close
+        self._owns_model = not any(
+            _same_file(doc.FileName, document_path)
+            for doc in FreeCAD.listDocuments().values()
+        )
         self.model = FreeCAD.open(document_path)
         logger.debug(f"Opened FreeCAD model {document_path}")
 
-        self.solver_name = ""
-        self.fea_results_name = ""
+        # solver tools, kept between runs, see _get_solver_context()
+        self._fea = None
+        self._analysis_signature = None
+        # set when the input deck must be written again, e.g. after a remesh;
+        # otherwise, non-geometric changes are applied to the previous deck
+        self._input_deck_stale = True
+        self._pending_load_scaling = []
+        # objects found by label, and the last value set for each parameter
+        self._objects = {}
+        self._applied_parameters = {}
         # TODO: error handling
 
     def change_parameter(
@@ -40,89 +131,402 @@ def change_parameter(
             constraint_name (str): name of the constraint to modify
             target_value (float): target value for the constraint
         """
+        self.apply_parameters({(object_name, constraint_name): target_value})
 
-        target_object = self.model.getObjectsByLabel(object_name)
-        if not target_object:
-            try:
-                raise KeyError(f"Unable to find object {object_name} in the model")
-            except KeyError as e:
-                logger.exception(str(e))
-                raise
+    def apply_parameters(
+        self, parameters: dict, non_geometric=frozenset()
+    ) -> bool:
+        """changes several parameters at once, and recomputes the model only
+        once. Parameters that already have the requested value are skipped,
+        and if none changed the model isn't recomputed at all
 
-        try:
-            target_str = str(target_object[0])
+        Non-geometric parameters (e.g. the magnitude of a force or pressure
+        constraint) don't change the mesh: if only those changed, the model
+        isn't recomputed or remeshed, and the next run_fea() scales their
+        loads in the existing CalculiX input deck instead of writing it again
 
-            # sketcher objects need obj.getDatum / obj.setDatum
-            if target_str == "<Sketcher::SketchObject>":
-                target_object[0].setDatum(constraint_name, target_value)
+        Args:
+            parameters (dict): (object_name, constraint_name) tuples mapped to
+                their target values. See change_parameter()
+            ?non_geometric (set): keys of parameters that don't affect the
+                geometry. Defaults to none
 
-            # generic objects need setattr(obj, attr, value)
+        Returns:
+            bool: True if the model was recomputed
+        """
+        changed = {
+            key: value
+            for (key, value) in parameters.items()
+            if key not in self._applied_parameters
+            or self._applied_parameters[key] != value
+        }
+        if not changed:
+            logger.debug("Parameters unchanged, skipping recompute")
+            return False
+
+        with self._timed("apply_parameters"):
+            geometry_changed = self._set_parameters(changed, non_geometric)
+
+        if not geometry_changed:
+            logger.debug(
+                "Only non-geometric parameters changed, keeping the mesh"
+            )
+            return False
+
+        # apply changes and recompute: the geometry the meshes are built on
+        # first, then the rest of the document, which remeshes
+        mesh_sources = self._mesh_sources()
+        with self._timed("recompute"):
+            if mesh_sources:
+                self.model.recompute(mesh_sources)
             else:
-                setattr(target_object[0], constraint_name, target_value)
+                self.model.recompute()
+        with self._timed("mesh"):
+            if mesh_sources:
+                self.model.recompute()
+        self._input_deck_stale = True
+        logger.debug("Model recomputed")
+        # TODO: check for model errors here
+        return True
+
+    def _set_parameters(self, changed: dict, non_geometric) -> bool:
+        """sets the parameter values, without recomputing
 
-        except (NameError, IndexError):
-            logger.exception(
-                f"Invalid constraint name {constraint_name} in object {object_name}"
+        Returns:
+            bool: True if any geometric parameter changed
+        """
+        geometry_changed = False
+        for ((object_name, constraint_name), target_value) in changed.items():
+            target_object = self._get_object(object_name)
+            target_str = str(target_object)
+            # sketch constraints always drive the geometry
+            is_load = (
+                (object_name, constraint_name) in non_geometric
+                and target_str != "<Sketcher::SketchObject>"
             )
-            raise
+            try:
+                # sketcher objects need obj.getDatum / obj.setDatum
+                if target_str == "<Sketcher::SketchObject>":
+                    target_object.setDatum(constraint_name, target_value)
 
-        logger.debug(f"Set {object_name}.{constraint_name} to {target_value}")
-        # apply changes and recompute
-        self.model.recompute()
-        logger.debug("Model recomputed")
-        # TODO: check for model errors here
+                # generic objects need setattr(obj, attr, value)
+                else:
+                    if is_load:
+                        old_value = getattr(target_object, constraint_name)
+                    setattr(target_object, constraint_name, target_value)
+
+            except (NameError, IndexError, AttributeError):
+                logger.exception(
+                    f"Invalid constraint name {constraint_name} in object "
+                    f"{object_name}"
+                )
+                raise
 
-    def run_fea(self, max_retries=3):
-        """runs a FEA analysis in the specified freecad document
+            if is_load:
+                # quantities (e.g. forces) are compared by their value
+                try:
+                    old_value = float(getattr(old_value, "Value", old_value))
+                    ratio = (
+                        float(target_value) / old_value
+                        if old_value != 0
+                        else None
+                    )
+                except (TypeError, ValueError):
+                    # not a number (e.g. an enumeration or a link): can't be
+                    # scaled, so the model is recomputed and remeshed
+                    logger.debug(
+                        f"{object_name}.{constraint_name} is not numeric, "
+                        f"remeshing"
+                    )
+                    is_load = False
+                else:
+                    self._pending_load_scaling.append((object_name, ratio))
+            if not is_load:
+                geometry_changed = True
+
+            self._applied_parameters[
+                (object_name, constraint_name)
+            ] = target_value
+            logger.debug(
+                f"Set {object_name}.{constraint_name} to {target_value}"
+            )
+        return geometry_changed
+
+    def _mesh_sources(self) -> list:
+        # shapes meshed by the FEM mesh objects of the document (Gmsh meshes
+        # link them as Part, Netgen meshes as Shape)
+        sources = []
+        for obj in self.model.Objects:
+            if getattr(obj, "TypeId", "").startswith("Fem::FemMesh"):
+                source = getattr(obj, "Part", None) or getattr(
+                    obj, "Shape", None
+                )
+                if source is not None and hasattr(source, "TypeId"):
+                    sources.append(source)
+        return sources
+
+    def _get_object(self, object_name: str):
+        # labels are looked up once, then served from the cache
+        if object_name not in self._objects:
+            target_object = self.model.getObjectsByLabel(object_name)
+            if not target_object:
+                try:
+                    raise KeyError(
+                        f"Unable to find object {object_name} in the model"
+                    )
+                except KeyError as e:
+                    logger.exception(str(e))
+                    raise
+            self._objects[object_name] = target_object[0]
+        return self._objects[object_name]
+
+    def run_fea(self, timeout: Optional[float] = None):
+        """runs a FEA analysis in the specified freecad document. Returns as
+        soon as CalculiX has exited and its results have been loaded. The wall
+        time of each solver phase is added to self.timings
+
+        The model is solved once: failures are classified by their cause, and
+        retried (or not) by the caller, see RetryPolicy
 
         Args:
-            solver_name (str): name of the solver (e.g. SolverCcxTools)
-            fea_results_name (str): name of the FEA results container (e.g.
-                CCX_Results)
+            ?timeout (float): max time for each CalculiX run [s]. Defaults to
+                self.solver_timeout
+
+        Raises:
+            SolverTimeoutError: if CalculiX runs longer than the timeout
+            SolverCancelledError: if the solve is stopped with cancel()
+            SolverFailure: if no valid results are obtained
 
         Returns:
             fea object: a FreeCAD object containing the FEA results
         """
+        if timeout is None:
+            timeout = self.solver_timeout
+
+        with self._timed("setup"):
+            fea = self._get_solver_context()
+        with self._timed("prerequisites"):
+            self._check_prerequisites(fea)
+        self._check_mesh(fea)
+
+        # Patch to redirect output from Calculix
+        with open(os.devnull, "w", encoding="utf8") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                try:
+                    self._solve(fea, timeout)
+                except (PermissionError, BlockingIOError) as e:
+                    # solver files held by another process, e.g. a virus
+                    # scanner or a file sync client
+                    raise SolverFailure(
+                        FILE_LOCK,
+                        f"FEA analysis failed. Solver file locked: {e}",
+                    ) from e
+
+        if not fea.results_present:
+            raise SolverFailure(
+                MISSING_RESULTS, "FEA analysis failed. No results were loaded."
+            )
+        logger.debug("FEA results generated")
+        result_object = self.model.getObject(self.fea_results_name)
+        self.result_fields = ResultFields(result_object)
+        if self.result_fields["vonMises"].max() == 0:
+            logger.error("FEA analysis failed. Von Mises stress is zero.")
+            raise SolverFailure(
+                ZERO_FIELD, "FEA analysis failed. Von Mises stress is zero."
+            )
+        logger.debug(f"Phase timings: {self.timings}")
+        return result_object
+
+    def _check_mesh(self, fea):
+        # a geometry that can't be meshed leaves an empty mesh, which
+        # CalculiX would only reject after writing the whole input deck
+        mesh = getattr(fea, "mesh", None)
+        if mesh is not None and mesh.FemMesh.NodeCount == 0:
+            logger.error(f"The mesh {mesh.Label} is empty")
+            raise SolverFailure(
+                MESH_FAILURE,
+                f"FEA analysis failed. Meshing of {mesh.Label} failed.",
+            )
+
+    def _get_solver_context(self):
+        """returns the solver tools of this document, creating them on the
+        first run (or if the solver changed) only
+
+        Returns:
+            FemToolsCcx: the solver tools
+        """
         if self.solver_name == "":
             self._find_solver_result_names()
 
-        solver_object = self.model.getObject(self.solver_name)
+        if self._fea is None or self._fea.solver.Name != self.solver_name:
+
+            solver_object = self.model.getObject(self.solver_name)
+
+            fea = femtools.ccxtools.FemToolsCcx(solver=solver_object)
+            fea.purge_results()
+            fea.reset_all()
+            if self.working_dir != "":
+                os.makedirs(self.working_dir, exist_ok=True)
+            fea.setup_working_dir(param_working_dir=self.working_dir or None)
+            fea.setup_ccx()
+            logger.debug(
+                f"Prepared solver {solver_object.Name} in {fea.working_dir}"
+            )
+            self._fea = fea
+        return self._fea
+
+    def _check_prerequisites(self, fea):
+        # the analysis only needs checking again if its content changed
+        analysis_signature = tuple(
+            (obj.Name, obj.TypeId) for obj in fea.analysis.Group
+        )
+        if analysis_signature == self._analysis_signature:
+            return
 
-        fea = femtools.ccxtools.FemToolsCcx(solver=solver_object)
-        fea.purge_results()
-        fea.reset_all()
         fea.update_objects()
-        logger.debug(f"Prepared solver {solver_object.Name}")
-
-        # Retry logic for FEA
-        retries = 0
-        von_mises_stress = 0
-        while retries < max_retries:
-            # there should be some error handling here
-            fea.check_prerequisites()
-            logger.debug("Checked FEA prerequisites")
-
-            # Patch to redirect output from Calculix
-            with open(os.devnull, "w", encoding="utf8") as devnull:
-                with contextlib.redirect_stdout(devnull):
-                    fea.run()
-
-            if fea.results_present:
-                logger.debug("FEA results generated")
-                von_mises_stress = np.max(self.model.getObject(self.fea_results_name).vonMises)
-
-                if von_mises_stress == 0:
-                    retries += 1
-                    logger.warning(f"Von Mises stress is zero, retrying {retries}/{max_retries}...")
-                else:
-                    return self.model.getObject(self.fea_results_name)
-            else:
-                retries += 1
-                logger.warning(f"FEA failed, retrying {retries}/{max_retries}...")
+        message = fea.check_prerequisites()
+        if message:
+            logger.warning(f"FEA prerequisites not met: {message}")
+        else:
+            self._analysis_signature = analysis_signature
+        logger.debug("Checked FEA prerequisites")
+
+    def _solve(self, fea, timeout: Optional[float]):
+        # same steps as FemToolsCcx.run(), without resetting the working
+        # directory to FreeCAD's default, and with ccx run by _run_ccx()
+        fea.results_present = False
+        with self._timed("write_input"):
+            if not self._update_input_deck(fea):
+                fea.write_inp_file()
+            self._input_deck_stale = False
+            self._pending_load_scaling = []
+        with self._timed("solve"):
+            self._run_ccx(fea, timeout)
+        with self._timed("load_results"):
+            self._load_results(fea)
+
+    def _update_input_deck(self, fea) -> bool:
+        """brings the input deck of the previous run up to date, if only
+        non-geometric parameters changed since then
 
-        if retries == max_retries:
-            logger.error(f"FEA analysis failed after {max_retries} retries. Von Mises stress is zero.")
-            raise RuntimeError("FEA analysis failed. Von Mises stress is zero.")
+        Returns:
+            bool: False if the deck has to be written again from scratch
+        """
+        if self._input_deck_stale or not os.path.isfile(
+            getattr(fea, "inp_file_name", "")
+        ):
+            return False
+
+        deck = InputDeck(fea.inp_file_name)
+        analysis_labels = [obj.Label for obj in fea.analysis.Group]
+        for (label, ratio) in self._pending_load_scaling:
+            if ratio is None or not deck.scale_section(
+                label, ratio, analysis_labels
+            ):
+                logger.debug(
+                    f"Can't scale the loads of {label}, writing a new input "
+                    f"deck"
+                )
+                return False
+        deck.save()
+        logger.debug(f"Reused the mesh and input deck {fea.inp_file_name}")
+        return True
+
+    def _load_results(self, fea):
+        """loads the CalculiX results into the existing result object,
+        instead of purging it and creating a new one like
+        FemToolsCcx.load_results() does
+        """
+        from feminout import importCcxFrdResults, importToolsFem
+        from femresult import resulttools
+
+        result_object = self.model.getObject(self.fea_results_name)
+        if result_object is None or result_object.Mesh is None:
+            fea.purge_results()
+            fea.load_results()
+            return
+
+        frd_file = os.path.splitext(fea.inp_file_name)[0] + ".frd"
+        frd_results = importCcxFrdResults.read_frd_result(frd_file)
+        if len(frd_results["Results"]) != 1:
+            # multi-step analyses get one result object per step
+            fea.purge_results()
+            fea.load_results()
+            return
+
+        # the mesh changes with the geometry, so it's refreshed too
+        result_object.Mesh.FemMesh = importToolsFem.make_femmesh(frd_results)
+        resulttools.fill_femresult_mechanical(
+            result_object, frd_results["Results"][0]
+        )
+        resulttools.add_von_mises(result_object)
+        resulttools.add_principal_stress_std(result_object)
+        resulttools.fill_femresult_stats(result_object)
+        fea.results_present = True
+
+    def _run_ccx(
+        self, fea, timeout: Optional[float], poll_interval: float = 0.05
+    ):
+        """runs CalculiX on the input file written by fea, and waits for it
+        to exit
+
+        Raises:
+            SolverFailure: if ccx failed or didn't write its results file
+        """
+        job_name = os.path.splitext(os.path.basename(fea.inp_file_name))[0]
+        frd_file = os.path.join(fea.working_dir, job_name + ".frd")
+        # results left over from a previous run must not be mistaken for new
+        # ones
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(frd_file)
+
+        # a cancel() during the recompute or the meshing stops the solve here
+        self._check_cancelled(f"CalculiX run cancelled for {self.filename}")
+        start_time = time.monotonic()
+        process = subprocess.Popen(
+            [fea.ccx_binary, "-i", job_name],
+            cwd=fea.working_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=_ccx_environment(),
+        )
+        try:
+            while True:
+                try:
+                    (stdout, stderr) = process.communicate(
+                        timeout=poll_interval
+                    )
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                self._check_cancelled(
+                    f"CalculiX run cancelled for {self.filename}"
+                )
+                elapsed = time.monotonic() - start_time
+                if timeout is not None and elapsed > timeout:
+                    logger.error(f"CalculiX did not finish within {timeout}s")
+                    raise SolverTimeoutError(
+                        f"CalculiX timed out after {timeout}s"
+                    )
+        finally:
+            # don't leave a solver running if we stopped waiting for it
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+
+        logger.debug(f"CalculiX exited with code {process.returncode}")
+        if process.returncode != 0 or not os.path.isfile(frd_file):
+            output = (stdout + stderr).decode(errors="replace")
+            cause = _ccx_failure_cause(output, process.returncode)
+            logger.warning(
+                f"CalculiX exited with code {process.returncode} ({cause}): "
+                f"{output[-500:]!r}"
+            )
+            raise SolverFailure(
+                cause,
+                f"FEA analysis failed. CalculiX exited with code "
+                f"{process.returncode} ({cause}).",
+            )
 
     def export_fea_results(self, filename: str, export_format: str = "vtk"):
         """exports the results of a analysis to various mesh formats
@@ -150,6 +554,27 @@ def export_fea_results(self, filename: str, export_format: str = "vtk"):
                 logger.exception(str(e))
                 raise
 
+    def for_worker(self):
+        """
+        Returns:
+            str: the path of the document, as FreeCAD documents can't be
+                sent to other processes
+        """
+        return self.filename
+
+    def close(self):
+        """closes the FreeCAD document, releasing the memory it holds. A
+        document that was already open when this model was created is left
+        open for its owner
+        """
+        if not self._owns_model:
+            logger.debug(
+                f"Left FreeCAD model {self.filename} open for its owner"
+            )
+            return
+        FreeCAD.closeDocument(self.model.Name)
+        logger.debug(f"Closed FreeCAD model {self.filename}")
+
     def _find_solver_result_names(self) -> Tuple[str, str]:
         # do stuff...
         solver_name = ""
@@ -1,29 +1,91 @@
 import sys
 import os
-import time  # Add this for timing
 from os import path
 import random
+import numpy as np
 from tqdm import tqdm  # Add tqdm for the progress bar
+from FreecadParametricFEA.checkpoint import load_checkpoint, save_checkpoint
+from FreecadParametricFEA.job_queue import QueueEvaluatorPool
+from FreecadParametricFEA.parametric import output_heading
+from FreecadParametricFEA.pareto import ParetoArchive
+from FreecadParametricFEA.result_cache import ResultCache
+from FreecadParametricFEA.result_log import ResultLog
+from FreecadParametricFEA.result_store import ResultStore
+from FreecadParametricFEA.stopping import population_diversity
+from FreecadParametricFEA.surrogate import GaussianProcess, prescreen
+from FreecadParametricFEA.worker_pool import EvaluatorPool
+from FreecadParametricFEA.variable import Variable
+from FreecadParametricFEA.output import Output
 
 # Add FreeCAD Python libraries to sys.path dynamically
 FREECAD_PATH = "C:/Program Files/FreeCAD 0.21/bin"  # Adjust this if your FreeCAD installation is elsewhere
 if FREECAD_PATH not in sys.path:
     sys.path.append(FREECAD_PATH)
 
-import pandas as pd
 import FreeCAD
 from deap import base, creator, tools, algorithms
-from FreecadParametricFEA.parametric_analysis import ParametricAnalysis
-from FreecadParametricFEA.variable import Variable
-from FreecadParametricFEA.output import Output
 
 class GeneticAlgorithm:
-    def __init__(self, freecad_path, model_file, population_size=2, generations=1):
+    model_suffix = "GA"  # Appended to the name of the best model saved
+
+    def __init__(self, freecad_path, model_file, population_size=2,
+                 generations=1, n_workers=1, cache_file=None,
+                 solver_timeout=None, resume=False, checkpoint_every=None,
+                 surrogate=False, surrogate_fraction=0.3,
+                 exploration_fraction=0.1, steady_state=False, stopping=None,
+                 snap_to_steps=False, multi_objective=False, objectives=None,
+                 backend=None, job_queue=None):
+        if multi_objective and (surrogate or steady_state):
+            raise ValueError("multi_objective can't be combined with "
+                             "surrogate or steady_state")
+        if cache_file and job_queue:
+            # The workers on the other nodes can't share this machine's cache
+            raise ValueError("cache_file can't be combined with job_queue")
+        if steady_state and (surrogate or checkpoint_every or snap_to_steps):
+            # There are no generations to pre-screen, checkpoint or deduplicate
+            raise ValueError("steady_state can't be combined with surrogate, "
+                             "checkpoint_every or snap_to_steps")
         self.freecad_path = freecad_path
         self.model_file = model_file
         self.population_size = population_size
         self.generations = generations
-        
+        # Number of processes evaluating each generation
+        self.n_workers = n_workers
+        # Result cache, so repeated individuals are not re-solved
+        self.cache_file = cache_file
+        # Max seconds per CalculiX run, None waits indefinitely
+        self.solver_timeout = solver_timeout
+        # Continue from results/ga_checkpoint.pkl, or from
+        # results/ga_results.jsonl
+        self.resume = resume
+        # Generations between checkpoints, 0 disables them
+        self.checkpoint_every = (1 if checkpoint_every is None
+                                 else checkpoint_every)
+        # Pre-screen offspring with a Gaussian process before running FEA
+        self.surrogate = surrogate
+        # Share of offspring with the best predictions sent to FEA
+        self.surrogate_fraction = surrogate_fraction
+        # Share of offspring with the most uncertain predictions sent to FEA
+        self.exploration_fraction = exploration_fraction
+        # Breed a new offspring as soon as any solve finishes, instead of per
+        # generation
+        self.steady_state = steady_state
+        # StoppingCriteria checked after each generation, None runs every
+        # generation
+        self.stopping = stopping
+        # Round each variable to the spreadsheet's steps before solving
+        self.snap_to_steps = snap_to_steps
+        # NSGA-II on the stress and the objectives below, instead of the
+        # stress alone
+        self.multi_objective = multi_objective
+        # Minimised alongside the stress
+        self.objectives = objectives or [Output("DisplacementLengths", max)]
+        # Solver backend the workers solve on, None solves model_file with
+        # FreeCAD
+        self.backend = backend
+        # Queue folder shared with workers on other nodes, None solves on
+        # this machine
+        self.job_queue = job_queue
 
     def get_spreadsheet_data(self, spreadsheet, row):
         object_name = spreadsheet.get(f'A{row}')
@@ -33,7 +95,8 @@ def get_spreadsheet_data(self, spreadsheet, row):
         step = int(spreadsheet.get(f'E{row}'))
         unit = spreadsheet.get(f'F{row}')
         constraint_name_with_unit = f"{constraint_name} [{unit}]"
-        return object_name, constraint_name, constraint_name_with_unit, min_value, max_value
+        return (object_name, constraint_name, constraint_name_with_unit,
+                min_value, max_value, step)
 
     def save_best_model(self, doc, best_values, constraint_names_with_units):
         """Save the best model and dynamically name it based on constraints."""
@@ -49,7 +112,7 @@ def save_best_model(self, doc, best_values, constraint_names_with_units):
             filename_parts.append(f"{constraint_name}_{round(value, 3)}")
 
         # Join the parts to create a filename
-        filename = "_".join(filename_parts) + "_GA.fcstd"
+        filename = "_".join(filename_parts) + f"_{self.model_suffix}.fcstd"
 
         # Save the FreeCAD document with the best result
         results_folder = path.join(path.dirname(self.model_file), "results")
@@ -60,22 +123,234 @@ def save_best_model(self, doc, best_values, constraint_names_with_units):
 
         print(f"Best model saved as {best_model_path}")
 
-
-    def genetic_algorithm_fitness(self, individual, variables):
-        analysis = ParametricAnalysis(self.freecad_path, self.model_file)
-        for variable, value in zip(variables, individual):
-            variable.constraint_values = [value]
-            analysis.add_variable(variable)
-        output1 = Output("vonMises", max)
-        analysis.add_output(output1)
-
-        # Run the analysis with a delay
-        results = analysis.run_analysis()
-        time.sleep(1)  # Add a delay to ensure the FEA completes
-        
-        return results["max(vonMises)"].min(),  # Assuming von Mises stress is in max(vonMises)
+    def select_for_fea(self, population, all_results,
+                       constraint_names_with_units, min_values, max_values):
+        """Pick the offspring worth a FEA solve, ranking them with a surrogate
+        fitted on all the solves so far."""
+        n_needed = max(len(population), 2 * len(min_values) + 2)
+        if not self.surrogate or len(all_results) < n_needed:
+            # Not enough data for a useful surrogate yet
+            return list(range(len(population)))
+        # Failed solves have an infinite fitness, which the surrogate can't
+        # learn from
+        y = all_results.column('vonMises [MPa]')
+        solved = np.isfinite(y)
+        if np.count_nonzero(solved) < n_needed:
+            return list(range(len(population)))
+
+        X = np.column_stack([all_results.column(name)
+                             for name in constraint_names_with_units])
+        surrogate = GaussianProcess(bounds=(min_values, max_values))
+        surrogate.fit(X[solved], y[solved])
+        n_best = max(1, round(self.surrogate_fraction * len(population)))
+        n_explore = round(self.exploration_fraction * len(population))
+        chosen = prescreen(surrogate, [list(ind) for ind in population],
+                           n_best, n_explore)
+
+        # Offspring that are not solved keep the predicted fitness, so
+        # selection can still rank them
+        predicted = surrogate.predict([list(ind) for ind in population])
+        for idx, ind in enumerate(population):
+            if idx not in chosen and not ind.fitness.valid:
+                ind.fitness.values = (float(predicted[idx]),)
+        return sorted(chosen)
+
+    def select_next_generation(self, toolbox, parents, population,
+                               predicted=()):
+        """Select the population the next generation is bred from. The
+        offspring in `predicted` only have the surrogate's prediction, so they
+        are never kept as elites: they follow the solved individuals, ranked
+        by their prediction, and go forward without a fitness, to be screened
+        or solved again."""
+        if self.multi_objective:
+            # NSGA-II picks from the parents and offspring together
+            candidates = [ind for ind in parents if ind.fitness.valid]
+            return toolbox.select(candidates + population, len(population))
+        solved = [ind for idx, ind in enumerate(population)
+                  if idx not in predicted]
+        unsolved = tools.selBest([population[idx] for idx in predicted],
+                                 len(predicted))
+        for ind in unsolved:
+            del ind.fitness.values
+        return toolbox.select(solved, len(solved)) + unsolved
+
+    def check_stopping(self, population, all_results, min_values, max_values):
+        """Check the stopping criteria at the end of a generation, returning
+        why the run should stop or None."""
+        if self.stopping is None:
+            return None
+        # Only successful solves, not the failures or the surrogate's
+        # predictions
+        stresses = all_results.column('vonMises [MPa]')
+        best = stresses[np.isfinite(stresses)].min(initial=float("inf"))
+        diversity = population_diversity([list(ind) for ind in population],
+                                         min_values, max_values)
+        return self.stopping.check(best, len(all_results), diversity)
+
+    def replay_stopping(self, records, min_values, max_values,
+                        records_per_check=1):
+        """Replay the stopping criteria over the logged records of a resumed
+        run, so it stops where it would have."""
+        if self.stopping is None:
+            return None
+        stop_reason = None
+        best = float("inf")
+        n_solves = 0
+        for number, record in enumerate(records, 1):
+            stresses = [row['vonMises [MPa]'] for row in record["rows"]]
+            best = min([best] + [stress for stress in stresses
+                                 if np.isfinite(stress)])
+            n_solves += len(record["rows"])
+            if number % records_per_check == 0:
+                diversity = population_diversity(record["population"],
+                                                 min_values, max_values)
+                stop_reason = self.stopping.check(best, n_solves, diversity)
+        return stop_reason
+
+    @staticmethod
+    def snap_individual(individual, min_values, max_values, steps):
+        """Snap each variable to the nearest of the `steps` evenly spaced
+        values RunAll would sweep, in place."""
+        for i, (min_v, max_v, n_steps) in enumerate(
+                zip(min_values, max_values, steps)):
+            if n_steps > 1:  # Variables without steps stay continuous
+                levels = np.linspace(min_v, max_v, n_steps)
+                nearest = int(np.argmin(np.abs(levels - individual[i])))
+                individual[i] = float(levels[nearest])
+        return individual
+
+    @staticmethod
+    def breed(toolbox, population):
+        """Breed a single offspring from two parents picked by tournament,
+        with the generational GA's variation rates. As in varAnd, an offspring
+        that is neither mated nor mutated keeps its parent's fitness."""
+        parents = [toolbox.clone(ind)
+                   for ind in tools.selTournament(population, 2, tournsize=3)]
+        if random.random() < 0.7:
+            toolbox.mate(parents[0], parents[1])
+            del parents[0].fitness.values
+        if random.random() < 0.3:
+            toolbox.mutate(parents[0])
+            del parents[0].fitness.values
+        return parents[0]
+
+    def evolve_steady_state(self, toolbox, all_results, result_log,
+                            constraint_names_with_units, min_values,
+                            max_values, steps):
+        """Asynchronous steady-state evolution: each finished solve enters the
+        population straight away and a new offspring is dispatched to the
+        free worker, so no worker waits for the slowest solve."""
+        # Same number of solves as the generational GA
+        total_births = self.generations * self.population_size
+        population = []
+        birth = 0
+        birth_records = result_log.open(resume=self.resume)
+        for record in birth_records:
+            all_results.extend(record["rows"])
+            birth = record["birth"]
+            population = [creator.Individual(ind)
+                          for ind in record["population"]]
+            for ind, fit in zip(population, record["fitnesses"]):
+                ind.fitness.values = tuple(fit)
+        n_dispatched = birth
+        # Stopping criteria are checked every population_size births, the
+        # equivalent of a generation
+        stop_reason = self.replay_stopping(birth_records, min_values,
+                                           max_values, self.population_size)
+
+        with tqdm(total=total_births, initial=birth,
+                  desc="Genetic Algorithm Progress", ncols=100) as pbar:
+            pool = self.evaluator_pool
+            while birth < total_births and (stop_reason is None
+                                            or pool.n_pending):
+                # Keep every worker busy: random individuals until the
+                # population is seeded, offspring afterwards
+                while (stop_reason is None and pool.n_pending < self.n_workers
+                       and n_dispatched < total_births):
+                    if n_dispatched < self.population_size:
+                        child = toolbox.individual()
+                    elif population:
+                        child = self.breed(toolbox, population)
+                        # A blend of identical parents can differ from them
+                        # in the last digit only
+                        if child.fitness.valid or any(
+                                np.allclose(child, ind, rtol=1e-12, atol=0.0)
+                                for ind in population):
+                            continue  # Already solved, breed another one
+                    else:
+                        # Wait for the first solves before breeding from them
+                        break
+                    if self.snap_to_steps:
+                        self.snap_individual(child, min_values, max_values,
+                                             steps)
+                    pool.submit(toolbox.evaluate, child, key=child)
+                    n_dispatched += 1
+
+                child, fitness = pool.next_completed()
+                child.fitness.values = fitness
+                birth += 1
+
+                # The offspring replaces the worst individual if it is better
+                if len(population) < self.population_size:
+                    population.append(child)
+                else:
+                    worst = min(range(len(population)),
+                                key=lambda idx: population[idx].fitness)
+                    if child.fitness > population[worst].fitness:
+                        population[worst] = child
+
+                individual_data = {constraint_names_with_units[i]: val
+                                   for i, val in enumerate(child)}
+                individual_data['vonMises [MPa]'] = fitness[0]
+                individual_data['birth'] = birth
+                all_results.append(individual_data)
+                result_log.append({
+                    "birth": birth,
+                    "rows": [individual_data],
+                    "population": [list(ind) for ind in population],
+                    "fitnesses": [list(ind.fitness.values)
+                                  for ind in population],
+                })
+                pbar.update(1)
+
+                if stop_reason is None and birth % self.population_size == 0:
+                    stop_reason = self.check_stopping(
+                        population, all_results, min_values, max_values)
+                    # Solves already running are still collected, but no new
+                    # offspring are dispatched
+
+        if stop_reason is not None:
+            print(f"Run stopped early: {stop_reason}")
+
+    @staticmethod
+    def genetic_algorithm_fitness(evaluator, individual):
+        # Runs inside an evaluator worker, on its already open copy of the
+        # model
+        # Returns once CalculiX has finished
+        results = evaluator.evaluate(individual)
+        if results["Msg"]:
+            # A failed solve leaves the outputs at 0, which must not win the
+            # minimisation
+            return float("inf"),
+
+        # Assuming von Mises stress is in max(vonMises)
+        return results["max(vonMises)"],
+
+    @staticmethod
+    def multi_objective_fitness(evaluator, individual):
+        # All the objectives are reduced from the same solve, in the order of
+        # the evaluator's outputs
+        results = evaluator.evaluate(individual)
+        if results["Msg"]:
+            # Dominated by every successful solve
+            return (float("inf"),) * len(evaluator.fea.outputs)
+
+        return tuple(results[output_heading(output)]
+                     for output in evaluator.fea.outputs)
 
     def run(self):
+        if self.stopping is not None:
+            self.stopping.start()  # The time budget counts from here
         doc = FreeCAD.openDocument(self.model_file)
         spreadsheet = None
         for obj in doc.Objects:
@@ -86,94 +361,325 @@ def run(self):
         variables = []
         min_values = []
         max_values = []
+        steps = []
         constraint_names_with_units = []
 
         for row in range(2, spreadsheet.get('G2') + 1):
-            object_name, original_constraint_name, constraint_name_with_unit, min_value, max_value = self.get_spreadsheet_data(spreadsheet, row)
-            variable = Variable(object_name, original_constraint_name, [min_value, max_value])
+            (object_name, original_constraint_name, constraint_name_with_unit,
+             min_value, max_value, step) = self.get_spreadsheet_data(
+                spreadsheet, row)
+            variable = Variable(object_name, original_constraint_name,
+                                [min_value, max_value])
             variables.append(variable)
             min_values.append(min_value)
             max_values.append(max_value)
+            steps.append(step)
             constraint_names_with_units.append(constraint_name_with_unit)
 
-        # Genetic Algorithm setup
-        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-        creator.create("Individual", list, fitness=creator.FitnessMin)
-
-        toolbox = base.Toolbox()
-
-        # Initialize individuals within the [min_value, max_value] range
-        def init_individual():
-            return [random.uniform(min_v, max_v) for min_v, max_v in zip(min_values, max_values)]
-
-        toolbox.register("individual", tools.initIterate, creator.Individual, init_individual)
-        toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-        toolbox.register("evaluate", self.genetic_algorithm_fitness, variables=variables)
-        toolbox.register("mate", tools.cxBlend, alpha=0.5)
-        toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
-        toolbox.register("select", tools.selBest)
-
-        population = toolbox.population(n=self.population_size)
-        N_generations = self.generations
-        
-        # DataFrame to collect results
-        all_results = pd.DataFrame()
-
-        # Total calculations for progress bar: generations * population size
-        total_calculations = self.generations * self.population_size
-
-        # Progress bar to track genetic algorithm progress
-        with tqdm(total=total_calculations, desc="Genetic Algorithm Progress", ncols=100) as pbar:
-            # Run genetic algorithm and collect results for each generation
-            for gen in range(1, N_generations + 1):
-                population = algorithms.varAnd(population, toolbox, cxpb=0.7, mutpb=0.3)
-                fitnesses = list(map(toolbox.evaluate, population))
-
-                generation_results = []
-                for ind, fitness in zip(population, fitnesses):
-                    # Collect individual's data and add generation info
-                    individual_data = {constraint_names_with_units[i]: val for i, val in enumerate(ind)}
-                    individual_data['vonMises [MPa]'] = fitness[0]
-                    individual_data['generation'] = f'gen {gen}'
-
-                    # Add this individual's data to the generation results list
-                    generation_results.append(individual_data)
-
-                    # Update the progress bar for each individual evaluated
-                    pbar.update(1)
-
-                # Append generation results to the all_results DataFrame
-                all_results = pd.concat([all_results, pd.DataFrame(generation_results)], ignore_index=True)
-
-                # Assign fitness to individuals after the evaluation
-                for ind, fit in zip(population, fitnesses):
-                    ind.fitness.values = fit
-
-                # Select the next generation
-                population = toolbox.select(population, len(population))
-
-        # Move 'vonMises [MPa]' column to the last position
-        if 'vonMises [MPa]' in all_results.columns:
-            cols = [col for col in all_results.columns if col != 'vonMises [MPa]'] + ['vonMises [MPa]']
-            all_results = all_results[cols]
-
-        # Create a folder for results if it doesn't exist
+        # Start the evaluator workers, each opening the model only once
+        output1 = Output("vonMises", max)
+        outputs = ([output1] + self.objectives if self.multi_objective
+                   else [output1])
+        objective_columns = ['vonMises [MPa]'] + [
+            output_heading(output.to_dict()) for output in outputs[1:]]
+        result_cache = (ResultCache(self.cache_file) if self.cache_file
+                        else None)
+        model = self.backend or self.model_file
+        if self.job_queue:
+            # n_workers is then the number of solves kept in flight by the
+            # steady state mode
+            self.evaluator_pool = QueueEvaluatorPool(
+                self.job_queue, model, variables, outputs,
+                n_workers=self.n_workers, solver_timeout=self.solver_timeout)
+        else:
+            self.evaluator_pool = EvaluatorPool(
+                self.freecad_path, model, variables, outputs,
+                n_workers=self.n_workers, result_cache=result_cache,
+                solver_timeout=self.solver_timeout)
+
+        # Each generation is streamed to disk as soon as it is evaluated
         results_folder = path.join(path.dirname(self.model_file), "results")
-        if not os.path.exists(results_folder):
-            os.makedirs(results_folder)
-
-        # Save results to CSV
-        all_results.to_csv(path.join(results_folder, "ga_results.csv"), index=False)
-
-        print(f"Results saved to {path.join(results_folder, 'ga_results.csv')}")
-
-        # Find the row with the minimum von Mises stress
-        best_row = all_results.loc[all_results['vonMises [MPa]'].idxmin()]
-
-        # Extract the best values from the row
-        best_values = best_row[:-2].values  # Exclude von Mises and generation columns from the best values
-        
-        # Save the best model with a dynamic filename
-        self.save_best_model(doc, best_values, constraint_names_with_units)
-
-        print("Run all analysis completed, results saved, and best model saved.")
+        result_log = ResultLog(path.join(results_folder, "ga_results.jsonl"))
+        checkpoint_file = path.join(results_folder, "ga_checkpoint.pkl")
+
+        try:
+            # Genetic Algorithm setup
+            if self.multi_objective:
+                creator.create("FitnessMulti", base.Fitness,
+                               weights=(-1.0,) * len(outputs))
+                creator.create("Individual", list,
+                               fitness=creator.FitnessMulti)
+            else:
+                creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+                creator.create("Individual", list, fitness=creator.FitnessMin)
+
+            toolbox = base.Toolbox()
+
+            # Initialize individuals within the [min_value, max_value] range
+            def init_individual():
+                return [random.uniform(min_v, max_v)
+                        for min_v, max_v in zip(min_values, max_values)]
+
+            toolbox.register("individual", tools.initIterate,
+                             creator.Individual, init_individual)
+            toolbox.register("population", tools.initRepeat, list,
+                             toolbox.individual)
+            if self.multi_objective:
+                toolbox.register("evaluate", self.multi_objective_fitness)
+            else:
+                toolbox.register("evaluate", self.genetic_algorithm_fitness)
+            # Keeps the population order
+            toolbox.register("map", self.evaluator_pool.map)
+            toolbox.register("mate", tools.cxBlend, alpha=0.5)
+            toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1,
+                             indpb=0.2)
+            if self.multi_objective:
+                # Fast non-dominated sort, for large populations
+                toolbox.register("select", tools.selNSGA2, nd="log")
+            else:
+                toolbox.register("select", tools.selBest)
+
+            population = toolbox.population(n=self.population_size)
+            N_generations = self.generations
+
+            # Store to collect results, grown as generations are appended
+            all_results = ResultStore(
+                capacity=self.generations * self.population_size)
+
+            if self.steady_state:
+                self.evolve_steady_state(
+                    toolbox, all_results, result_log,
+                    constraint_names_with_units, min_values, max_values,
+                    steps)
+            else:
+                first_gen = 1
+                checkpoint = (load_checkpoint(checkpoint_file) if self.resume
+                              else None)
+                logged_records = (result_log.read() if checkpoint is not None
+                                  else [])
+                if (checkpoint is not None
+                        and len(logged_records) < checkpoint["generation"]):
+                    print(f"{result_log.filename} stops before the "
+                          f"checkpoint, resuming from the log instead")
+                    checkpoint = None
+                if checkpoint is not None:
+                    # Restart exactly where the checkpoint was taken, RNG
+                    # states included. The solves up to it are read back from
+                    # the results log, and any generation logged after it is
+                    # dropped
+                    generation_records = [
+                        record for record in logged_records
+                        if record["generation"] <= checkpoint["generation"]]
+                    result_log.open(resume=False)
+                    for record in generation_records:
+                        result_log.append(record)
+                    all_results.extend(row for record in generation_records
+                                       for row in record["rows"])
+                    first_gen = checkpoint["generation"] + 1
+                    population = [creator.Individual(ind)
+                                  for ind in checkpoint["population"]]
+                    for ind, fit in zip(population, checkpoint["fitnesses"]):
+                        # Offspring the surrogate screened out have no
+                        # fitness yet
+                        if fit:
+                            ind.fitness.values = tuple(fit)
+                else:
+                    if not self.resume and os.path.exists(checkpoint_file):
+                        # Left over from a previous run
+                        os.remove(checkpoint_file)
+                    generation_records = result_log.open(resume=self.resume)
+                    for record in generation_records:
+                        all_results.extend(record["rows"])
+                        first_gen = record["generation"] + 1
+                        # Rebuild the population the next generation is bred
+                        # from
+                        population = [creator.Individual(ind)
+                                      for ind in record["population"]]
+                        for ind, fit in zip(population, record["fitnesses"]):
+                            ind.fitness.values = tuple(fit)
+                        population = self.select_next_generation(
+                            toolbox, [], population,
+                            record.get("predicted", []))
+                stop_reason = self.replay_stopping(
+                    generation_records, min_values, max_values)
+
+                # Non-dominated designs among all the solves, for a
+                # multi-objective run
+                pareto_archive = ParetoArchive(objective_columns)
+                if self.multi_objective:
+                    pareto_archive.update(row for record in generation_records
+                                          for row in record["rows"])
+
+                # Total calculations for progress bar: generations *
+                # population size
+                total_calculations = self.generations * self.population_size
+
+                # Progress bar to track genetic algorithm progress
+                with tqdm(total=total_calculations, initial=len(all_results),
+                          desc="Genetic Algorithm Progress",
+                          ncols=100) as pbar:
+                    # Run genetic algorithm and collect results for each
+                    # generation
+                    for gen in range(first_gen, N_generations + 1):
+                        if stop_reason is not None:
+                            print(f"Run stopped early: {stop_reason}")
+                            break
+
+                        parents = population
+                        population = algorithms.varAnd(population, toolbox,
+                                                       cxpb=0.7, mutpb=0.3)
+                        if self.snap_to_steps:
+                            for ind in population:
+                                self.snap_individual(ind, min_values,
+                                                     max_values, steps)
+                        unevaluated = [
+                            idx for idx, ind in enumerate(population)
+                            if not ind.fitness.valid]
+                        solved = self.select_for_fea(
+                            population, all_results,
+                            constraint_names_with_units, min_values,
+                            max_values)
+                        # Fitness from the surrogate only
+                        predicted = sorted(set(unevaluated) - set(solved))
+
+                        # Identical offspring are solved once, and the result
+                        # is fanned out to each of them
+                        duplicates = {}
+                        for idx in solved:
+                            duplicates.setdefault(
+                                tuple(population[idx]), []).append(idx)
+                        unique_fitnesses = toolbox.map(
+                            toolbox.evaluate,
+                            [population[idxs[0]]
+                             for idxs in duplicates.values()])
+                        fitness_of = {
+                            idx: fit
+                            for idxs, fit in zip(duplicates.values(),
+                                                 unique_fitnesses)
+                            for idx in idxs}
+                        solved_fitnesses = [fitness_of[idx] for idx in solved]
+
+                        # Assign fitness to individuals after the evaluation
+                        for idx, fit in zip(solved, solved_fitnesses):
+                            population[idx].fitness.values = fit
+                        fitnesses = [ind.fitness.values for ind in population]
+                        # Offspring screened out by the surrogate
+                        pbar.update(len(population) - len(solved))
+
+                        generation_results = []
+                        for ind, fitness in zip(
+                                [population[idx] for idx in solved],
+                                solved_fitnesses):
+                            # Collect individual's data and add generation
+                            # info
+                            individual_data = {
+                                constraint_names_with_units[i]: val
+                                for i, val in enumerate(ind)}
+                            for column, value in zip(objective_columns,
+                                                     fitness):
+                                individual_data[column] = value
+                            individual_data['generation'] = f'gen {gen}'
+
+                            # Add this individual's data to the generation
+                            # results list
+                            generation_results.append(individual_data)
+
+                            # Update the progress bar for each individual
+                            # evaluated
+                            pbar.update(1)
+
+                        # Append generation results to the all_results store,
+                        # and to the results file
+                        all_results.extend(generation_results)
+                        generation_records.append({
+                            "generation": gen,
+                            "rows": generation_results,
+                            "population": [list(ind) for ind in population],
+                            "fitnesses": [list(fit) for fit in fitnesses],
+                            "predicted": predicted,
+                        })
+                        result_log.append(generation_records[-1])
+
+                        stop_reason = self.check_stopping(
+                            population, all_results, min_values, max_values)
+
+                        if self.multi_objective:
+                            pareto_archive.update(generation_results)
+
+                        # Select the next generation
+                        population = self.select_next_generation(
+                            toolbox, parents, population, predicted)
+
+                        # Checkpoint the evolutionary state, so a restart
+                        # continues bit-identically. The solves themselves
+                        # are in the results log, which is synced first so it
+                        # covers the checkpoint
+                        if self.checkpoint_every and (
+                                gen % self.checkpoint_every == 0
+                                or gen == N_generations
+                                or stop_reason is not None):
+                            result_log.sync()
+                            save_checkpoint(checkpoint_file, {
+                                "generation": gen,
+                                "population": [list(ind)
+                                               for ind in population],
+                                "fitnesses": [list(ind.fitness.values)
+                                              for ind in population],
+                            })
+
+            result_log.close()
+            if result_cache is not None:
+                print(f"Result cache: {result_cache.stats()}")
+            all_results = all_results.to_dataframe()
+            if 'birth' in all_results.columns:
+                # Numeric columns are stored as floats
+                all_results['birth'] = all_results['birth'].astype(int)
+
+            # Move the objective columns to the last positions,
+            # 'vonMises [MPa]' last
+            objective_order = objective_columns[1:] + ['vonMises [MPa]']
+            cols = [col for col in all_results.columns
+                    if col not in objective_order] + objective_order
+            all_results = all_results.reindex(columns=cols)
+
+            # Create a folder for results if it doesn't exist
+            if not os.path.exists(results_folder):
+                os.makedirs(results_folder)
+
+            # Save results to CSV
+            all_results.to_csv(path.join(results_folder, "ga_results.csv"),
+                               index=False)
+
+            print(f"Results saved to "
+                  f"{path.join(results_folder, 'ga_results.csv')}")
+
+            if self.multi_objective:
+                front_file = path.join(results_folder, "ga_pareto_front.csv")
+                pareto_front = pareto_archive.to_dataframe().reindex(
+                    columns=cols)
+                pareto_front.to_csv(front_file, index=False)
+                print(f"Pareto front of {len(pareto_front)} designs saved to "
+                      f"{front_file}")
+
+            # Find the row with the minimum von Mises stress, among the
+            # successful solves
+            solved = all_results[np.isfinite(all_results['vonMises [MPa]'])]
+            if solved.empty:
+                print("No successful solve, no best model to save.")
+                return
+            best_row = solved.loc[solved['vonMises [MPa]'].idxmin()]
+
+            # Extract the best values from the row, only the variables, not
+            # the objectives
+            best_values = best_row[constraint_names_with_units].values
+
+            # Save the best model with a dynamic filename
+            self.save_best_model(doc, best_values, constraint_names_with_units)
+
+            print("Run all analysis completed, results saved, and best model "
+                  "saved.")
+        finally:
+            # Release the workers even if the run fails, after the best model
+            # is saved
+            result_log.close()
+            self.evaluator_pool.close()
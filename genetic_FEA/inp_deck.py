@@ -0,0 +1,97 @@
+"""Provides in-place edits of the CalculiX input deck written by FreeCAD, so
+    that a load change doesn't need the whole deck (mesh included) written
+    again.
+"""
+from .loghandler import logger
+
+# data line field holding the load magnitude, for each keyword that can be
+# scaled
+SCALABLE_KEYWORDS = {
+    "*CLOAD": 2,  # node, dof, value
+    "*DLOAD": 2,  # element set, load type (P, GRAV...), value
+}
+
+
+class InputDeck:
+    """CalculiX .inp file, as written by FreeCAD's ccx writer"""
+
+    def __init__(self, filename: str) -> None:
+        """reads the deck
+
+        Args:
+            filename (str): path to the .inp file
+        """
+        self.filename = filename
+        with open(filename, "r", encoding="utf8") as f:
+            self.lines = f.readlines()
+
+    def scale_section(self, label: str, ratio: float, other_labels=()) -> bool:
+        """multiplies the load values written for a FEM constraint by ratio.
+        Loads are linear in the constraint's magnitude (e.g. the nodal forces
+        of a ConstraintForce), so this gives the same deck as writing it again
+        with the magnitude changed by the same ratio
+
+        Args:
+            label (str): label of the constraint object. FreeCAD writes it as a
+                "** <label>" comment at the start of the constraint's data
+            ratio (float): new magnitude / old magnitude
+            ?other_labels (iterable of str): labels of the other objects of
+                the analysis, which mark the end of this constraint's data
+
+        Returns:
+            bool: False if no scalable load was found for the constraint
+        """
+        header = f"** {label}"
+        end_markers = {
+            f"** {other}" for other in other_labels if other != label
+        }
+        n_scaled = 0
+
+        # the label also heads the constraint's node/element sets, which have
+        # nothing to scale, so every block it heads is visited
+        starts = [
+            i for (i, line) in enumerate(self.lines) if line.strip() == header
+        ]
+        for start in starts:
+            # the ccx writer puts the label either before or right after the
+            # keyword line (e.g. "*CLOAD" then "** ConstraintForce")
+            field = None
+            for i in range(start - 1, -1, -1):
+                line = self.lines[i].strip()
+                if _is_separator(line):
+                    break
+                if not line.startswith("**"):
+                    if line.startswith("*"):
+                        keyword = line.split(",")[0].upper()
+                        field = SCALABLE_KEYWORDS.get(keyword)
+                    break
+            for i in range(start + 1, len(self.lines)):
+                line = self.lines[i].strip()
+                if _is_separator(line) or line in end_markers:
+                    # start of the next section or of the next constraint
+                    break
+                if line.startswith("**") or line == "":
+                    continue
+                if line.startswith("*"):
+                    field = SCALABLE_KEYWORDS.get(line.split(",")[0].upper())
+                    continue
+                if field is None:
+                    continue
+
+                values = line.split(",")
+                values[field] = f"{float(values[field]) * ratio:.13G}"
+                self.lines[i] = ",".join(values) + "\n"
+                n_scaled += 1
+
+        logger.debug(f"Scaled {n_scaled} load values of {label} by {ratio}")
+        return n_scaled > 0
+
+    def save(self):
+        """writes the deck back to its file"""
+        with open(self.filename, "w", encoding="utf8") as f:
+            f.writelines(self.lines)
+
+
+def _is_separator(line: str) -> bool:
+    # the ccx writer separates the sections of the deck with a line of stars
+    return line.startswith("***") and set(line) == {"*"}
@@ -0,0 +1,733 @@
+"""Provides a coordinator/worker mode, so the test cases of a sweep or the
+    offspring of a GA can be solved on several machines. The coordinator puts
+    jobs (the hash of the model plus a parameter vector) in a queue folder
+    shared by all the nodes, e.g. on a network drive, and stateless workers
+    started on any node take the jobs, solve them on their own copy of the
+    model and put back the reduced outputs.
+
+    Jobs are taken with an atomic rename, and a worker holds a lease on its job
+    for as long as it keeps renewing it. Jobs of a worker that dies are put
+    back in the queue once their lease expires, and given up after
+    max_attempts tries. The coordinator times the leases with its own clock,
+    from when it sees a renewal, so the clocks of the nodes don't have to
+    agree.
+
+    Start a worker on each node with:
+
+        python -m FreecadParametricFEA.job_queue QUEUE_FOLDER MODEL_FILE
+
+    The queue folder is served by one coordinator at a time. Jobs and results
+    are pickled, so the folder must only be writable by trusted users.
+"""
+import argparse
+import contextlib
+import functools
+import hashlib
+import itertools
+import multiprocessing
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+from .solver_backend import RetryPolicy, SolverBackend, SolverCancelledError
+from .worker_pool import ModelEvaluator, _as_dict
+from .loghandler import logger
+
+JOB_STATES = ("pending", "leased", "done")
+
+
+class JobLostError(RuntimeError):
+    """raised when a job's lease expired on every one of its attempts"""
+
+
+def model_hash(filename: str) -> str:
+    """
+    Args:
+        filename (str): path to the model file
+
+    Returns:
+        str: sha256 of the file contents, so the workers can check that they
+            solve the same model as the coordinator
+    """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class FileJobQueue:
+    """Job queue in a folder, with a sub-folder for each state of a job:
+    pending/ (waiting for a worker), leased/ (being solved) and done/ (results
+    waiting for the coordinator). Every change of state is an atomic rename,
+    so several workers on several nodes can share the folder without locks
+    """
+
+    def __init__(self, queue_dir: str) -> None:
+        """
+        Args:
+            queue_dir (str): folder shared by the coordinator and the workers.
+                Created if it doesn't exist
+        """
+        self.queue_dir = queue_dir
+        for state in JOB_STATES:
+            os.makedirs(os.path.join(queue_dir, state), exist_ok=True)
+        # leased job id -> (mtime of its file, time.monotonic() when this
+        # process first saw that mtime), see expired_leases()
+        self._lease_renewals = {}
+
+    def _path(self, state: str, job_id: str) -> str:
+        return os.path.join(self.queue_dir, state, f"{job_id}.pkl")
+
+    def _write(self, filename: str, obj):
+        # written next to the target and renamed, so readers never see a
+        # partial file
+        temp_filename = f"{filename}.{socket.gethostname()}.{os.getpid()}.tmp"
+        try:
+            with open(temp_filename, "wb") as f:
+                pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_filename, filename)
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    def _job_ids(self, state: str) -> List[str]:
+        return sorted(
+            name[: -len(".pkl")]
+            for name in os.listdir(os.path.join(self.queue_dir, state))
+            if name.endswith(".pkl")
+        )
+
+    def clear(self):
+        """removes every job and result, e.g. those left over by a coordinator
+        that crashed, and any request to stop the workers"""
+        for state in JOB_STATES:
+            for job_id in self._job_ids(state):
+                self._remove(state, job_id)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.queue_dir, "stop"))
+
+    def _remove(self, state: str, job_id: str) -> bool:
+        try:
+            os.remove(self._path(state, job_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def publish_study(self, study: dict):
+        """sets what the workers solve: the model hash, variables, outputs and
+        solver settings. Replaces the previous study"""
+        self._write(os.path.join(self.queue_dir, "study.pkl"), study)
+
+    def read_study(self) -> Optional[dict]:
+        """
+        Returns:
+            dict or None: the current study, None if none was published
+        """
+        try:
+            with open(os.path.join(self.queue_dir, "study.pkl"), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, job: dict):
+        """adds a job to the queue
+
+        Args:
+            job (dict): the job, with a unique "id"
+        """
+        self._write(self._path("pending", job["id"]), job)
+
+    def lease(self) -> Optional[dict]:
+        """takes the oldest pending job. Its lease has to be renewed with
+        renew() more often than the coordinator's lease time
+
+        Returns:
+            dict or None: the job, None if no job is pending
+        """
+        for job_id in self._job_ids("pending"):
+            try:
+                # touched before it is leased, so the lease never shows the
+                # time the job was queued
+                os.utime(self._path("pending", job_id))
+                os.rename(
+                    self._path("pending", job_id), self._path("leased", job_id)
+                )
+            except OSError:
+                continue  # taken by another worker in the meantime
+            with open(self._path("leased", job_id), "rb") as f:
+                return pickle.load(f)
+        return None
+
+    def renew(self, job_id: str) -> bool:
+        """extends the lease of a job
+
+        Returns:
+            bool: False if the lease was lost, i.e. the job was put back in
+                the queue or given up
+        """
+        try:
+            os.utime(self._path("leased", job_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def release(self, job_id: str) -> bool:
+        """puts a leased job back in the queue
+
+        Returns:
+            bool: False if the job was no longer leased
+        """
+        try:
+            os.rename(
+                self._path("leased", job_id), self._path("pending", job_id)
+            )
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, job_id: str, result: dict):
+        """stores the result of a leased job and ends its lease
+
+        Args:
+            job_id (str): id of the job
+            result (dict): "result" is the return value of the job, "error"
+                the exception it raised, if any
+        """
+        self._write(self._path("done", job_id), result)
+        self._remove("leased", job_id)
+
+    def discard(self, job_id: str):
+        """removes a job, in whatever state it is"""
+        for state in JOB_STATES:
+            self._remove(state, job_id)
+
+    def expired_leases(self, lease_time: float) -> List[str]:
+        """finds the leases that were not renewed for lease_time. A renewal
+        is timed from when this process first sees the job's mtime change,
+        not from the mtime itself, which is written by the worker's clock
+
+        Args:
+            lease_time (float): max time since the last renewal [s]
+
+        Returns:
+            list of str: ids of the leased jobs whose lease has expired
+        """
+        expired = []
+        now = time.monotonic()
+        renewals = {}
+        for job_id in self._job_ids("leased"):
+            try:
+                mtime = os.stat(self._path("leased", job_id)).st_mtime_ns
+            except FileNotFoundError:
+                continue  # completed in the meantime
+            (last_mtime, seen_at) = self._lease_renewals.get(
+                job_id, (None, now)
+            )
+            if mtime != last_mtime:
+                seen_at = now  # renewed since the last check
+            renewals[job_id] = (mtime, seen_at)
+            if now - seen_at > lease_time:
+                expired.append(job_id)
+        self._lease_renewals = renewals
+        return expired
+
+    def collect(self) -> Iterator:
+        """takes the available results out of the queue
+
+        Yields:
+            tuple: (job id, result dict), see complete()
+        """
+        for job_id in self._job_ids("done"):
+            try:
+                with open(self._path("done", job_id), "rb") as f:
+                    result = pickle.load(f)
+            except FileNotFoundError:
+                continue
+            self._remove("done", job_id)
+            yield job_id, result
+
+    def stop_workers(self):
+        """asks the workers to exit once their current job is done"""
+        with open(os.path.join(self.queue_dir, "stop"), "w"):
+            pass
+
+    def stop_requested(self) -> bool:
+        return os.path.exists(os.path.join(self.queue_dir, "stop"))
+
+
+class QueueEvaluatorPool:
+    """Coordinator side of the job queue. Has the same interface as
+    worker_pool.EvaluatorPool, so it can be used wherever a pool is, but the
+    items are solved by the workers watching the queue folder, on any node
+    """
+
+    def __init__(
+        self,
+        queue_dir: str,
+        model_file: Union[str, SolverBackend],
+        variables: list,
+        outputs: list,
+        n_workers: int = 1,
+        fea_results_name: str = "CCX_Results",
+        solver_name: str = "SolverCcxTools",
+        solver_timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        lease_time: float = 60.0,
+        max_attempts: int = 3,
+        poll_interval: float = 0.2,
+    ) -> None:
+        """publishes the study to the queue folder, and clears the jobs left
+        in it
+
+        Args:
+            queue_dir (str): folder shared with the workers
+            model_file (str or SolverBackend): the model the workers must
+                solve. Only its hash is sent, each worker opens its own copy
+            variables (list of Variable or dict): variables, in the order their
+                values will be passed to the pool
+            outputs (list of Output or dict): outputs to extract from each
+                analysis
+            ?n_workers (int): number of items kept in flight by callers that
+                submit() one item at a time. Defaults to 1
+            ?fea_results_name (str): name of the results object in the document
+            ?solver_name (str): name of the solver object in the document
+            ?solver_timeout (float): max time for each CalculiX run [s].
+                Defaults to None (no timeout)
+            ?retry_policy (RetryPolicy): which failed solves the workers run
+                again. Defaults to RetryPolicy()
+            ?lease_time (float): time after which the job of a worker that
+                stopped renewing its lease is put back in the queue [s].
+                Defaults to 60
+            ?max_attempts (int): number of leases a job gets before it is
+                given up with JobLostError. Defaults to 3
+            ?poll_interval (float): time between checks of the queue folder
+                [s]. Defaults to 0.2
+        """
+        self.n_workers = max(1, n_workers)
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        filename = (
+            model_file if isinstance(model_file, str) else model_file.filename
+        )
+
+        self.queue = FileJobQueue(queue_dir)
+        self.queue.clear()
+        self.study = {
+            "id": uuid.uuid4().hex[:12],
+            "model_hash": model_hash(filename),
+            "model_name": os.path.basename(filename),
+            "variables": [_as_dict(var) for var in variables],
+            "outputs": [_as_dict(output) for output in outputs],
+            "fea_results_name": fea_results_name,
+            "solver_name": solver_name,
+            "solver_timeout": solver_timeout,
+            "retry_policy": retry_policy,
+            "lease_time": lease_time,
+        }
+        self.queue.publish_study(self.study)
+
+        self._job_numbers = itertools.count()
+        self._jobs = {}  # job id -> job, for the jobs without a result yet
+        self._finished = {}  # job id -> (result, error), not yet returned
+        self._submitted = {}  # job id -> key, of the items sent with submit()
+        self._cancelled = threading.Event()
+        # Submitted items whose result hasn't been collected yet
+        self.n_pending = 0
+        logger.info(
+            f"Published study {self.study['id']} for {filename} to "
+            f"{queue_dir}"
+        )
+
+    def _put(self, func: Callable, item) -> str:
+        job_id = f"{self.study['id']}-{next(self._job_numbers):08d}"
+        job = {
+            "id": job_id,
+            "study": self.study["id"],
+            "model_hash": self.study["model_hash"],
+            "func": func,
+            "parameters": list(item),
+            "attempt": 1,
+        }
+        self._jobs[job_id] = job
+        self.queue.put(job)
+        return job_id
+
+    def _poll(self):
+        # moves the results in the queue folder to self._finished, and puts
+        # back the jobs of dead workers
+        if self._cancelled.is_set():
+            raise SolverCancelledError("Job queue cancelled")
+        found = False
+        for (job_id, result) in self.queue.collect():
+            if self._jobs.pop(job_id, None) is None:
+                continue  # a late duplicate of a job that was put back
+            self._finished[job_id] = (result["result"], result["error"])
+            found = True
+
+        for job_id in self.queue.expired_leases(self.lease_time):
+            job = self._jobs.get(job_id)
+            if job is None:
+                self.queue.discard(job_id)
+            elif job["attempt"] >= self.max_attempts:
+                self.queue.discard(job_id)
+                del self._jobs[job_id]
+                self._finished[job_id] = (
+                    None,
+                    JobLostError(
+                        f"Job {job_id} lost by the workers {job['attempt']} "
+                        f"times"
+                    ),
+                )
+                logger.error(
+                    f"Gave up job {job_id} after {job['attempt']} expired "
+                    f"leases"
+                )
+                found = True
+            elif self.queue.release(job_id):
+                job["attempt"] += 1
+                logger.warning(
+                    f"Lease of job {job_id} expired, put back in the queue "
+                    f"(attempt {job['attempt']}/{self.max_attempts})"
+                )
+
+        if not found:
+            time.sleep(self.poll_interval)
+
+    def _result(self, job_id: str):
+        (result, error) = self._finished.pop(job_id)
+        if error is not None:
+            raise error
+        return result
+
+    def evaluate(self, parameter_values: list) -> dict:
+        """evaluates a single parameter set on one of the workers
+
+        Args:
+            parameter_values (list): one value per variable
+
+        Returns:
+            dict: the results of the test case, see ModelEvaluator.evaluate()
+        """
+        return next(self.imap(ModelEvaluator.evaluate, [parameter_values]))
+
+    def imap(
+        self, func: Callable, iterable: Iterable, chunksize: int = 1
+    ) -> Iterator:
+        """queues all the items, and calls func(evaluator, item) on each of
+        them on the workers
+
+        Args:
+            func (callable): function taking the worker's ModelEvaluator and a
+                parameter vector, e.g. ModelEvaluator.evaluate. Must be
+                importable on the workers (i.e. defined at module or class
+                level)
+            iterable (iterable): parameter vectors, sent to the workers as
+                plain lists
+            ?chunksize (int): unused, each item is a job of its own
+
+        Yields:
+            the results of func, in the same order as the input
+        """
+        job_ids = [self._put(func, item) for item in iterable]
+        for job_id in job_ids:
+            while job_id not in self._finished:
+                self._poll()
+            yield self._result(job_id)
+
+    def map(
+        self, func: Callable, iterable: Iterable, chunksize: int = 1
+    ) -> List:
+        """same as imap(), but waits for all the results. Has the same
+        signature as the builtin map, so it can be registered as DEAP's
+        toolbox.map
+
+        Returns:
+            list: the results of func, in the same order as the input
+        """
+        return list(self.imap(func, iterable, chunksize))
+
+    def submit(self, func: Callable, item, key=None):
+        """queues a single item, without waiting for its result, which is
+        collected with next_completed()
+
+        Args:
+            func (callable): function taking the worker's ModelEvaluator and
+                the item, see imap()
+            item: parameter vector to evaluate
+            ?key: returned with the result, to tell the submissions apart.
+                Defaults to None
+        """
+        self._submitted[self._put(func, item)] = key
+        self.n_pending += 1
+
+    def next_completed(self, poll_interval: float = 0.1) -> tuple:
+        """waits for whichever submitted item finishes first
+
+        Raises:
+            SolverCancelledError: if the pool is cancelled while waiting
+            JobLostError: if the item's job was given up
+            Exception: the error raised by func on the item, if any
+
+        Returns:
+            tuple: (key, result of func) of the finished item
+        """
+        if self.n_pending == 0:
+            raise RuntimeError("No submitted item to wait for")
+        while True:
+            job_id = next(
+                (
+                    job_id
+                    for job_id in self._finished
+                    if job_id in self._submitted
+                ),
+                None,
+            )
+            if job_id is not None:
+                break
+            self._poll()
+        self.n_pending -= 1
+        key = self._submitted.pop(job_id)
+        return key, self._result(job_id)
+
+    def cancel(self):
+        """removes the queued jobs. Jobs already leased are finished by their
+        workers, but their results are ignored. Can be called from another
+        thread: pending map() calls raise SolverCancelledError. The pool can't
+        be used afterwards
+        """
+        self._cancelled.set()
+        self._discard_jobs()
+        logger.warning("Job queue cancelled")
+
+    def _discard_jobs(self):
+        for job_id in list(self._jobs):
+            self.queue.discard(job_id)
+        self._jobs = {}
+
+    def close(self):
+        """removes the jobs still in the queue. The workers keep running, for
+        the next study"""
+        self._discard_jobs()
+        logger.debug(f"Study {self.study['id']} closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _renew_lease(
+    job_queue: FileJobQueue,
+    job_id: str,
+    interval: float,
+    done: threading.Event,
+):
+    while not done.wait(interval):
+        if not job_queue.renew(job_id):
+            logger.warning(f"Lost the lease of job {job_id}")
+            return
+
+
+def run_worker(
+    queue_dir: str,
+    model_file: Union[str, SolverBackend],
+    freecad_path: str = "",
+    scratch_dir: str = "",
+    poll_interval: float = 1.0,
+    idle_timeout: Optional[float] = None,
+) -> int:
+    """takes jobs from the queue folder and solves them until stopped. The
+    worker keeps no state of its own: it opens the model for each new study,
+    and its results are all in the queue folder
+
+    Args:
+        queue_dir (str): folder shared with the coordinator
+        model_file (str or SolverBackend): this node's copy of the FreeCAD
+            model file (.fcstd), or a solver backend object. Must be identical
+            to the coordinator's model
+        ?freecad_path (str): path to the FreeCAD Python libraries
+        ?scratch_dir (str): parent folder for the CalculiX working directory.
+            Defaults to the system temp folder
+        ?poll_interval (float): time between checks of an empty queue [s].
+            Defaults to 1
+        ?idle_timeout (float): exit after this time without any job [s].
+            Defaults to None (run until FileJobQueue.stop_workers())
+
+    Raises:
+        ValueError: if the local model differs from the coordinator's
+
+    Returns:
+        int: number of jobs solved
+    """
+    job_queue = FileJobQueue(queue_dir)
+    filename = (
+        model_file if isinstance(model_file, str) else model_file.filename
+    )
+    local_hash = model_hash(filename)
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    study = None
+    evaluator = None
+    n_jobs = 0
+    idle_since = time.perf_counter()
+    logger.info(f"Worker {worker_name} watching {queue_dir}")
+
+    try:
+        while not job_queue.stop_requested():
+            job = job_queue.lease()
+            if job is None:
+                idle_time = time.perf_counter() - idle_since
+                if idle_timeout is not None and idle_time > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            if study is None or job["study"] != study["id"]:
+                study = job_queue.read_study()
+                if study is None or job["study"] != study["id"]:
+                    # left over from an older study
+                    job_queue.discard(job["id"])
+                    continue
+                if study["model_hash"] != local_hash:
+                    job_queue.release(job["id"])
+                    raise ValueError(
+                        f"{filename} differs from the model of study "
+                        f"{study['id']} "
+                        f"({study['model_name']})"
+                    )
+                if evaluator is not None:
+                    evaluator.close()
+                evaluator = ModelEvaluator(
+                    freecad_path,
+                    model_file,
+                    study["variables"],
+                    study["outputs"],
+                    study["fea_results_name"],
+                    study["solver_name"],
+                    study["solver_timeout"],
+                    scratch_dir,
+                    retry_policy=study["retry_policy"],
+                )
+                logger.info(f"Worker {worker_name} joined study {study['id']}")
+
+            lease_done = threading.Event()
+            heartbeat = threading.Thread(
+                target=_renew_lease,
+                args=(
+                    job_queue, job["id"], study["lease_time"] / 4, lease_done
+                ),
+                daemon=True,
+            )
+            heartbeat.start()
+            try:
+                result = {
+                    "result": job["func"](evaluator, job["parameters"]),
+                    "error": None,
+                }
+            except Exception as e:
+                logger.exception(f"Job {job['id']} failed")
+                result = {"result": None, "error": e}
+            finally:
+                lease_done.set()
+                heartbeat.join()
+            result["worker"] = worker_name
+            try:
+                job_queue.complete(job["id"], result)
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                error = RuntimeError(
+                    f"Result of job {job['id']} can't be sent back: {e}"
+                )
+                job_queue.complete(
+                    job["id"],
+                    {"result": None, "error": error, "worker": worker_name},
+                )
+            n_jobs += 1
+            idle_since = time.perf_counter()
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+    logger.info(f"Worker {worker_name} stopped after {n_jobs} jobs")
+    return n_jobs
+
+
+def start_local_workers(
+    queue_dir: str,
+    model_file: Union[str, SolverBackend],
+    n_workers: int,
+    **worker_args,
+) -> list:
+    """starts workers on this machine, e.g. to try the coordinator/worker
+    mode without a cluster. Stop them with FileJobQueue.stop_workers()
+
+    Args:
+        queue_dir (str): folder shared with the coordinator
+        model_file (str or SolverBackend): see run_worker()
+        n_workers (int): number of worker processes
+        **worker_args: passed to run_worker()
+
+    Returns:
+        list of multiprocessing.Process: the worker processes
+    """
+    workers = [
+        multiprocessing.Process(
+            target=functools.partial(
+                run_worker, queue_dir, model_file, **worker_args
+            ),
+            daemon=True,
+        )
+        for _ in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solves the jobs of a shared queue folder."
+    )
+    parser.add_argument("queue_dir", help="folder shared with the coordinator")
+    parser.add_argument(
+        "model_file", help="this node's copy of the FreeCAD model"
+    )
+    parser.add_argument(
+        "--freecad-path",
+        default="",
+        help="path to the FreeCAD Python libraries",
+    )
+    parser.add_argument(
+        "--scratch-dir",
+        default="",
+        help="parent folder for the CalculiX working directory",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="time between checks of an empty queue [s]",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        help="exit after this time without any job [s]",
+    )
+    args = parser.parse_args()
+    run_worker(
+        args.queue_dir,
+        args.model_file,
+        freecad_path=args.freecad_path,
+        scratch_dir=args.scratch_dir,
+        poll_interval=args.poll_interval,
+        idle_timeout=args.idle_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 
 # taken from https://guicommits.com/how-to-log-in-python-like-a-pro/
 ERROR_LOG_FILENAME = "./freecadparametricfea.log"
+# one JSON record per FEA test case, with the wall time of each phase
+TIMINGS_LOG_FILENAME = "./freecadparametricfea_timings.jsonl"
 
 LOGGING_CONFIG = {
     "version": 1,
@@ -25,6 +27,13 @@
             "filename": ERROR_LOG_FILENAME,
             "backupCount": 2,
         },
+        "timings_file": {
+            "formatter": "simple",
+            "level": "INFO",
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": TIMINGS_LOG_FILENAME,
+            "backupCount": 2,
+        },
         "verbose_output": {  # The handler name
             "formatter": "simple",  # Refer to the formatter defined above
             "level": "DEBUG",  # FILTER: All logs
@@ -39,8 +48,16 @@
                 "logfile",  # Refer the handler defined above
             ],
         },
+        "FreecadParametricFEA.timings": {
+            "level": "INFO",
+            "handlers": [
+                "timings_file",
+            ],
+            "propagate": False,  # keep the JSON records out of the main log
+        },
     },
 }
 
 logging.config.dictConfig(LOGGING_CONFIG)
 logger = logging.getLogger(__name__)
+timings_logger = logging.getLogger("FreecadParametricFEA.timings")
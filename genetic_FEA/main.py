@@ -2,6 +2,7 @@
 import os
 from FreecadParametricFEA.run_all import RunAllAnalysis
 from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+from FreecadParametricFEA.bayesian_optimisation import BayesianOptimisation
 
 FREECAD_PATH = "C:/Program Files/FreeCAD 0.21/bin"
 script_dir = os.path.dirname(os.path.realpath(__file__))  # Get the directory of the current script
@@ -10,7 +11,8 @@
 import FreeCAD
 
 def main():
-    method = input("Choose the method (1 for RunAll, 2 for GeneticAlgorithm): ")
+    method = input("Choose the method (1 for RunAll, 2 for GeneticAlgorithm, "
+                   "3 for BayesianOptimisation): ")
 
     if method == "1":
         analysis = RunAllAnalysis(FREECAD_PATH, FreeCad_Model)
@@ -18,6 +20,10 @@ def main():
     elif method == "2":
         analysis = GeneticAlgorithm(FREECAD_PATH, FreeCad_Model, population_size=20, generations=20)
         analysis.run()
+    elif method == "3":
+        analysis = BayesianOptimisation(FREECAD_PATH, FreeCad_Model,
+                                        n_evaluations=60, n_initial=12)
+        analysis.run()
     else:
         print("Invalid method chosen.")
 
@@ -7,7 +7,9 @@ def __init__(self, output_var, reduction_fun):
 
         Parameters:
         - output_var (str): The name of the output variable.
-        - reduction_fun (callable): The function to reduce the output (e.g., np.max).
+        - reduction_fun (callable): The function to reduce the output (e.g.,
+          np.max). The builtin max/min and their NumPy equivalents are all
+          computed by NumPy.
         """
         self.output_var = output_var
         self.reduction_fun = reduction_fun
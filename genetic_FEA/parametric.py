@@ -1,8 +1,10 @@
 """Provides a FreecadParametricFEA class to handle higher level parametric FEA functions,
     such as handling parameters and displaying results.
 """
+import json
+import os
 import time
-from typing import Union
+from typing import Optional, Union
 from os import path
 import pandas as pd
 import numpy as np
@@ -14,7 +16,49 @@
 import plotly.express as px
 
 from .freecadmodel import FreecadModel
-from .loghandler import logger
+from .solver_backend import (
+    TIMEOUT,
+    RetryPolicy,
+    SolverBackend,
+    SolverFailure,
+    SolverTimeoutError,
+)
+from .reductions import ResultFields, reduce_outputs
+from .result_cache import ResultCache
+from .result_log import ResultLog
+from .result_store import ResultStore
+from .case_matrix import CaseMatrix
+from .loghandler import logger, timings_logger
+
+# phases timed for each test case, each stored in a "Time_<phase>" column [s]
+TIMING_PHASES = (
+    "apply_parameters",
+    "recompute",
+    "mesh",
+    "setup",
+    "prerequisites",
+    "write_input",
+    "solve",
+    "load_results",
+    "reduction",
+)
+
+
+def output_heading(output: dict) -> str:
+    """name of the results column holding an output
+
+    Args:
+        output (dict): output as given to parametric.set_outputs()
+
+    Returns:
+        str: "<column_label or reduction function>(<output_var>)"
+    """
+    if "column_label" in output.keys():
+        col_name = output["column_label"]
+    else:
+        col_name = output["reduction_fun"].__qualname__
+
+    return f"{col_name}({output['output_var']})"
 
 
 class parametric:
@@ -36,23 +80,37 @@ def __init__(self, freecad_path: str = "") -> None:
 
         self.freecad_path = freecad_path
 
-        self.results_dataframe = pd.DataFrame()
+        self.case_matrix = CaseMatrix([])
+        self.results_store = ResultStore()
+        self.result_cache = None
+        self.retry_policy = RetryPolicy()
+        self._result_log = None
 
         # initialise output headings to defaults
         self.set_outputs()
 
-    def set_model(self, freecad_document: Union[str, FreecadModel]):
+    @property
+    def results_dataframe(self) -> pd.DataFrame:
+        """results of the last sweep, built from self.results_store"""
+        return self.results_store.to_dataframe()
+
+    @results_dataframe.setter
+    def results_dataframe(self, df: pd.DataFrame):
+        self.results_store = ResultStore.from_dataframe(df)
+
+    def set_model(self, freecad_document: Union[str, SolverBackend]):
         """opens the freecad document and loads it
 
         Args:
-            freecad_document (str or FreecadModel): path to the
-                FreeCAD document, or a FreecadModel object
+            freecad_document (str or SolverBackend): path to the FreeCAD
+                document, or a solver backend object (e.g. a FreecadModel, or
+                a StubBackend to run without FreeCAD)
         """
         if isinstance(freecad_document, str):
             self.freecad_document = FreecadModel(
                 document_path=freecad_document, freecad_path=self.freecad_path
             )
-        elif isinstance(freecad_document, FreecadModel):
+        elif isinstance(freecad_document, SolverBackend):
             self.freecad_document = freecad_document
 
         logger.info(f"FreeCAD document {freecad_document} loaded successfully")
@@ -66,6 +124,9 @@ def set_variables(self, variables: list):
                 "object_name" (str): the object where the constraint is in,
                 "constraint_name" (str): the name of the constraint to modify
                 "constraint_values" (list of values):  values that the variable can assume
+                ?"geometric" (bool): False if the variable doesn't change the
+                    geometry (e.g. a load magnitude), so the mesh can be
+                    reused. Defaults to True
         """
         self.variables = variables
 
@@ -78,7 +139,10 @@ def set_outputs(self, outputs: list = []):
                 "output_var" (str): the output variable (must be available in
                     the freecad fea results object),
                 "reduction_fun" (function handle): a handle to the data
-                    reduction function (e.g. np.max)
+                    reduction function (e.g. np.max). It is passed the field
+                    as a NumPy array. max, min, mean, median, norm and
+                    functools.partial(np.percentile, q=...) are computed by
+                    NumPy, whichever module the function comes from
                 ?"column_label" (str): (optional) label for the column.
                     Defaults to the function's __qualname__
         """
@@ -99,7 +163,13 @@ def set_outputs(self, outputs: list = []):
 
         logger.debug(f"Analysis outputs set to {self.outputs}")
 
-    def setup_fea(self, fea_results_name: str, solver_name: str):
+    def setup_fea(
+        self,
+        fea_results_name: str,
+        solver_name: str,
+        solver_timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
         """sets up the FEA analysis object
 
         Args:
@@ -107,9 +177,29 @@ def setup_fea(self, fea_results_name: str, solver_name: str):
                 e.g. CCX_Results
             solver_name (str): name of the solver object in the document
                 e.g. SolverCcxTools
+            ?solver_timeout (float): max time for each CalculiX run [s]. Cases
+                that time out are reported in the Msg column. Defaults to None
+                (no timeout)
+            ?retry_policy (RetryPolicy): which failed solves are run again.
+                Defaults to RetryPolicy(), which only retries transient
+                failures
         """
         self.freecad_document.fea_results_name = fea_results_name
         self.freecad_document.solver_name = solver_name
+        self.freecad_document.solver_timeout = solver_timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def set_result_cache(self, result_cache: Union[str, ResultCache, None]):
+        """sets a cache of FEA results. Test cases found in the cache are not
+        solved again
+
+        Args:
+            result_cache (str, ResultCache or None): path to the cache file, or
+                a ResultCache object. None disables caching
+        """
+        if isinstance(result_cache, str):
+            result_cache = ResultCache(result_cache)
+        self.result_cache = result_cache
 
     def run_parametric(
         self,
@@ -117,6 +207,13 @@ def run_parametric(
         export_results: bool = False,
         output_folder: str = "",
         quiet_mode: bool = False,
+        n_workers: int = 1,
+        results_file: str = "",
+        resume: bool = False,
+        sampling: str = "grid",
+        n_samples: int = 0,
+        seed: Optional[int] = None,
+        job_queue: str = "",
     ) -> pd.DataFrame:
         """runs the parametric sweep and returns the results
 
@@ -128,13 +225,31 @@ def run_parametric(
             ?output_folder (str): folder for results output
             ?quiet_mode (bool): suppresses all output.
                 Defaults to False
+            ?n_workers (int): number of worker processes. With more than one,
+                the test matrix is split in shards that run in parallel, each
+                worker on its own copy of the model. Defaults to 1
+            ?results_file (str): JSON Lines file each test case is appended
+                to as soon as it finishes. Defaults to "" (results are only
+                kept in memory)
+            ?resume (bool): reload the test cases already in results_file
+                and only run the others, e.g. after a crash. Defaults to False
+            ?sampling (str): how the test matrix is built. "grid" (default)
+                runs every combination of the variables' constraint_values;
+                "lhs", "sobol", "halton" and "random" draw n_samples test
+                cases between the min and max of each variable's values,
+                see sampling.sample_unit_cube()
+            ?n_samples (int): number of test cases of a sampled design
+            ?seed (int): seed of a sampled design, for repeatable runs (and
+                for resuming one). Defaults to None
+            ?job_queue (str): queue folder shared with workers on other nodes
+                (see job_queue.run_worker()), which then solve the test cases
+                instead of n_workers local processes. Defaults to "" (solved
+                on this machine)
 
         Returns:
             pd.DataFrame: Pandas dataframe containing the results
         """
-        # TODO: this should let the user choose the type of run
-        # e.g. "all" (full sampling), and other useful stuff like latin
-        # hypercube sampling, random sampling, adaptive sampling...
+        # TODO: adaptive sampling
 
         # change the target parameter in the CAD model.
         # as it stands it won't really support two parameters...
@@ -143,97 +258,502 @@ def run_parametric(
         #  - ran a single loop of all analyses over the dataframe
         #  - updated the dataframe?
 
-        self.results_dataframe = self.populate_test_dataframe(
-            self.variables, self.outputs
+        if job_queue and (dry_run or export_results):
+            raise ValueError(
+                "dry_run and export_results need the model on this machine, "
+                "not a job_queue"
+            )
+        if job_queue and self.result_cache is not None:
+            # the workers on the other nodes can't share this machine's cache
+            raise ValueError(
+                "A result cache can't be combined with a job_queue"
+            )
+
+        # the test matrix is decoded case by case, and only the cases that
+        # have run are stored
+        self.case_matrix = CaseMatrix(
+            self.variables, sampling=sampling, n_samples=n_samples, seed=seed
+        )
+        self.results_store = self._new_results_store(self.case_matrix)
+        logger.debug(
+            f"Test matrix of {len(self.case_matrix)} cases initialised"
         )
-        logger.debug("Results dataframe initialised")
+
+        pending = range(len(self.case_matrix))
+        self._result_log = None
+        if results_file != "":
+            self._result_log = ResultLog(results_file)
+            completed = self._reload_cases(
+                self._result_log.open(resume=resume)
+            )
+            if completed:
+                pending = [idx for idx in pending if idx not in completed]
 
         # iterate over all test cases
 
         if not quiet_mode:
-            pbar = tqdm(total=len(self.results_dataframe), desc="Running test cases")
-
-        for (test_case_idx, test_case_data) in self.results_dataframe.iterrows():
-            # change each parameter to the value specified in the pd column:
-            for parameter in self.variables:
-                df_heading = self._param_to_df_heading(parameter)
+            pbar = tqdm(
+                total=len(self.case_matrix),
+                initial=len(self.case_matrix) - len(pending),
+                desc="Running test cases",
+            )
 
-                self.freecad_document.change_parameter(
-                    object_name=parameter["object_name"],
-                    constraint_name=parameter["constraint_name"],
-                    target_value=test_case_data[df_heading],
+        try:
+            if job_queue:
+                self._run_queued(
+                    pending,
+                    job_queue,
+                    pbar=None if quiet_mode else pbar,  # type: ignore
                 )
-
-            # run (& time) the FEA
-            if not dry_run:
-                start_time = time.process_time()
-
-                try:
-                    fea_results_obj = self.freecad_document.run_fea()
-                    fea_runtime = time.process_time() - start_time
-                    logger.info(f"FEA test case {test_case_idx} ran in {fea_runtime}s")
-
-                    if self.outputs == []:
-                        self.set_outputs()
-                    for output in self.outputs:
-                        self.results_dataframe.loc[
-                            test_case_idx, self._output_to_df_heading(output)
-                        ] = output[  # type: ignore (looks like Pylance's fault)
-                            "reduction_fun"
-                        ](
-                            fea_results_obj.getPropertyByName(output["output_var"])
-                        )
-
-                    self.results_dataframe.loc[
-                        test_case_idx, "FEA_Runtime"
-                    ] = fea_runtime  # type: ignore (looks like Pylance's fault)
-
-                    # export if requested
-                    # TODO: try and join the VTK files together as frames
-                    if export_results:
-
-                        (folder, filename) = path.split(self.freecad_document.filename)
-                        (fn, _) = path.splitext(filename)
-
-                        if output_folder != "":
-                            folder = output_folder
-
-                        n = int(
-                            np.ceil(np.log10(len(self.results_dataframe) + 1))
-                        )  # number of digits for vtk file
-
-                        self.freecad_document.export_fea_results(
-                            filename=path.join(
-                                folder, f"FEA_{fn}_{test_case_idx:0{n}}.vtu"
-                            ),
-                            export_format="vtk",
-                        )
-
-                # TODO: may want to add runtime errors to the dataframe also
-                # when in dry run
-                except RuntimeError as e:
-                    self.results_dataframe.loc[
-                        test_case_idx, "Msg"
-                    ] = str(  # type:ignore (looks like Pylance's fault)
-                        e
+            elif n_workers > 1:
+                self._run_sharded(
+                    pending,
+                    n_workers=n_workers,
+                    pbar=None if quiet_mode else pbar,  # type: ignore
+                    dry_run=dry_run,
+                    export_results=export_results,
+                    output_folder=output_folder,
+                    n_cases=len(self.case_matrix),
+                )
+            else:
+                cases = self.case_matrix.cases(pending)
+                for (test_case_idx, parameter_values) in cases:
+                    case_results = self.run_case(
+                        parameter_values=parameter_values,
+                        test_case_idx=test_case_idx,
+                        dry_run=dry_run,
+                        export_results=export_results,
+                        output_folder=output_folder,
+                        n_cases=len(self.case_matrix),
+                    )
+                    self._store_case(
+                        test_case_idx, parameter_values, case_results
                     )
-                    logger.warning(f"Test case {test_case_idx} exited with error {e}")
 
-            if not quiet_mode:
-                pbar.update(1)  # type: ignore (only exists if quiet_mode is false)
+                    if not quiet_mode:
+                        # pbar only exists if quiet_mode is false
+                        pbar.update(1)  # type: ignore
+        finally:
+            if self._result_log is not None:
+                self._result_log.close()
 
         if not quiet_mode:
             pbar.close()  # type: ignore (only exists if quiet_mode is false)
 
+        self._log_cache_stats()
         return self.results_dataframe
 
-    def populate_test_dataframe(self, variables, outputs) -> pd.DataFrame:
+    def _new_results_store(self, case_matrix: CaseMatrix) -> ResultStore:
+        # same columns as populate_test_dataframe(), but no rows yet
+        columns = {
+            self._param_to_df_heading(parameter): case_matrix.dtype(count)
+            for (count, parameter) in enumerate(self.variables)
+        }
+        for output in self.outputs:
+            columns[self._output_to_df_heading(output)] = float
+        columns["Msg"] = object
+        columns["FEA_Runtime"] = float
+        columns["FEA_Retries"] = int
+        columns["FEA_Failures"] = object
+        for phase in TIMING_PHASES:
+            columns[self._timing_to_df_heading(phase)] = float
+        return ResultStore(columns, capacity=min(len(case_matrix), 1024))
+
+    def _store_case(
+        self, test_case_idx: int, parameter_values: list, case_results: dict
+    ):
+        # keeps the results in memory, and streams them to the results file
+        row = {
+            self._param_to_df_heading(parameter): value
+            for (parameter, value) in zip(self.variables, parameter_values)
+        }
+        row.update(case_results)
+        self.results_store.append(row, index=test_case_idx)
+        if self._result_log is not None:
+            self._result_log.append(
+                {
+                    "test_case": test_case_idx,
+                    "parameters": parameter_values,
+                    "results": case_results,
+                }
+            )
+
+    def _reload_cases(self, records: list) -> set:
+        """puts the results of a previous run back in the results store
+
+        Returns:
+            set: indices of the test cases reloaded
+        """
+        completed = set()
+        for record in records:
+            idx = record["test_case"]
+            # a record from a different test matrix is run again
+            if (
+                0 <= idx < len(self.case_matrix)
+                and idx not in completed
+                and np.allclose(record["parameters"], self.case_matrix[idx])
+            ):
+                row = {
+                    self._param_to_df_heading(parameter): value
+                    for (parameter, value) in zip(
+                        self.variables, self.case_matrix[idx]
+                    )
+                }
+                row.update(record["results"])
+                self.results_store.append(row, index=idx)
+                completed.add(idx)
+        logger.info(f"Reloaded {len(completed)} completed test cases")
+        return completed
+
+    def run_case(
+        self,
+        parameter_values: list,
+        test_case_idx: int = 0,
+        dry_run: bool = False,
+        export_results: bool = False,
+        output_folder: str = "",
+        n_cases: int = 0,
+    ) -> dict:
+        """runs a single test case on the open model and returns its results
+
+        Args:
+            parameter_values (list): one value per variable, in the same order
+                as self.variables
+            ?test_case_idx (int): index of the test case, used for logging and
+                for naming the exported files. Defaults to 0
+            ?dry_run (bool): only changes the parameters, doesn't run the FEA.
+                Defaults to False
+            ?export_results (bool): export results in .vtk format.
+                Defaults to False
+            ?output_folder (str): folder for results output
+            ?n_cases (int): total number of test cases, used to pad the
+                exported file names. Defaults to len(self.case_matrix)
+
+        Returns:
+            dict: output column headings mapped to their values, the wall time
+                of each phase in the "Time_<phase>" columns, plus
+                "FEA_Runtime", "Msg", "FEA_Retries" (number of solves run
+                again) and "FEA_Failures" (cause of each failed solve) if the
+                FEA was run
+        """
+        case_results = {}
+        self.freecad_document.reset_timings()
+        case_start_time = time.perf_counter()
+
+        if self.outputs == []:
+            self.set_outputs()
+
+        # cases exported to file need the actual solution in the model
+        use_cache = (
+            self.result_cache is not None
+            and not dry_run
+            and not export_results
+        )
+        if use_cache:
+            cache_key = self._cache_key(parameter_values)
+            cached_results = self.result_cache.get(cache_key)  # type: ignore
+            if cached_results is not None:
+                logger.info(
+                    f"FEA test case {test_case_idx} found in result cache"
+                )
+                cached_results["FEA_Runtime"] = 0
+                cached_results.update(
+                    self._record_timings(
+                        test_case_idx, "cached", case_start_time
+                    )
+                )
+                return cached_results
+
+        # change all the parameters to the values specified for this case:
+        parameters = {
+            (parameter["object_name"], parameter["constraint_name"]): value
+            for (parameter, value) in zip(self.variables, parameter_values)
+        }
+        non_geometric = self._non_geometric_parameters(self.variables)
+        self.freecad_document.apply_parameters(
+            parameters, non_geometric=non_geometric
+        )
+
+        if dry_run:
+            case_results.update(
+                self._record_timings(test_case_idx, "dry_run", case_start_time)
+            )
+            return case_results
+
+        # run (& time) the FEA. Wall time, as most of it is spent in CalculiX
+        start_time = time.perf_counter()
+        status = "error"
+        failures = []
+
+        try:
+            fea_results_obj = self._solve(parameters, non_geometric, failures)
+            fea_runtime = time.perf_counter() - start_time
+            logger.info(f"FEA test case {test_case_idx} ran in {fea_runtime}s")
+
+            reduction_start_time = time.perf_counter()
+            output_values = reduce_outputs(
+                self._result_fields(fea_results_obj), self.outputs
+            )
+            for (output, value) in zip(self.outputs, output_values):
+                case_results[self._output_to_df_heading(output)] = value
+            self.freecad_document.timings["reduction"] = (
+                time.perf_counter() - reduction_start_time
+            )
+
+            # results of perturbed parameters are not those of the case
+            if use_cache and not (failures and self.retry_policy.perturbation):
+                self.result_cache.put(cache_key, case_results)  # type: ignore
+
+            case_results["FEA_Runtime"] = fea_runtime
+
+            # export if requested
+            # TODO: try and join the VTK files together as frames
+            if export_results:
+
+                (folder, filename) = path.split(self.freecad_document.filename)
+                (fn, _) = path.splitext(filename)
+
+                if output_folder != "":
+                    folder = output_folder
+
+                if n_cases == 0:
+                    n_cases = len(self.case_matrix)
+                # number of digits for vtk file
+                n = int(np.ceil(np.log10(n_cases + 1)))
+
+                self.freecad_document.export_fea_results(
+                    filename=path.join(
+                        folder, f"FEA_{fn}_{test_case_idx:0{n}}.vtu"
+                    ),
+                    export_format="vtk",
+                )
+            status = "ok"
+
+        # TODO: may want to add runtime errors to the dataframe also
+        # when in dry run
+        except RuntimeError as e:
+            case_results["Msg"] = str(e)
+            logger.warning(f"Test case {test_case_idx} exited with error {e}")
+
+        # the failed attempts, and the solves that followed them
+        case_results["FEA_Retries"] = max(
+            len(failures) - (status == "error"), 0
+        )
+        case_results["FEA_Failures"] = ",".join(failures)
+        case_results.update(
+            self._record_timings(test_case_idx, status, case_start_time)
+        )
+        return case_results
+
+    def _solve(self, parameters: dict, non_geometric: set, failures: list):
+        """runs the FEA, and runs it again after the failures allowed by the
+        retry policy
+
+        Args:
+            parameters (dict): parameter values of the case, already applied
+                to the model
+            non_geometric (set): keys of parameters that don't affect the
+                geometry
+            failures (list): filled with the cause of each failed attempt
+
+        Raises:
+            SolverFailure: the failure of the last attempt
+            SolverTimeoutError: if CalculiX runs longer than the timeout
+
+        Returns:
+            the results object
+        """
+        while True:
+            try:
+                return self.freecad_document.run_fea()
+            except SolverTimeoutError:
+                failures.append(TIMEOUT)
+                raise
+            except SolverFailure as e:
+                failures.append(e.cause)
+                n_retries = len(failures) - 1
+                if not self.retry_policy.should_retry(e, n_retries):
+                    raise
+                delay = self.retry_policy.delay(n_retries)
+                logger.warning(
+                    f"FEA failed ({e.cause}), retry {n_retries + 1}/"
+                    f"{self.retry_policy.max_retries} in {delay:.1f}s"
+                )
+            time.sleep(delay)
+            if self.retry_policy.perturbation:
+                perturbed = self.retry_policy.perturb(parameters, n_retries)
+                logger.info(
+                    f"Retrying with the perturbed parameters {perturbed}"
+                )
+                self.freecad_document.apply_parameters(
+                    perturbed, non_geometric=non_geometric
+                )
+
+    def _result_fields(self, fea_results_obj) -> ResultFields:
+        # reuses the arrays already extracted by the model for this solve
+        fields = self.freecad_document.result_fields
+        if fields is None or fields.results_object is not fea_results_obj:
+            fields = ResultFields(fea_results_obj)
+        return fields
+
+    def _record_timings(
+        self, test_case_idx: int, status: str, case_start_time: float
+    ) -> dict:
+        """writes the phase timings of a test case to the timings log
+
+        Returns:
+            dict: the "Time_<phase>" columns of the test case
+        """
+        timings = self.freecad_document.timings
+        timings_logger.info(
+            json.dumps(
+                {
+                    "model": path.basename(self.freecad_document.filename),
+                    "test_case": int(test_case_idx),
+                    "pid": os.getpid(),
+                    "status": status,
+                    "wall_time": time.perf_counter() - case_start_time,
+                    **{
+                        phase: timings.get(phase, 0.0)
+                        for phase in TIMING_PHASES
+                    },
+                }
+            )
+        )
+        return {
+            self._timing_to_df_heading(phase): timings.get(phase, 0.0)
+            for phase in TIMING_PHASES
+        }
+
+    def _cache_key(self, parameter_values: list) -> str:
+        solver_settings = {
+            "solver_name": self.freecad_document.solver_name,
+            "fea_results_name": self.freecad_document.fea_results_name,
+        }
+        parameters = {
+            self._param_to_df_heading(parameter): value
+            for (parameter, value) in zip(self.variables, parameter_values)
+        }
+        return self.result_cache.make_key(  # type: ignore
+            model_file=self.freecad_document.filename,
+            solver_settings=solver_settings,
+            outputs=self.outputs,
+            parameters=parameters,
+            model_identity=self.freecad_document.model_identity(),
+        )
+
+    def _log_cache_stats(self):
+        if self.result_cache is not None:
+            stats = self.result_cache.stats()
+            logger.info(
+                f"Result cache: {stats['hits']} hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                f"{stats['entries']} entries"
+            )
+
+    def _run_sharded(
+        self,
+        pending,
+        n_workers: int,
+        pbar,
+        shards_per_worker: int = 4,
+        **case_args,
+    ):
+        # imported here, worker_pool depends on this module
+        from .worker_pool import EvaluatorPool, ModelEvaluator
+
+        if len(pending) == 0:
+            return
+
+        # a few shards per worker, so that workers that get the faster cases
+        # don't sit idle at the end of the sweep. Shards only hold the case
+        # numbers, the workers decode the parameter values themselves
+        shard_size = int(
+            np.ceil(len(pending) / (n_workers * shards_per_worker))
+        )
+        shards = [
+            dict(
+                case_matrix=self.case_matrix,
+                case_indices=pending[i:i + shard_size],
+                **case_args,
+            )
+            for i in range(0, len(pending), shard_size)
+        ]
+
+        with EvaluatorPool(
+            freecad_path=self.freecad_path,
+            model_file=self.freecad_document.for_worker(),
+            variables=self.variables,
+            outputs=self.outputs,
+            n_workers=n_workers,
+            fea_results_name=self.freecad_document.fea_results_name,
+            solver_name=self.freecad_document.solver_name,
+            solver_timeout=self.freecad_document.solver_timeout,
+            result_cache=self.result_cache,
+            retry_policy=self.retry_policy,
+        ) as pool:
+            for shard_results in pool.imap(ModelEvaluator.run_shard, shards):
+                for (test_case_idx, case_results) in shard_results:
+                    self._store_case(
+                        test_case_idx,
+                        self.case_matrix[test_case_idx],
+                        case_results,
+                    )
+                if pbar is not None:
+                    pbar.update(len(shard_results))
+
+        logger.info(f"Ran {len(pending)} test cases in {len(shards)} shards")
+
+    def _run_queued(self, pending, queue_dir: str, pbar):
+        # imported here, job_queue depends on this module through worker_pool
+        from .job_queue import QueueEvaluatorPool
+        from .worker_pool import ModelEvaluator
+
+        # one job per test case, so a lost worker only costs a single solve
+        with QueueEvaluatorPool(
+            queue_dir,
+            model_file=self.freecad_document,
+            variables=self.variables,
+            outputs=self.outputs,
+            fea_results_name=self.freecad_document.fea_results_name,
+            solver_name=self.freecad_document.solver_name,
+            solver_timeout=self.freecad_document.solver_timeout,
+            retry_policy=self.retry_policy,
+        ) as pool:
+            cases = list(self.case_matrix.cases(pending))
+            test_matrix = (parameter_values for (_, parameter_values) in cases)
+            for ((test_case_idx, parameter_values), case_results) in zip(
+                cases, pool.imap(ModelEvaluator.evaluate, test_matrix)
+            ):
+                self._store_case(test_case_idx, parameter_values, case_results)
+                if pbar is not None:
+                    pbar.update(1)
+
+        logger.info(
+            f"Ran {len(pending)} test cases on the workers of {queue_dir}"
+        )
+
+    def populate_test_dataframe(
+        self,
+        variables,
+        outputs,
+        sampling: str = "grid",
+        n_samples: int = 0,
+        seed: Optional[int] = None,
+    ) -> pd.DataFrame:
         """Populates FreecadParametricFEA.results_dataframe with the
         test matrix to be run by the FEA batch. Uses self.variables
         and self.results.
 
         Args:
             variables (list): variables as defined in set_variables()
+            ?sampling (str): "grid" (default) or a space-filling design, see
+                run_parametric()
+            ?n_samples (int): number of test cases of a sampled design
+            ?seed (int): seed of a sampled design. Defaults to None
+
+        Raises:
+            ValueError: if a sampled design is asked for without n_samples
 
         Returns:
             pd.DataFrame: dataframe with test conditions and empty
@@ -241,20 +761,22 @@ def populate_test_dataframe(self, variables, outputs) -> pd.DataFrame:
             param_headings: headings in the dataframe related to the variables
             output_headings: headings in the dataframe related to the output
         """
-        param_vals = []
         param_headings = []
         output_headings = []
 
         for parameter in variables:
-            param_vals.append(parameter["constraint_values"])
             param_headings.append(self._param_to_df_heading(parameter))
 
         for output in outputs:
             output_headings.append(self._output_to_df_heading(output))
 
         # Build list of n-param values
-        grid = np.meshgrid(*param_vals)
-        grid_list = list(x.ravel() for x in grid)
+        case_matrix = CaseMatrix(
+            variables, sampling=sampling, n_samples=n_samples, seed=seed
+        )
+        grid_list = [
+            case_matrix.column(count) for count in range(len(variables))
+        ]
 
         df = pd.DataFrame()
 
@@ -262,11 +784,15 @@ def populate_test_dataframe(self, variables, outputs) -> pd.DataFrame:
             df[column] = grid_list[count]
 
         for column in output_headings:
-            df[column] = 0
+            df[column] = 0.0
 
         # generic empty data
         df["Msg"] = ""
-        df["FEA_Runtime"] = 0
+        df["FEA_Runtime"] = 0.0
+        df["FEA_Retries"] = 0
+        df["FEA_Failures"] = ""
+        for phase in TIMING_PHASES:
+            df[self._timing_to_df_heading(phase)] = 0.0
         logger.debug("Empty dataframe created")
         return df
 
@@ -323,33 +849,46 @@ def save_fea_results(self, results_filename: str, mode: str = "csv") -> None:
     def _param_to_df_heading(self, parameter) -> str:
         return f"{parameter['object_name']}.{parameter['constraint_name']}"
 
+    def _timing_to_df_heading(self, phase: str) -> str:
+        return f"Time_{phase}"
+
+    def _non_geometric_parameters(self, variables) -> set:
+        return {
+            (parameter["object_name"], parameter["constraint_name"])
+            for parameter in variables
+            if not parameter.get("geometric", True)
+        }
+
     def _output_to_df_heading(self, output) -> str:
-        if "column_label" in output.keys():
-            col_name = output["column_label"]
-        else:
-            col_name = output["reduction_fun"].__qualname__
+        return output_heading(output)
 
-        return f"{col_name}({output['output_var']})"
     def run_ga(self, individual, variables):
-            """
-            Runs the analysis for a genetic algorithm (GA) iteration using a single individual.
-
-            Args:
-                individual (list): List of variable values to set for the individual.
-                variables (list): List of variables corresponding to individual values.
-
-            Returns:
-                float: Maximum von Mises stress (fitness value).
-            """
-            # Set the individual's values in the model
-            for var, value in zip(variables, individual):
-                self.freecad_document.change_parameter(
-                    object_name=var["object_name"],
-                    constraint_name=var["constraint_name"],
-                    target_value=value,
-                )
+        """
+        Runs the analysis for a genetic algorithm (GA) iteration using a
+        single individual.
 
-            # Run FEA and extract maximum von Mises stress as the fitness value
-            fea_results_obj = self.freecad_document.run_fea()
-            von_mises_stress = np.max(fea_results_obj.getPropertyByName("vonMises"))
-            return von_mises_stress
\ No newline at end of file
+        Args:
+            individual (list): List of variable values to set for the
+                individual.
+            variables (list): List of variables corresponding to individual
+                values.
+
+        Returns:
+            float: Maximum von Mises stress (fitness value).
+        """
+        # Set the individual's values in the model, with a single recompute
+        parameters = {
+            (var["object_name"], var["constraint_name"]): value
+            for var, value in zip(variables, individual)
+        }
+        non_geometric = self._non_geometric_parameters(variables)
+        self.freecad_document.apply_parameters(
+            parameters, non_geometric=non_geometric
+        )
+
+        # Run FEA and extract maximum von Mises stress as the fitness value
+        fea_results_obj = self._solve(parameters, non_geometric, [])
+        von_mises_stress = (
+            self._result_fields(fea_results_obj)["vonMises"].max()
+        )
+        return von_mises_stress
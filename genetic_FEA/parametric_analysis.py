@@ -36,10 +36,14 @@ def add_output(self, output):
         """
         self.outputs.append(output)
 
-    def run_analysis(self):
+    def run_analysis(self, n_workers=1):
         """
         Runs the parametric analysis and returns the results.
-        
+
+        Parameters:
+        - n_workers (int): Number of worker processes running the test cases
+          in parallel.
+
         Returns:
         - results (dict): Dictionary containing the results of the parametric analysis.
         """
@@ -52,6 +56,8 @@ def run_analysis(self):
         self.fea.set_outputs(output_dicts)
 
         self.fea.setup_fea(fea_results_name="CCX_Results", solver_name="SolverCcxTools")
-        results = self.fea.run_parametric(export_results=False) #set to False so that the results are not exported 
+        # export_results is set to False so that the results are not exported
+        results = self.fea.run_parametric(export_results=False,
+                                          n_workers=n_workers)
         #self.fea.plot_fea_results()
         return results
@@ -0,0 +1,103 @@
+"""Provides the Pareto front of multi-objective results: the designs that no
+    other design beats on every objective at once.
+"""
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .loghandler import logger
+
+
+def non_dominated(costs) -> np.ndarray:
+    """finds the non-dominated points, for a minimisation of every objective.
+    Points are compared against the current front only, starting with those
+    of lowest total cost (which tend to dominate the most), so the cost grows
+    with the size of the front rather than with the square of the number of
+    points. Of several identical points, only one is kept
+
+    Args:
+        costs (array-like): (n_points, n_objectives) objective values
+
+    Returns:
+        np.ndarray: (n_points,) True for the points on the Pareto front
+    """
+    costs = np.atleast_2d(np.asarray(costs, dtype=float))
+    order = np.argsort(costs.sum(axis=1), kind="stable")
+    candidates = costs[order]
+    remaining = np.arange(len(candidates))
+    position = 0
+    while position < len(candidates):
+        # keep the points better than the current one on at least one objective
+        keep = np.any(candidates < candidates[position], axis=1)
+        keep[position] = True
+        remaining = remaining[keep]
+        candidates = candidates[keep]
+        position = int(np.sum(keep[:position])) + 1
+
+    mask = np.zeros(len(costs), dtype=bool)
+    mask[order[remaining]] = True
+    return mask
+
+
+class ParetoArchive:
+    """Pareto front of all the results seen so far"""
+
+    def __init__(self, objectives: list) -> None:
+        """
+        Args:
+            objectives (list of str): result columns to minimise
+        """
+        self.objectives = list(objectives)
+        self._rows = []
+        self._costs = np.empty((0, len(self.objectives)))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def update(self, rows: Iterable) -> int:
+        """adds results to the archive, and drops those no longer on the front
+
+        Args:
+            rows (iterable of dict): results, with a value for each objective.
+                Failed cases (with a "Msg", or an objective that isn't
+                finite) are left out
+
+        Returns:
+            int: number of the new results that made it onto the front
+        """
+        rows = [
+            row
+            for row in rows
+            if not row.get("Msg")
+            and np.all(np.isfinite([row[name] for name in self.objectives]))
+        ]
+        if not rows:
+            return 0
+        costs = np.array(
+            [[row[name] for name in self.objectives] for row in rows],
+            dtype=float,
+        )
+        all_rows = self._rows + rows
+        front = non_dominated(np.vstack([self._costs, costs]))
+
+        self._rows = [
+            row for (row, on_front) in zip(all_rows, front) if on_front
+        ]
+        self._costs = np.vstack([self._costs, costs])[front]
+        n_added = int(np.sum(front[-len(rows):]))
+        logger.debug(f"Pareto front: {len(self._rows)} designs, {n_added} new")
+        return n_added
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: the results on the front, sorted by the first
+                objective
+        """
+        df = pd.DataFrame(self._rows)
+        if len(df) > 0:
+            df = df.sort_values(
+                self.objectives[0], kind="stable", ignore_index=True
+            )
+        return df
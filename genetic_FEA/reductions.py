@@ -0,0 +1,112 @@
+"""Provides the reduction of FEA result fields to the scalar outputs of a test
+    case. Each field is converted once per solve to a contiguous NumPy array,
+    and the common reductions are computed by NumPy whichever callable the
+    user passed (e.g. the builtin max, which would otherwise loop over the
+    nodal values in Python).
+"""
+import builtins
+import functools
+import statistics
+
+import numpy as np
+
+# reductions computed by NumPy instead of the callable passed by the user
+NUMPY_REDUCTIONS = {
+    builtins.max: "max",
+    np.max: "max",
+    np.amax: "max",
+    builtins.min: "min",
+    np.min: "min",
+    np.amin: "min",
+    np.mean: "mean",
+    statistics.mean: "mean",
+    statistics.fmean: "mean",
+    np.median: "median",
+    np.linalg.norm: "norm",
+}
+
+
+class ResultFields:
+    """Result fields of a single solve, converted to NumPy arrays on first
+    use"""
+
+    def __init__(self, results_object) -> None:
+        """
+        Args:
+            results_object: FreeCAD FEM result object (or anything with a
+                getPropertyByName() method)
+        """
+        self.results_object = results_object
+        self._arrays = {}
+
+    def __getitem__(self, output_var: str) -> np.ndarray:
+        if output_var not in self._arrays:
+            values = self.results_object.getPropertyByName(output_var)
+            self._arrays[output_var] = np.ascontiguousarray(
+                values, dtype=float
+            )
+        return self._arrays[output_var]
+
+
+def reduce_outputs(fields: ResultFields, outputs: list) -> list:
+    """computes the outputs of a test case, grouping the reductions of each
+    field so that e.g. all its percentiles are computed in one NumPy call
+
+    Args:
+        fields (ResultFields): result fields of the solve
+        outputs (list of dict): output definitions, as in
+            parametric.set_outputs()
+
+    Returns:
+        list: the value of each output, in the same order as outputs
+    """
+    values = [None] * len(outputs)
+    percentiles = {}  # field -> [(output index, q)]
+
+    for (idx, output) in enumerate(outputs):
+        kind, q = _numpy_reduction(output["reduction_fun"])
+        array = fields[output["output_var"]]
+        if kind == "percentile":
+            percentiles.setdefault(output["output_var"], []).append((idx, q))
+        elif kind == "max":
+            values[idx] = array.max()
+        elif kind == "min":
+            values[idx] = array.min()
+        elif kind == "mean":
+            values[idx] = array.mean()
+        elif kind == "norm":
+            flat = array.ravel()
+            values[idx] = np.sqrt(np.dot(flat, flat))
+        else:
+            values[idx] = output["reduction_fun"](array)
+
+    for (output_var, requests) in percentiles.items():
+        results = np.percentile(fields[output_var], [q for (_, q) in requests])
+        for ((idx, _), value) in zip(requests, results):
+            values[idx] = value
+
+    return values
+
+
+def _numpy_reduction(reduction_fun):
+    # returns (kind, percentile) for reductions NumPy can compute, or
+    # (None, None) for any other callable
+    if isinstance(reduction_fun, functools.partial):
+        keywords = reduction_fun.keywords
+        if (
+            reduction_fun.func in (np.percentile, np.quantile)
+            and not reduction_fun.args
+            and set(keywords) == {"q"}
+            and np.ndim(keywords["q"]) == 0
+        ):
+            scale = 100 if reduction_fun.func is np.quantile else 1
+            return "percentile", float(keywords["q"]) * scale
+        return None, None
+
+    try:
+        kind = NUMPY_REDUCTIONS.get(reduction_fun)
+    except TypeError:  # unhashable callable
+        kind = None
+    if kind == "median":
+        return "percentile", 50.0
+    return kind, None
@@ -0,0 +1,250 @@
+"""Provides a persistent, content-addressed cache of FEA results, so that test
+    cases that were already solved (e.g. elites carried over by the GA, or a
+    sweep re-run after editing the script) are not solved again.
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+
+class ResultCache:
+    """On-disk LRU cache of reduced FEA results.
+
+    Entries are keyed on the hash of the .FCStd file, the solver settings, the
+    output definitions and the parameter values rounded to a tolerance. The
+    cache is a SQLite database, so it can be shared by several worker
+    processes.
+    """
+
+    def __init__(
+        self,
+        cache_file: str,
+        max_entries: int = 100000,
+        tolerance: float = 1e-9,
+    ) -> None:
+        """opens (or creates) the cache
+
+        Args:
+            cache_file (str): path to the cache database
+            ?max_entries (int): the least recently used entries are evicted
+                above this size. Defaults to 100000
+            ?tolerance (float): parameter values closer than this are
+                considered the same. Defaults to 1e-9
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.tolerance = tolerance
+
+        self._connection = None
+        self._file_hashes = {}
+
+    def __getstate__(self):
+        # connections can't be sent to worker processes; they open their own
+        state = self.__dict__.copy()
+        state["_connection"] = None
+        return state
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            folder = os.path.dirname(self.cache_file)
+            if folder != "":
+                os.makedirs(folder, exist_ok=True)
+            self._connection = sqlite3.connect(self.cache_file, timeout=60)
+            self._connection.executescript(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, results TEXT, last_used REAL);"
+                "CREATE INDEX IF NOT EXISTS lru ON results (last_used);"
+                "CREATE TABLE IF NOT EXISTS stats "
+                "(name TEXT PRIMARY KEY, n INTEGER);"
+                "INSERT OR IGNORE INTO stats "
+                "VALUES ('hits', 0), ('misses', 0);"
+            )
+            logger.debug(f"Opened result cache {self.cache_file}")
+        return self._connection
+
+    def file_hash(self, filename: str) -> str:
+        """sha256 of a file, recomputed only if the file changed on disk
+
+        Args:
+            filename (str): path to the file
+
+        Returns:
+            str: hex digest of the file contents
+        """
+        stat = os.stat(filename)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._file_hashes.get(filename, (None, ""))[0] != signature:
+            sha = hashlib.sha256()
+            with open(filename, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(block)
+            self._file_hashes[filename] = (signature, sha.hexdigest())
+        return self._file_hashes[filename][1]
+
+    def make_key(
+        self,
+        model_file: str,
+        solver_settings: dict,
+        outputs: list,
+        parameters: dict,
+        model_identity: Optional[str] = None,
+    ) -> str:
+        """builds the cache key of a test case
+
+        Args:
+            model_file (str): path to the FreeCAD model
+            solver_settings (dict): anything that changes the solution other
+                than the model and the parameters (e.g. solver name)
+            outputs (list of dict): output definitions, as in
+                parametric.set_outputs()
+            parameters (dict): parameter names mapped to their values
+            ?model_identity (str): identifies the model instead of the hash
+                of model_file, for a solver backend without a model file.
+                Defaults to None (hash model_file)
+
+        Returns:
+            str: the key
+        """
+        output_definitions = [
+            [
+                output["output_var"],
+                _reduction_identity(output["reduction_fun"]),
+                output.get("column_label", ""),
+            ]
+            for output in outputs
+        ]
+        rounded_parameters = {
+            name: int(np.round(float(value) / self.tolerance))
+            for (name, value) in parameters.items()
+        }
+        key_data = json.dumps(
+            [
+                model_identity
+                if model_identity is not None
+                else self.file_hash(model_file),
+                solver_settings,
+                output_definitions,
+                rounded_parameters,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key_data.encode("utf8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """looks a test case up in the cache
+
+        Args:
+            key (str): key from make_key()
+
+        Returns:
+            dict or None: the cached results, None on a cache miss
+        """
+        with self.connection as db:
+            row = db.execute(
+                "SELECT results FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                db.execute("UPDATE stats SET n = n + 1 WHERE name = 'misses'")
+                return None
+            db.execute(
+                "UPDATE results SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            db.execute("UPDATE stats SET n = n + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    def put(self, key: str, results: dict):
+        """stores the results of a test case, evicting the least recently
+        used entries if the cache is full
+
+        Args:
+            key (str): key from make_key()
+            results (dict): output column headings mapped to their values
+        """
+        results = {
+            column: _to_builtin(value) for (column, value) in results.items()
+        }
+        with self.connection as db:
+            db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, json.dumps(results), time.time()),
+            )
+            db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self) -> dict:
+        """hit/miss statistics, summed over every process using the cache
+
+        Returns:
+            dict: "hits", "misses", "hit_rate" and "entries"
+        """
+        stats = dict(
+            self.connection.execute("SELECT name, n FROM stats").fetchall()
+        )
+        stats["entries"] = self.connection.execute(
+            "SELECT COUNT(*) FROM results"
+        ).fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """removes every entry and resets the statistics"""
+        with self.connection as db:
+            db.execute("DELETE FROM results")
+            db.execute("UPDATE stats SET n = 0")
+
+
+def _reduction_identity(fun) -> str:
+    """identifies a reduction function across processes and runs. The qualified
+    name alone isn't enough: every lambda is "<lambda>", and local functions
+    of the same name may compute different things, so Python functions also
+    hash their bytecode, constants, defaults and closure values
+
+    Args:
+        fun (callable): the reduction function
+
+    Raises:
+        ValueError: if fun has no stable name (e.g. a callable object)
+
+    Returns:
+        str: module, qualified name and, for Python functions, code hash
+    """
+    if isinstance(fun, functools.partial):
+        return (
+            f"partial({_reduction_identity(fun.func)}, "
+            f"{fun.args!r}, {sorted(fun.keywords.items())!r})"
+        )
+    qualname = getattr(fun, "__qualname__", None)
+    if qualname is None:
+        raise ValueError(
+            f"Reduction {fun!r} has no stable name to cache its results by; "
+            "use a function instead"
+        )
+    identity = f"{getattr(fun, '__module__', None)}.{qualname}"
+    code = getattr(fun, "__code__", None)
+    if code is not None:
+        closure = [cell.cell_contents for cell in (fun.__closure__ or ())]
+        code_hash = hashlib.sha256(code.co_code)
+        for part in (code.co_consts, code.co_names, fun.__defaults__, closure):
+            code_hash.update(repr(part).encode())
+        identity += f":{code_hash.hexdigest()[:16]}"
+    return identity
+
+
+def _to_builtin(value):
+    # numpy scalars are not JSON serialisable
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,149 @@
+"""Provides an append-only JSON Lines log of finished test cases. Each case is
+    written as soon as it finishes, so a crash only loses the cases that were
+    still running, and an interrupted run can be resumed from the log.
+"""
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+
+class ResultLog:
+    """JSON Lines file with one record (dict) per line"""
+
+    def __init__(
+        self,
+        filename: str,
+        fsync_every: int = 20,
+        fsync_interval: float = 10.0,
+    ) -> None:
+        """
+        Args:
+            filename (str): path to the .jsonl file
+            ?fsync_every (int): records are forced to disk at least every
+                fsync_every records. Defaults to 20
+            ?fsync_interval (float): ... and at least every fsync_interval
+                seconds [s]. Defaults to 10
+        """
+        self.filename = filename
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+
+    def read(self) -> list:
+        """reads the records already in the file. A last line cut short by a
+        crash is ignored
+
+        Returns:
+            list of dict: the records, in file order
+        """
+        records, _ = self._read_valid()
+        return records
+
+    def open(self, resume: bool = False) -> list:
+        """opens the file for appending
+
+        Args:
+            ?resume (bool): keep the records already in the file. Otherwise
+                the file is emptied. Defaults to False
+
+        Returns:
+            list of dict: the records kept, see read()
+        """
+        folder = os.path.dirname(self.filename)
+        if folder != "":
+            os.makedirs(folder, exist_ok=True)
+
+        records = []
+        if resume:
+            records, valid_size = self._read_valid()
+            self._file = open(self.filename, "a+b")
+            # drop a partly written last record, so the next one starts on a
+            # new line
+            self._file.truncate(valid_size)
+            logger.info(
+                f"Resuming from {len(records)} records in {self.filename}"
+            )
+        else:
+            self._file = open(self.filename, "wb")
+        self._last_sync = time.monotonic()
+        return records
+
+    def append(self, record: dict):
+        """writes a record. It reaches the OS straight away, and the disk at
+        the next fsync
+
+        Args:
+            record (dict): JSON serialisable record. NumPy scalars and arrays
+                are converted
+        """
+        if self._file is None:
+            raise RuntimeError(f"Result log {self.filename} is not open")
+        line = json.dumps(record, default=_to_json) + "\n"
+        self._file.write(line.encode("utf8"))
+        self._file.flush()
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.fsync_every
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self):
+        """forces the records written so far to disk"""
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        """syncs and closes the file"""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_valid(self):
+        # returns the complete records, and the size of the file they fill
+        records = []
+        valid_size = 0
+        if not os.path.isfile(self.filename):
+            return records, valid_size
+        with open(self.filename, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    logger.warning(
+                        f"Ignoring incomplete last record in {self.filename}"
+                    )
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(
+                        f"Ignoring corrupt record in {self.filename}"
+                    )
+                    break
+                valid_size += len(line)
+        return records, valid_size
+
+
+def _to_json(value) -> Optional[object]:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
@@ -0,0 +1,188 @@
+"""Provides a columnar store for test case results. Each column is a
+    preallocated NumPy array that cases write into by index, so filling in a
+    sweep doesn't go through DataFrame.loc for every cell, and GA generations
+    are appended without concatenating DataFrames.
+"""
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class ResultStore:
+    """Table of results with one NumPy array per column. Rows are test cases"""
+
+    def __init__(
+        self, columns: Optional[dict] = None, capacity: int = 16
+    ) -> None:
+        """creates an empty store
+
+        Args:
+            ?columns (dict): column names mapped to their dtype. Columns can
+                also be added later, by writing to them
+            ?capacity (int): number of rows to preallocate. The store grows
+                as needed. Defaults to 16
+        """
+        self._capacity = max(1, capacity)
+        self._size = 0
+        self._columns = {}
+        # DataFrame index of each row, e.g. the test case number
+        self._index = np.zeros(self._capacity, dtype=np.int64)
+        self._index_names = [None]
+        self._sort_index = True  # rows may be filled in out of order
+        self._dataframe = None
+
+        for (name, dtype) in (columns or {}).items():
+            self.add_column(name, dtype)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ResultStore":
+        """creates a store holding a copy of a DataFrame, e.g. the test matrix
+        from parametric.populate_test_dataframe(). Its rows are addressed by
+        position, not by the DataFrame's index, but to_dataframe() gives back
+        the same index, in the same order
+
+        Args:
+            df (pd.DataFrame): initial content
+
+        Returns:
+            ResultStore: the store, with one row per row of df
+        """
+        store = cls(capacity=len(df))
+        for column in df.columns:
+            store._columns[column] = np.array(df[column].to_numpy(), copy=True)
+        store._index = df.index.to_numpy(copy=True)
+        store._index_names = list(df.index.names)
+        store._sort_index = False
+        store._size = store._capacity = len(df)
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    def add_column(self, name: str, dtype=float, fill_value=None):
+        """adds a column, filled with fill_value in every existing row
+
+        Args:
+            name (str): column name
+            ?dtype: NumPy dtype of the column. Use object for text
+            ?fill_value: initial value. Defaults to "" for text columns and
+                0 otherwise
+        """
+        dtype = np.dtype(dtype)
+        if fill_value is None:
+            fill_value = "" if dtype == object else 0
+        column = np.empty(self._capacity, dtype=dtype)
+        column[:] = fill_value
+        self._columns[name] = column
+        self._dataframe = None
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: the filled part of a column (a view, not a copy)
+        """
+        return self._columns[name][: self._size]
+
+    def set_row(self, idx: int, values: dict):
+        """writes values into an existing row
+
+        Args:
+            idx (int): row position
+            values (dict): column names mapped to their values. Missing
+                columns are added
+        """
+        if not 0 <= idx < self._size:
+            raise IndexError(f"Row {idx} out of range for {self._size} rows")
+        for (name, value) in values.items():
+            if name not in self._columns:
+                self.add_column(name, _dtype_for(value))
+            try:
+                self._columns[name][idx] = value
+            except (TypeError, ValueError):
+                # e.g. a custom reduction returning text in a numeric column
+                self._columns[name] = self._columns[name].astype(object)
+                self._columns[name][idx] = value
+        self._dataframe = None
+
+    def append(self, row: dict, index: Optional[int] = None) -> int:
+        """adds a row at the end of the store, in amortised O(1)
+
+        Args:
+            row (dict): column names mapped to their values. Columns missing
+                from row keep their fill value
+            ?index (int): index of the row in to_dataframe(), e.g. its test
+                case number. Defaults to its position
+
+        Returns:
+            int: position of the new row
+        """
+        if self._size == self._capacity:
+            self._grow(max(1, 2 * self._capacity))
+        self._index[self._size] = self._size if index is None else index
+        self._size += 1
+        self.set_row(self._size - 1, row)
+        return self._size - 1
+
+    def extend(self, rows: Iterable) -> range:
+        """adds several rows at the end of the store, e.g. a GA generation
+
+        Args:
+            rows (iterable of dict): the rows, see append()
+
+        Returns:
+            range: positions of the new rows
+        """
+        start = self._size
+        for row in rows:
+            self.append(row)
+        return range(start, self._size)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: the content of the store, sorted by index unless it
+                was created by from_dataframe(). The DataFrame is kept until
+                the store is next written to
+        """
+        if self._dataframe is None:
+            self._dataframe = pd.DataFrame(
+                {
+                    name: column[: self._size]
+                    for (name, column) in self._columns.items()
+                },
+                index=self._dataframe_index(),
+                copy=True,  # later writes must not show through
+            )
+            index = self._dataframe.index
+            if self._sort_index and not index.is_monotonic_increasing:
+                self._dataframe = self._dataframe.sort_index()
+        return self._dataframe
+
+    def _dataframe_index(self) -> pd.Index:
+        index = self._index[: self._size]
+        if len(self._index_names) > 1:
+            return pd.MultiIndex.from_tuples(index, names=self._index_names)
+        return pd.Index(index, name=self._index_names[0])
+
+    def _grow(self, capacity: int):
+        index = np.zeros(capacity, dtype=self._index.dtype)
+        index[: len(self._index)] = self._index
+        self._index = index
+        for (name, column) in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[: len(column)] = column
+            grown[len(column):] = "" if column.dtype == object else 0
+            self._columns[name] = grown
+        self._capacity = capacity
+
+
+def _dtype_for(value):
+    # numbers get a float column, anything else (e.g. messages) a text one
+    if isinstance(value, (bool, int, float, np.number)):
+        return float
+    return object
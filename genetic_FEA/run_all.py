@@ -1,8 +1,15 @@
 import sys
 import os
-import time  # Import the time module for adding delay
 from os import path
 import numpy as np
+from FreecadParametricFEA.case_matrix import CaseMatrix
+from FreecadParametricFEA.job_queue import QueueEvaluatorPool
+from FreecadParametricFEA.result_cache import ResultCache
+from FreecadParametricFEA.result_log import ResultLog
+from FreecadParametricFEA.result_store import ResultStore
+from FreecadParametricFEA.worker_pool import EvaluatorPool
+from FreecadParametricFEA.variable import Variable
+from FreecadParametricFEA.output import Output
 
 # Add FreeCAD Python libraries to sys.path dynamically
 FREECAD_PATH = "C:/Program Files/FreeCAD 0.21/bin"  # Adjust this if your FreeCAD installation is elsewhere
@@ -12,14 +19,29 @@
 # Now import FreeCAD after adding the path
 import FreeCAD
 import pandas as pd
-from FreecadParametricFEA.parametric_analysis import ParametricAnalysis
-from FreecadParametricFEA.variable import Variable
-from FreecadParametricFEA.output import Output
 
 class RunAllAnalysis:
-    def __init__(self, freecad_path, model_file):
+    def __init__(self, freecad_path, model_file, n_workers=1, cache_file=None,
+                 solver_timeout=None, resume=False, backend=None,
+                 job_queue=None):
+        if cache_file and job_queue:
+            # The workers on the other nodes can't share this machine's cache
+            raise ValueError("cache_file can't be combined with job_queue")
         self.freecad_path = freecad_path
         self.model_file = model_file
+        self.n_workers = n_workers  # Number of processes sharing the sweep
+        # Result cache, so re-runs skip solved cases
+        self.cache_file = cache_file
+        # Max seconds per CalculiX run, None waits indefinitely
+        self.solver_timeout = solver_timeout
+        # Skip the cases already in results/results.jsonl
+        self.resume = resume
+        # Solver backend the workers solve on, None solves model_file with
+        # FreeCAD
+        self.backend = backend
+        # Queue folder shared with workers on other nodes, None solves on
+        # this machine
+        self.job_queue = job_queue
 
     def get_spreadsheet_data(self, spreadsheet, row):
         object_name = spreadsheet.get(f'A{row}')
@@ -51,6 +73,13 @@ def save_best_model(self, doc, best_values, constraint_names_with_units):
 
         print(f"Best model saved as {best_model_path}")
 
+    @staticmethod
+    def evaluate_case(evaluator, case):
+        # Runs inside an evaluator worker; the test case number travels with
+        # its results
+        idx, values = case
+        return idx, values, evaluator.evaluate(values)
+
     def run(self):
         doc = FreeCAD.openDocument(self.model_file)
         spreadsheet = None
@@ -82,53 +111,114 @@ def run(self):
 
         output1 = Output("vonMises", max)
 
-        analysis = ParametricAnalysis(self.freecad_path, self.model_file)
-        for variable in variables:
-            analysis.add_variable(variable)
-        analysis.add_output(output1)
-
-        # Run the analysis
-        results = analysis.run_analysis()
+        # The test matrix decodes each case from its number, so the cases are
+        # streamed to the evaluator workers without building the whole matrix;
+        # each result is stored under its case number
+        case_matrix = CaseMatrix([variable.to_dict()
+                                  for variable in variables])
+        results = ResultStore(capacity=len(case_matrix))
 
-        # Add a delay to ensure FreeCAD has fully processed the analysis
-        time.sleep(1)  # Wait 2 seconds
-
-        # Rename 'max(vonMises)' to 'vonMises [MPa]' for clarity
-        if "max(vonMises)" in results.columns:
-            results = results.rename(columns={"max(vonMises)": "vonMises [MPa]"})
-        else:
-            raise KeyError("Expected 'max(vonMises)' not found in the results.")
-
-        # Exclude 'Msg' and 'FEA_Runtime' columns
-        columns_to_exclude = ['Msg', 'FEA_Runtime']
-        results = results.drop(columns=[col for col in columns_to_exclude if col in results.columns])
-
-        # Move 'vonMises [MPa]' column to the last position
-        if 'vonMises [MPa]' in results.columns:
-            cols = [col for col in results.columns if col != 'vonMises [MPa]'] + ['vonMises [MPa]']
-            results = results[cols]
-        else:
-            raise KeyError("'vonMises [MPa]' column not found after renaming.")
-
-        # Create the renaming map that includes the constraint names with units
-        rename_mapping = {results.columns[i]: constraint_names_with_units[i] for i in range(len(constraint_names_with_units))}
-        
-        # Apply the renaming
-        results = results.rename(columns=rename_mapping)
-
-        # Save the results to CSV
+        # Each case is streamed to disk as soon as it finishes; on resume,
+        # finished cases are reloaded
         results_folder = path.join(path.dirname(self.model_file), "results")
-        if not os.path.exists(results_folder):
-            os.makedirs(results_folder)
-        results.to_csv(path.join(results_folder, "results.csv"), index=False)
-
-        # Find the row with the minimum von Mises stress
-        best_row = results.loc[results['vonMises [MPa]'].idxmin()]
-
-        # Extract the best values from the row
-        best_values = best_row[:-1].values  # Exclude von Mises from the best values
-        
-        # Save the best model with a dynamic filename
-        self.save_best_model(doc, best_values, constraint_names_with_units)
-
-        print("Run all analysis completed, results saved, and best model saved.")
+        result_log = ResultLog(path.join(results_folder, "results.jsonl"))
+        completed = set()
+        for record in result_log.open(resume=self.resume):
+            idx = record["test_case"]
+            if (idx < len(case_matrix) and idx not in completed
+                    and np.allclose(record["parameters"], case_matrix[idx])):
+                results.append(dict(zip(constraint_names_with_units,
+                                        record["parameters"]),
+                                    **record["results"]),
+                               index=idx)
+                completed.add(idx)
+        cases = ((idx, values) for idx, values in case_matrix.cases()
+                 if idx not in completed)
+
+        result_cache = (ResultCache(self.cache_file) if self.cache_file
+                        else None)
+        model = self.backend or self.model_file
+        if self.job_queue:
+            pool = QueueEvaluatorPool(self.job_queue, model, variables,
+                                      [output1],
+                                      solver_timeout=self.solver_timeout)
+        else:
+            pool = EvaluatorPool(self.freecad_path, model, variables,
+                                 [output1], n_workers=self.n_workers,
+                                 result_cache=result_cache,
+                                 solver_timeout=self.solver_timeout)
+        try:
+            for idx, values, case_results in pool.imap(self.evaluate_case,
+                                                       cases):
+                results.append(dict(zip(constraint_names_with_units, values),
+                                    **case_results),
+                               index=idx)
+                result_log.append({"test_case": idx,
+                                   "parameters": list(values),
+                                   "results": case_results})
+            result_log.close()
+            if result_cache is not None:
+                print(f"Result cache: {result_cache.stats()}")
+            results = results.to_dataframe()
+
+            # Rename 'max(vonMises)' to 'vonMises [MPa]' for clarity
+            if "max(vonMises)" in results.columns:
+                results = results.rename(
+                    columns={"max(vonMises)": "vonMises [MPa]"})
+            else:
+                raise KeyError(
+                    "Expected 'max(vonMises)' not found in the results.")
+
+            # Summarise where the time went and what was retried, then exclude
+            # the bookkeeping columns
+            timing_columns = [col for col in results.columns
+                              if col.startswith('Time_')]
+            mean_times = results[timing_columns].mean().round(3).to_dict()
+            print(f"Mean phase times [s]: {mean_times}")
+            if ('FEA_Retries' in results.columns
+                    and results['FEA_Retries'].sum() > 0):
+                print(f"Solves retried: {int(results['FEA_Retries'].sum())}")
+            # Failed cases keep their outputs at 0
+            succeeded = results['Msg'] == ""
+            columns_to_exclude = ['Msg', 'FEA_Runtime', 'FEA_Retries',
+                                  'FEA_Failures'] + timing_columns
+            results = results.drop(columns=[col for col in columns_to_exclude
+                                            if col in results.columns])
+
+            # Move 'vonMises [MPa]' column to the last position
+            if 'vonMises [MPa]' in results.columns:
+                cols = [col for col in results.columns
+                        if col != 'vonMises [MPa]'] + ['vonMises [MPa]']
+                results = results[cols]
+            else:
+                raise KeyError(
+                    "'vonMises [MPa]' column not found after renaming.")
+
+            # Save the results to CSV
+            if not os.path.exists(results_folder):
+                os.makedirs(results_folder)
+            results.to_csv(path.join(results_folder, "results.csv"),
+                           index=False)
+
+            # Find the row with the minimum von Mises stress, among the
+            # successful cases
+            if not succeeded.any():
+                print("Every case failed, no best model to save.")
+                return
+            best_row = results.loc[
+                results.loc[succeeded, 'vonMises [MPa]'].idxmin()]
+
+            # Extract the best values from the row
+            # Exclude von Mises from the best values
+            best_values = best_row[:-1].values
+
+            # Save the best model with a dynamic filename
+            self.save_best_model(doc, best_values, constraint_names_with_units)
+
+            print("Run all analysis completed, results saved, and best model "
+                  "saved.")
+        finally:
+            # Release the workers even if the sweep fails, after the best
+            # model is saved
+            result_log.close()
+            pool.close()
@@ -0,0 +1,123 @@
+"""Provides space-filling designs for the test matrix, as an alternative to the
+    full grid of every variable's values. A design has a fixed number of test
+    cases whatever the number of variables, so large studies can cover the
+    design space with a given evaluation budget.
+"""
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+# sampling methods accepted by parametric.run_parametric(); "grid" is the
+# full factorial of each variable's constraint_values
+SAMPLING_METHODS = ("grid", "lhs", "sobol", "halton", "random")
+
+
+def sample_unit_cube(
+    method: str, n_samples: int, n_dims: int, seed: Optional[int] = None
+) -> np.ndarray:
+    """draws points in the unit hypercube [0, 1)^n_dims
+
+    Args:
+        method (str): one of
+            "lhs": Latin hypercube, each variable's range split in n_samples
+                strata with one point each
+            "sobol": scrambled Sobol sequence (needs scipy)
+            "halton": Halton sequence, randomly shifted if a seed is given
+            "random": independent uniform samples
+        n_samples (int): number of points
+        n_dims (int): number of variables
+        ?seed (int): seed of the random generator, for repeatable designs.
+            Defaults to None
+
+    Raises:
+        ValueError: if the method is unknown
+
+    Returns:
+        np.ndarray: (n_samples, n_dims) array of points
+    """
+    rng = np.random.default_rng(seed)
+
+    if method == "random":
+        return rng.random((n_samples, n_dims))
+
+    if method == "lhs":
+        strata = np.argsort(rng.random((n_samples, n_dims)), axis=0)
+        return (strata + rng.random((n_samples, n_dims))) / n_samples
+
+    if method == "halton":
+        points = np.column_stack(
+            [
+                _radical_inverse(np.arange(1, n_samples + 1), base)
+                for base in _primes(n_dims)
+            ]
+        )
+        if seed is not None:
+            # Cranley-Patterson rotation, so each seed gives a different design
+            points = (points + rng.random(n_dims)) % 1.0
+        return points
+
+    if method == "sobol":
+        try:
+            from scipy.stats import qmc
+        except ImportError:
+            logger.exception("Sobol sampling needs scipy")
+            raise
+        return qmc.Sobol(d=n_dims, scramble=True, seed=seed).random(n_samples)
+
+    raise ValueError(
+        f"Unknown sampling method {method}, use one of {SAMPLING_METHODS}"
+    )
+
+
+def sample_variables(
+    variables: list, method: str, n_samples: int, seed: Optional[int] = None
+) -> np.ndarray:
+    """draws the values of the variables for a space-filling design. Each
+    variable is sampled between the min and max of its constraint_values
+
+    Args:
+        variables (list of dict): variables as defined in
+            parametric.set_variables()
+        method (str): sampling method, see sample_unit_cube()
+        n_samples (int): number of test cases
+        ?seed (int): seed of the random generator. Defaults to None
+
+    Returns:
+        np.ndarray: (n_samples, len(variables)) array of parameter values
+    """
+    lower = np.array(
+        [np.min(v["constraint_values"]) for v in variables], dtype=float
+    )
+    upper = np.array(
+        [np.max(v["constraint_values"]) for v in variables], dtype=float
+    )
+    unit_samples = sample_unit_cube(method, n_samples, len(variables), seed)
+    logger.debug(
+        f"Drew {n_samples} {method} samples of {len(variables)} variables"
+    )
+    return lower + unit_samples * (upper - lower)
+
+
+def _primes(n: int) -> list:
+    primes = []
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes):
+            primes.append(candidate)
+        candidate += 1
+    return primes
+
+
+def _radical_inverse(indices: np.ndarray, base: int) -> np.ndarray:
+    # van der Corput sequence: the digits of each index, mirrored about the
+    # point
+    result = np.zeros(len(indices))
+    fraction = 1.0 / base
+    indices = indices.copy()
+    while np.any(indices > 0):
+        result += (indices % base) * fraction
+        indices //= base
+        fraction /= base
+    return result
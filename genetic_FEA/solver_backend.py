@@ -0,0 +1,393 @@
+"""Provides the interface between the parametric machinery and the solver. The
+    FreeCAD/CalculiX implementation is FreecadModel; StubBackend is an
+    analytic stand-in running in-process, so the orchestration (sweeps, worker
+    pools, caching, optimisation loops) can be exercised and benchmarked
+    without a FreeCAD install.
+"""
+import contextlib
+import random
+import threading
+import time
+from typing import Optional
+
+from .loghandler import logger
+from .reductions import ResultFields
+
+
+# causes of a failed solve. Solving the same model again only helps with the
+# transient ones, the others fail the same way every time
+MESH_FAILURE = "mesh"
+SOLVER_DIVERGENCE = "divergence"
+SOLVER_ERROR = "solver_error"
+MISSING_RESULTS = "missing_results"
+ZERO_FIELD = "zero_field"
+TIMEOUT = "timeout"
+FILE_LOCK = "file_lock"
+PROCESS_CRASH = "process_crash"
+TRANSIENT_CAUSES = frozenset({FILE_LOCK, PROCESS_CRASH})
+
+
+class SolverTimeoutError(RuntimeError):
+    """raised when CalculiX doesn't finish within the solver timeout"""
+
+
+class SolverCancelledError(RuntimeError):
+    """raised when a solve is stopped with FreecadModel.cancel()"""
+
+
+class SolverFailure(RuntimeError):
+    """raised by run_fea() when a solve gives no valid results"""
+
+    def __init__(self, cause: str, message: str) -> None:
+        """
+        Args:
+            cause (str): what went wrong, e.g. MESH_FAILURE or FILE_LOCK
+            message (str): description of the failure
+        """
+        super().__init__(message)
+        self.cause = cause
+
+    @property
+    def transient(self) -> bool:
+        """True if the same solve may succeed when run again"""
+        return self.cause in TRANSIENT_CAUSES
+
+    def __reduce__(self):
+        # keeps the cause when sent back from a worker process
+        return (type(self), (self.cause, str(self)))
+
+
+class RetryPolicy:
+    """Decides which failed solves are run again. By default only the
+    transient failures (file locks, solver crashes) are, with an exponential
+    backoff between attempts; deterministic failures fail fast
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        retry_causes=TRANSIENT_CAUSES,
+        backoff: float = 1.0,
+        backoff_factor: float = 2.0,
+        max_backoff: float = 30.0,
+        perturbation: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            ?max_retries (int): max number of solves after the first one.
+                Defaults to 2
+            ?retry_causes (set of str): failure causes that are retried.
+                Defaults to TRANSIENT_CAUSES
+            ?backoff (float): wait before the first retry [s]. Defaults to 1
+            ?backoff_factor (float): growth of the wait at each retry.
+                Defaults to 2
+            ?max_backoff (float): longest wait between two attempts [s].
+                Defaults to 30
+            ?perturbation (float): relative change of the parameter values at
+                each retry, e.g. 1e-3 to nudge a geometry that fails to mesh
+                (with MESH_FAILURE in retry_causes). Defaults to 0 (the same
+                values are solved again)
+            ?seed (int): seed of the perturbations. Defaults to 0
+        """
+        self.max_retries = max_retries
+        self.retry_causes = frozenset(retry_causes)
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.perturbation = perturbation
+        self.seed = seed
+
+    def should_retry(self, failure: SolverFailure, n_retries: int) -> bool:
+        """
+        Args:
+            failure (SolverFailure): the failure of the last attempt
+            n_retries (int): number of retries already made
+
+        Returns:
+            bool: True if the solve should be run again
+        """
+        return (
+            failure.cause in self.retry_causes
+            and n_retries < self.max_retries
+        )
+
+    def delay(self, n_retries: int) -> float:
+        """
+        Args:
+            n_retries (int): number of retries already made
+
+        Returns:
+            float: wait before the next attempt [s]
+        """
+        return min(
+            self.backoff * self.backoff_factor**n_retries, self.max_backoff
+        )
+
+    def perturb(self, parameters: dict, n_retries: int) -> dict:
+        """
+        Args:
+            parameters (dict): parameter values of the failed attempts
+            n_retries (int): number of retries already made
+
+        Returns:
+            dict: the parameters to solve at the next attempt. The same failed
+                case and retry always get the same perturbation
+        """
+        if not self.perturbation:
+            return parameters
+        retry_random = random.Random(
+            f"{self.seed}:{n_retries}:{sorted(parameters.items())}"
+        )
+        return {
+            key: value
+            * (1 + self.perturbation * (2 * retry_random.random() - 1))
+            for (key, value) in parameters.items()
+        }
+
+
+class SolverBackend:
+    """Model that parameters are applied to and solved, as used by parametric
+
+    Subclasses implement apply_parameters(), run_fea(), export_fea_results()
+    and close(). run_fea() returns an object with a getPropertyByName()
+    method for each result field, sets self.result_fields and adds the wall
+    time of its phases to self.timings
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Args:
+            filename (str): path of the model, used to name logs and exports
+        """
+        self.filename = filename
+        self.solver_name = ""
+        self.fea_results_name = ""
+        # solver scratch directory. If empty, the solver's default is used
+        self.working_dir = ""
+        # max time for a single solve [s]. None waits indefinitely
+        self.solver_timeout = None
+        self._cancel_requested = threading.Event()
+        # result fields of the last solve, as NumPy arrays
+        self.result_fields = None
+        # wall time of each phase since the last reset_timings() [s]
+        self.timings = {}
+
+    def apply_parameters(
+        self, parameters: dict, non_geometric=frozenset()
+    ) -> bool:
+        """changes several parameters at once
+
+        Args:
+            parameters (dict): (object_name, constraint_name) tuples mapped to
+                their target values
+            ?non_geometric (set): keys of parameters that don't affect the
+                geometry. Defaults to none
+
+        Returns:
+            bool: True if the model was recomputed
+        """
+        raise NotImplementedError
+
+    def run_fea(self, timeout: Optional[float] = None):
+        """solves the model with the current parameters, once. Failures are
+        retried by the caller, see RetryPolicy
+
+        Raises:
+            SolverTimeoutError: if the solve runs longer than the timeout
+            SolverCancelledError: if the solve is stopped with cancel()
+            SolverFailure: if no valid results are obtained, with its cause
+
+        Returns:
+            the results object
+        """
+        raise NotImplementedError
+
+    def export_fea_results(self, filename: str, export_format: str = "vtk"):
+        """exports the results of the last solve"""
+        raise NotImplementedError(
+            f"{type(self).__name__} can't export results"
+        )
+
+    def close(self):
+        """releases the model"""
+
+    def cancel(self):
+        """stops the solve in progress, or the next one if none is running.
+        Can be called from another thread; the interrupted run_fea() raises
+        SolverCancelledError
+        """
+        self._cancel_requested.set()
+        logger.info(f"Cancel requested for {self.filename}")
+
+    def _check_cancelled(self, message: str):
+        # consumes a cancel() request, so it stops exactly one solve
+        if self._cancel_requested.is_set():
+            self._cancel_requested.clear()
+            raise SolverCancelledError(message)
+
+    def for_worker(self):
+        """
+        Returns:
+            what each worker of an EvaluatorPool opens its own copy of the
+                model from: a path, or a picklable backend
+        """
+        return self
+
+    def model_identity(self) -> Optional[str]:
+        """
+        Returns:
+            str or None: identifies the model in the keys of a ResultCache.
+                None for a backend whose model is the file at self.filename,
+                which the cache hashes instead
+        """
+        return None
+
+    def reset_timings(self):
+        """clears the phase timings, e.g. at the start of a test case"""
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def _timed(self, phase: str):
+        # adds the wall time of the block to self.timings[phase]
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[phase] = (
+                self.timings.get(phase, 0.0) + time.perf_counter() - start_time
+            )
+
+    def __getstate__(self):
+        # events can't be pickled, e.g. when a backend is sent to the workers
+        state = self.__dict__.copy()
+        state["_cancel_requested"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._cancel_requested = threading.Event()
+
+
+class StubResults:
+    """Result fields of a StubBackend solve"""
+
+    def __init__(self, fields: dict) -> None:
+        self.fields = fields
+
+    def getPropertyByName(self, name: str):
+        return self.fields[name]
+
+
+class StubBackend(SolverBackend):
+    """Deterministic analytic stand-in for a FreeCAD model and CalculiX.
+
+    The stress is a quadratic bowl of the parameter values, spread over
+    n_nodes nodal values, and the displacement grows with the parameters.
+    Solve latency and failures are drawn from a hash of the parameters, so a
+    given test case always takes the same time and fails (or not) the same
+    way, in any process. Transient failures are drawn at each solve instead,
+    so they go away when the case is solved again
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        transient_failure_rate: float = 0.0,
+        n_nodes: int = 1000,
+        seed: int = 0,
+        filename: str = "stub.FCStd",
+    ) -> None:
+        """
+        Args:
+            ?latency (float): mean solve time [s]. Defaults to 0
+            ?latency_jitter (float): relative spread of the solve time, e.g.
+                0.5 for solves between 0.5 and 1.5 times latency. Defaults to 0
+            ?failure_rate (float): share of test cases whose solve fails.
+                Defaults to 0
+            ?transient_failure_rate (float): share of solves that crash, but
+                would succeed if run again. Defaults to 0
+            ?n_nodes (int): number of nodal values in each result field.
+                Defaults to 1000
+            ?seed (int): seed of the latencies and failures. Defaults to 0
+            ?filename (str): model name used in the logs. Defaults to
+                "stub.FCStd"
+        """
+        super().__init__(filename)
+        self.solver_name = "StubSolver"
+        self.fea_results_name = "StubResults"
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.transient_failure_rate = transient_failure_rate
+        self.n_nodes = n_nodes
+        self.seed = seed
+        self.parameters = {}
+        # number of solves run, e.g. to measure the hit rate of a cache
+        self.n_solves = 0
+
+    def model_identity(self) -> Optional[str]:
+        # the results only depend on these settings, there is no model file
+        return (
+            f"StubBackend(failure_rate={self.failure_rate}, "
+            f"n_nodes={self.n_nodes}, seed={self.seed})"
+        )
+
+    def apply_parameters(
+        self, parameters: dict, non_geometric=frozenset()
+    ) -> bool:
+        with self._timed("apply_parameters"):
+            changed = {
+                key: value
+                for (key, value) in parameters.items()
+                if self.parameters.get(key) != value
+            }
+            self.parameters.update(changed)
+        return any(key not in non_geometric for key in changed)
+
+    def run_fea(self, timeout: Optional[float] = None):
+        if timeout is None:
+            timeout = self.solver_timeout
+        self.n_solves += 1
+        values = [
+            float(value) for (_, value) in sorted(self.parameters.items())
+        ]
+        case_random = random.Random(f"{self.seed}:{values}")
+        solve_random = random.Random(f"{self.seed}:{values}:{self.n_solves}")
+
+        jitter = self.latency_jitter * (2 * case_random.random() - 1)
+        solve_time = self.latency * (1 + jitter)
+        with self._timed("solve"):
+            wait_time = (
+                solve_time if timeout is None else min(solve_time, timeout)
+            )
+            self._cancel_requested.wait(max(wait_time, 0.0))
+            self._check_cancelled(f"Stub solve cancelled for {self.filename}")
+            if timeout is not None and solve_time > timeout:
+                raise SolverTimeoutError(
+                    f"Stub solve timed out after {timeout}s"
+                )
+
+        if case_random.random() < self.failure_rate:
+            raise SolverFailure(
+                ZERO_FIELD, "FEA analysis failed. Von Mises stress is zero."
+            )
+        if solve_random.random() < self.transient_failure_rate:
+            raise SolverFailure(PROCESS_CRASH, "Stub solver crashed")
+
+        with self._timed("load_results"):
+            stress = 1.0 + sum(value**2 for value in values)
+            displacement = 0.01 * sum(abs(value) for value in values)
+            result_object = StubResults(
+                {
+                    "vonMises": [
+                        stress * (1 + i / self.n_nodes)
+                        for i in range(self.n_nodes)
+                    ],
+                    "DisplacementLengths": [displacement] * self.n_nodes,
+                }
+            )
+            self.result_fields = ResultFields(result_object)
+        return result_object
@@ -0,0 +1,124 @@
+"""Provides stopping criteria for optimisation runs, so a run whose population
+    has converged, or that has used up its budget, stops early instead of
+    spending solver time on the remaining generations.
+"""
+import time
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+
+class StoppingCriteria:
+    """Checks the state of a run after each generation. Every criterion is
+    disabled by default"""
+
+    def __init__(
+        self,
+        stagnation_generations: Optional[int] = None,
+        min_improvement: float = 0.0,
+        min_diversity: Optional[float] = None,
+        target: Optional[float] = None,
+        max_time: Optional[float] = None,
+        max_solves: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            ?stagnation_generations (int): stop when the best output hasn't
+                improved for this many generations
+            ?min_improvement (float): smallest decrease of the best output
+                counted as an improvement. Defaults to 0
+            ?min_diversity (float): stop when the population diversity (see
+                population_diversity()) falls below this value
+            ?target (float): stop when the best output is at or below this
+                value
+            ?max_time (float): stop after this wall-clock time [s]
+            ?max_solves (int): stop after this number of FEA solves
+        """
+        self.stagnation_generations = stagnation_generations
+        self.min_improvement = min_improvement
+        self.min_diversity = min_diversity
+        self.target = target
+        self.max_time = max_time
+        self.max_solves = max_solves
+
+        self._start_time = time.perf_counter()
+        self._best = np.inf
+        self._stagnant_generations = 0
+
+    def start(self):
+        """starts the wall-clock budget, and forgets any previous run"""
+        self._start_time = time.perf_counter()
+        self._best = np.inf
+        self._stagnant_generations = 0
+
+    def check(
+        self, best: float, n_solves: int, diversity: Optional[float] = None
+    ) -> Optional[str]:
+        """records the state of the run at the end of a generation
+
+        Args:
+            best (float): lowest output found so far
+            n_solves (int): number of FEA solves so far
+            ?diversity (float): diversity of the current population.
+                Defaults to None (not checked)
+
+        Returns:
+            str or None: why the run should stop, None to carry on
+        """
+        if best < self._best - self.min_improvement:
+            self._best = best
+            self._stagnant_generations = 0
+        else:
+            self._stagnant_generations += 1
+
+        reason = None
+        if self.target is not None and best <= self.target:
+            reason = f"target {self.target} reached"
+        elif (
+            self.stagnation_generations is not None
+            and self._stagnant_generations >= self.stagnation_generations
+        ):
+            reason = (
+                f"no improvement for {self._stagnant_generations} generations"
+            )
+        elif (
+            self.min_diversity is not None
+            and diversity is not None
+            and diversity < self.min_diversity
+        ):
+            reason = (
+                f"population diversity {diversity:.3g} below "
+                f"{self.min_diversity}"
+            )
+        elif self.max_solves is not None and n_solves >= self.max_solves:
+            reason = f"solve budget of {self.max_solves} used"
+        elif (
+            self.max_time is not None
+            and time.perf_counter() - self._start_time >= self.max_time
+        ):
+            reason = f"time budget of {self.max_time} s used"
+
+        if reason is not None:
+            logger.info(f"Stopping the run: {reason}")
+        return reason
+
+
+def population_diversity(population, lower, upper) -> float:
+    """measures how spread out a population is
+
+    Args:
+        population (array-like): (n_individuals, n_variables) inputs
+        lower (array-like): lower bound of each variable
+        upper (array-like): upper bound of each variable
+
+    Returns:
+        float: standard deviation of each variable relative to its range,
+            averaged over the variables. 0 when all individuals are identical
+    """
+    population = np.atleast_2d(np.asarray(population, dtype=float))
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    span = np.where(upper > lower, upper - lower, 1.0)
+    return float(np.mean(population.std(axis=0) / span))
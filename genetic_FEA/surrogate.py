@@ -0,0 +1,257 @@
+"""Provides a cheap surrogate of the FEA, fitted on the test cases solved so
+    far, to rank candidate designs before spending solver time on them.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+from .loghandler import logger
+
+
+class GaussianProcess:
+    """Gaussian process regressor with a squared exponential kernel.
+
+    Inputs are scaled to the unit hypercube and outputs standardised, so a
+    single length scale (picked by maximum marginal likelihood) fits any
+    set of variables.
+    """
+
+    def __init__(
+        self,
+        bounds: Optional[tuple] = None,
+        length_scale: Optional[float] = None,
+        noise: float = 1e-6,
+    ) -> None:
+        """
+        Args:
+            ?bounds (tuple of array-like): (lower, upper) bounds of the
+                inputs. Defaults to the range of the fitted inputs
+            ?length_scale (float): kernel length scale, in unit hypercube
+                coordinates. Defaults to None (picked when fitting)
+            ?noise (float): variance added to the diagonal, relative to the
+                output variance. Defaults to 1e-6
+        """
+        self.bounds = bounds
+        self.length_scale = length_scale
+        self.noise = noise
+
+    def fit(self, X, y) -> "GaussianProcess":
+        """fits the surrogate
+
+        Args:
+            X (array-like): (n_samples, n_variables) inputs
+            y (array-like): (n_samples,) outputs
+
+        Returns:
+            GaussianProcess: self
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        y = np.asarray(y, dtype=float).ravel()
+
+        if self.bounds is None:
+            self._lower, self._upper = X.min(axis=0), X.max(axis=0)
+        else:
+            self._lower = np.asarray(self.bounds[0], dtype=float)
+            self._upper = np.asarray(self.bounds[1], dtype=float)
+        self._X = self._scale(X)
+        self._y_mean = y.mean()
+        self._y_std = y.std() if y.std() > 0 else 1.0
+        self._y = (y - self._y_mean) / self._y_std
+
+        length_scales = (
+            [self.length_scale]
+            if self.length_scale is not None
+            else np.geomspace(0.05, 2.0, 12)
+        )
+        best_likelihood = -np.inf
+        for length_scale in length_scales:
+            factor = self._factorise(length_scale)
+            if factor is None:
+                continue
+            (chol, alpha) = factor
+            likelihood = -0.5 * self._y @ alpha - np.sum(np.log(np.diag(chol)))
+            if likelihood > best_likelihood:
+                best_likelihood = likelihood
+                self._length_scale = length_scale
+                (self._chol, self._alpha) = (chol, alpha)
+
+        if best_likelihood == -np.inf:
+            raise np.linalg.LinAlgError(
+                "Surrogate kernel matrix is not positive definite"
+            )
+        logger.debug(
+            f"Surrogate fitted on {len(y)} samples, length scale "
+            f"{self._length_scale:.3g}"
+        )
+        return self
+
+    def predict(self, X, return_std: bool = False):
+        """predicts the outputs at new inputs
+
+        Args:
+            X (array-like): (n_points, n_variables) inputs
+            ?return_std (bool): also return the standard deviation of the
+                prediction. Defaults to False
+
+        Returns:
+            np.ndarray: (n_points,) predicted mean, and its standard deviation
+                if return_std
+        """
+        X = self._scale(np.atleast_2d(np.asarray(X, dtype=float)))
+        k = self._kernel(X, self._X, self._length_scale)
+        mean = k @ self._alpha * self._y_std + self._y_mean
+        if not return_std:
+            return mean
+        v = np.linalg.solve(self._chol, k.T)
+        variance = np.clip(1.0 + self.noise - np.sum(v**2, axis=0), 0.0, None)
+        return mean, np.sqrt(variance) * self._y_std
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        span = np.where(
+            self._upper > self._lower, self._upper - self._lower, 1.0
+        )
+        return (X - self._lower) / span
+
+    def _factorise(self, length_scale: float):
+        K = self._kernel(self._X, self._X, length_scale)
+        K[np.diag_indices_from(K)] += self.noise
+        try:
+            chol = np.linalg.cholesky(K)
+        except np.linalg.LinAlgError:
+            return None
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, self._y))
+        return chol, alpha
+
+    @staticmethod
+    def _kernel(
+        A: np.ndarray, B: np.ndarray, length_scale: float
+    ) -> np.ndarray:
+        sq_dist = (
+            np.sum(A**2, axis=1)[:, None]
+            + np.sum(B**2, axis=1)[None, :]
+            - 2 * A @ B.T
+        )
+        return np.exp(-0.5 * np.clip(sq_dist, 0.0, None) / length_scale**2)
+
+
+def prescreen(
+    surrogate: GaussianProcess, candidates, n_best: int, n_explore: int = 0
+) -> list:
+    """picks the candidates worth a real FEA solve, for a minimisation
+
+    Args:
+        surrogate (GaussianProcess): fitted surrogate
+        candidates (array-like): (n_candidates, n_variables) inputs
+        n_best (int): number of candidates with the lowest predicted output
+        ?n_explore (int): number of further candidates with the most
+            uncertain prediction. Defaults to 0
+
+    Returns:
+        list: positions of the chosen candidates, best first
+    """
+    mean, std = surrogate.predict(candidates, return_std=True)
+    ranked = list(np.argsort(mean, kind="stable"))
+    chosen = ranked[:n_best]
+    rest = ranked[n_best:]
+    rest.sort(key=lambda idx: -std[idx])
+    return [int(idx) for idx in chosen + rest[:n_explore]]
+
+
+def expected_improvement(
+    mean, std, best: float, xi: float = 0.0
+) -> np.ndarray:
+    """expected improvement over the best output so far, for a minimisation
+
+    Args:
+        mean (array-like): predicted outputs
+        std (array-like): standard deviations of the predictions
+        best (float): lowest output observed so far
+        ?xi (float): minimum improvement worth exploring for. Defaults to 0
+
+    Returns:
+        np.ndarray: the expected improvement of each prediction
+    """
+    mean = np.asarray(mean, dtype=float)
+    std = np.asarray(std, dtype=float)
+    improvement = best - mean - xi
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(std > 0, improvement / std, 0.0)
+    cdf = 0.5 * (1.0 + _erf(z / np.sqrt(2.0)))
+    pdf = np.exp(-0.5 * z**2) / np.sqrt(2.0 * np.pi)
+    return np.where(
+        std > 0, improvement * cdf + std * pdf, np.maximum(improvement, 0.0)
+    )
+
+
+def propose_batch(
+    X,
+    y,
+    bounds: tuple,
+    batch_size: int,
+    rng: np.random.Generator,
+    n_candidates: int = 2000,
+) -> np.ndarray:
+    """proposes the next points to solve, by maximum expected improvement.
+    Points after the first are picked as if the earlier ones had returned
+    their predicted output ("kriging believer"), so a batch spreads out
+    instead of piling up on the same optimum
+
+    Args:
+        X (array-like): (n_samples, n_variables) inputs solved so far
+        y (array-like): (n_samples,) their outputs, inf for failed solves
+        bounds (tuple of array-like): (lower, upper) bounds of the inputs
+        batch_size (int): number of points to propose
+        rng (np.random.Generator): random generator for the candidates
+        ?n_candidates (int): number of random candidates the expected
+            improvement is maximised over. Defaults to 2000
+
+    Returns:
+        np.ndarray: (batch_size, n_variables) proposed inputs
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    y = np.asarray(y, dtype=float)
+    lower = np.asarray(bounds[0], dtype=float)
+    upper = np.asarray(bounds[1], dtype=float)
+    span = np.where(upper > lower, upper - lower, 1.0)
+    solved = {tuple(row) for row in np.round((X - lower) / span, 9)}
+
+    # failed solves are not proposed again, but there is nothing to learn from
+    # them
+    finite = np.isfinite(y)
+    X, y = X[finite], y[finite]
+    if len(y) == 0:
+        return lower + rng.random((batch_size, len(lower))) * (upper - lower)
+
+    # uniform candidates, plus local ones around the best points so far
+    n_local = n_candidates // 2
+    best_points = X[np.argsort(y)[: max(1, len(y) // 5)]]
+    centres = best_points[rng.integers(len(best_points), size=n_local)]
+    local = centres + rng.normal(
+        scale=0.05 * (upper - lower), size=(n_local, len(lower))
+    )
+    uniform = lower + rng.random((n_candidates - n_local, len(lower))) * (
+        upper - lower
+    )
+    candidates = np.clip(np.vstack([uniform, local]), lower, upper)
+    # a point already solved can't improve on itself, and a failed one would
+    # fail again
+    scaled = np.round((candidates - lower) / span, 9)
+    candidates = candidates[[tuple(row) not in solved for row in scaled]]
+
+    surrogate = GaussianProcess(bounds=(lower, upper)).fit(X, y)
+    batch = []
+    for _ in range(batch_size):
+        mean, std = surrogate.predict(candidates, return_std=True)
+        pick = int(np.argmax(expected_improvement(mean, std, y.min())))
+        batch.append(candidates[pick])
+        X = np.vstack([X, candidates[pick]])
+        y = np.append(y, mean[pick])
+        candidates = np.delete(candidates, pick, axis=0)
+        surrogate = GaussianProcess(
+            bounds=(lower, upper), length_scale=surrogate._length_scale
+        ).fit(X, y)
+    return np.array(batch)
+
+
+_erf = np.vectorize(math.erf, otypes=[float])
@@ -3,7 +3,8 @@
 import numpy as np
 
 class Variable:
-    def __init__(self, object_name, constraint_name, constraint_values):
+    def __init__(self, object_name, constraint_name, constraint_values,
+                 geometric=True):
         """
         Initializes a Variable object.
 
@@ -11,10 +12,14 @@ def __init__(self, object_name, constraint_name, constraint_values):
         - object_name (str): The name of the object in FreeCAD.
         - constraint_name (str): The name of the constraint to modify.
         - constraint_values (array-like): The values to sweep through.
+        - geometric (bool): False for variables that don't change the
+          geometry, such as the magnitude of a force or pressure constraint.
+          Changing those reuses the mesh.
         """
         self.object_name = object_name
         self.constraint_name = constraint_name
         self.constraint_values = constraint_values
+        self.geometric = geometric
 
     def to_dict(self):
         """Converts the Variable object to a dictionary format for FEA."""
@@ -22,4 +27,5 @@ def to_dict(self):
             "object_name": self.object_name,
             "constraint_name": self.constraint_name,
             "constraint_values": self.constraint_values,
+            "geometric": self.geometric,
         }
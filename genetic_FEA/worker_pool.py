@@ -0,0 +1,376 @@
+"""Provides a pool of long-lived evaluator workers. Each worker holds one open
+    copy of the FreeCAD model and its own CalculiX scratch directory, so the
+    cost of opening the document is paid once per worker instead of once per
+    evaluated test case, and parallel solves don't overwrite each other's
+    files.
+"""
+import functools
+import multiprocessing
+import multiprocessing.util
+import queue
+import shutil
+import signal
+import tempfile
+import threading
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+from .solver_backend import RetryPolicy, SolverBackend, SolverCancelledError
+from .parametric import output_heading, parametric
+from .result_cache import ResultCache
+from .loghandler import logger
+
+# evaluator owned by the current worker process, set up by _init_worker()
+_worker_evaluator = None
+
+
+class ModelEvaluator:
+    """Keeps a FreeCAD model open and evaluates parameter sets on it"""
+
+    def __init__(
+        self,
+        freecad_path: str,
+        model_file: Union[str, SolverBackend],
+        variables: list,
+        outputs: list,
+        fea_results_name: str = "CCX_Results",
+        solver_name: str = "SolverCcxTools",
+        solver_timeout: Optional[float] = None,
+        scratch_dir: str = "",
+        result_cache: Optional[ResultCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        """opens the model and prepares the analysis
+
+        Args:
+            freecad_path (str): path to the FreeCAD Python libraries
+            model_file (str or SolverBackend): path to the FreeCAD model file
+                (.fcstd), or a solver backend object
+            variables (list of Variable or dict): variables, in the order their
+                values will be passed to evaluate()
+            outputs (list of Output or dict): outputs to extract from each
+                analysis
+            ?fea_results_name (str): name of the results object in the document
+            ?solver_name (str): name of the solver object in the document
+            ?solver_timeout (float): max time for each CalculiX run [s].
+                Defaults to None (no timeout)
+            ?scratch_dir (str): parent folder for this evaluator's CalculiX
+                working directory. Defaults to the system temp folder
+            ?result_cache (ResultCache): cache of FEA results shared by the
+                workers. Defaults to None (no caching)
+            ?retry_policy (RetryPolicy): which failed solves are run again.
+                Defaults to RetryPolicy()
+        """
+        self.fea = parametric(freecad_path=freecad_path)
+        self.fea.set_model(model_file)
+        self.fea.setup_fea(
+            fea_results_name=fea_results_name,
+            solver_name=solver_name,
+            solver_timeout=solver_timeout,
+            retry_policy=retry_policy,
+        )
+        self.fea.set_variables([_as_dict(var) for var in variables])
+        self.fea.set_outputs([_as_dict(output) for output in outputs])
+        self.fea.set_result_cache(result_cache)
+
+        self.working_dir = tempfile.mkdtemp(
+            prefix="ccx_", dir=scratch_dir or None
+        )
+        self.fea.freecad_document.working_dir = self.working_dir
+
+    def evaluate(self, parameter_values: list) -> dict:
+        """runs one test case on the open model
+
+        Args:
+            parameter_values (list): one value per variable
+
+        Returns:
+            dict: output column headings mapped to their values, plus
+                "FEA_Runtime", "Msg", "FEA_Retries" and "FEA_Failures". Outputs
+                of failed cases are left at 0, the same as in
+                parametric.run_parametric()
+        """
+        case_results = {
+            output_heading(output): 0 for output in self.fea.outputs
+        }
+        case_results["Msg"] = ""
+        case_results["FEA_Runtime"] = 0
+        case_results["FEA_Retries"] = 0
+        case_results["FEA_Failures"] = ""
+        case_results.update(self.fea.run_case(list(parameter_values)))
+        return case_results
+
+    def run_shard(self, shard: dict) -> list:
+        """runs a shard of a parametric sweep, see parametric.run_parametric()
+
+        Args:
+            shard (dict): "case_matrix" is the CaseMatrix of the sweep and
+                "case_indices" the numbers of the test cases to run; any other
+                key is passed to parametric.run_case()
+
+        Returns:
+            list: (test case index, results dict) tuples, in shard order
+        """
+        case_args = {
+            key: value
+            for (key, value) in shard.items()
+            if key not in ("case_matrix", "case_indices")
+        }
+        cases = shard["case_matrix"].cases(shard["case_indices"])
+        return [
+            (idx, self.fea.run_case(values, test_case_idx=idx, **case_args))
+            for (idx, values) in cases
+        ]
+
+    def close(self):
+        """closes the FreeCAD document and removes the scratch directory"""
+        self.fea.freecad_document.close()
+        shutil.rmtree(self.working_dir, ignore_errors=True)
+
+
+def _as_dict(item) -> dict:
+    # accepts both Variable/Output objects and their dictionary form
+    return item if isinstance(item, dict) else item.to_dict()
+
+
+def _init_worker(*evaluator_args):
+    global _worker_evaluator
+    _worker_evaluator = ModelEvaluator(*evaluator_args)
+    # clean up when the pool shuts the worker down
+    multiprocessing.util.Finalize(
+        _worker_evaluator, _worker_evaluator.close, exitpriority=10
+    )
+    # exit through Python when the pool is terminated, so that a running
+    # CalculiX process is killed rather than orphaned
+    signal.signal(signal.SIGTERM, _exit_worker)
+    logger.debug(f"Evaluator worker ready in {_worker_evaluator.working_dir}")
+
+
+def _exit_worker(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _call_on_worker(func: Callable, item):
+    return func(_worker_evaluator, item)
+
+
+class EvaluatorPool:
+    """Pool of evaluator workers, each with its own open copy of the model"""
+
+    def __init__(
+        self,
+        freecad_path: str,
+        model_file: Union[str, SolverBackend],
+        variables: list,
+        outputs: list,
+        n_workers: int = 1,
+        fea_results_name: str = "CCX_Results",
+        solver_name: str = "SolverCcxTools",
+        solver_timeout: Optional[float] = None,
+        scratch_dir: str = "",
+        result_cache: Optional[ResultCache] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        """starts the workers. Each worker opens the model once, and keeps it
+        open until the pool is closed
+
+        Args:
+            freecad_path (str): path to the FreeCAD Python libraries
+            model_file (str or SolverBackend): path to the FreeCAD model file
+                (.fcstd). A solver backend object (e.g. a StubBackend) is
+                copied into each worker, so it must be picklable
+            variables (list of Variable or dict): variables, in the order their
+                values will be passed to the pool
+            outputs (list of Output or dict): outputs to extract from each
+                analysis
+            ?n_workers (int): number of worker processes. With a single worker
+                the model is evaluated in the current process. Defaults to 1
+            ?fea_results_name (str): name of the results object in the document
+            ?solver_name (str): name of the solver object in the document
+            ?solver_timeout (float): max time for each CalculiX run [s].
+                Defaults to None (no timeout)
+            ?scratch_dir (str): parent folder for the workers' CalculiX
+                working directories. Defaults to the system temp folder
+            ?result_cache (ResultCache): cache of FEA results shared by the
+                workers. Defaults to None (no caching)
+            ?retry_policy (RetryPolicy): which failed solves are run again.
+                Defaults to RetryPolicy()
+        """
+        self.n_workers = max(1, n_workers)
+        evaluator_args = (
+            freecad_path,
+            model_file,
+            variables,
+            outputs,
+            fea_results_name,
+            solver_name,
+            solver_timeout,
+            scratch_dir,
+            result_cache,
+            retry_policy,
+        )
+
+        self._evaluator = None
+        self._pool = None
+        self._cancelled = threading.Event()
+        # (key, result, error) of the submitted items
+        self._completed = queue.Queue()
+        # Submitted items whose result hasn't been collected yet
+        self.n_pending = 0
+        if self.n_workers == 1:
+            self._evaluator = ModelEvaluator(*evaluator_args)
+        else:
+            self._pool = multiprocessing.Pool(
+                processes=self.n_workers,
+                initializer=_init_worker,
+                initargs=evaluator_args,
+            )
+        logger.info(
+            f"Started {self.n_workers} evaluator worker(s) for {model_file}"
+        )
+
+    def evaluate(self, parameter_values: list) -> dict:
+        """evaluates a single parameter set on one of the workers
+
+        Args:
+            parameter_values (list): one value per variable
+
+        Returns:
+            dict: the results of the test case, see ModelEvaluator.evaluate()
+        """
+        if self._evaluator is not None:
+            return self._evaluator.evaluate(parameter_values)
+        return self._pool.apply(  # type: ignore
+            _call_on_worker, (ModelEvaluator.evaluate, list(parameter_values))
+        )
+
+    def imap(
+        self, func: Callable, iterable: Iterable, chunksize: int = 1
+    ) -> Iterator:
+        """streams the items to the workers as they become free, and calls
+        func(evaluator, item) on each of them
+
+        Args:
+            func (callable): function taking the worker's ModelEvaluator and an
+                item, e.g. ModelEvaluator.evaluate. Must be picklable (i.e.
+                defined at module or class level)
+            iterable (iterable): items to evaluate
+            ?chunksize (int): number of items sent to a worker at a time.
+                Defaults to 1
+
+        Yields:
+            the results of func, in the same order as the input
+        """
+        if self._evaluator is not None:
+            return map(functools.partial(func, self._evaluator), iterable)
+        return self._wait_for(
+            self._pool.imap(  # type: ignore
+                functools.partial(_call_on_worker, func), iterable, chunksize
+            )
+        )
+
+    def _wait_for(self, results, poll_interval: float = 0.1) -> Iterator:
+        # a terminated pool never delivers the pending results, so keep an
+        # eye on cancel() while waiting for them
+        while True:
+            try:
+                yield results.next(timeout=poll_interval)
+            except multiprocessing.TimeoutError:
+                if self._cancelled.is_set():
+                    raise SolverCancelledError("Evaluator pool cancelled")
+            except StopIteration:
+                return
+
+    def map(
+        self, func: Callable, iterable: Iterable, chunksize: int = 1
+    ) -> List:
+        """same as imap(), but waits for all the results. Has the same
+        signature as the builtin map, so it can be registered as DEAP's
+        toolbox.map
+
+        Returns:
+            list: the results of func, in the same order as the input
+        """
+        return list(self.imap(func, iterable, chunksize))
+
+    def submit(self, func: Callable, item, key=None):
+        """sends a single item to the next free worker, without waiting for
+        its result, which is collected with next_completed(). With a single
+        worker, the item is evaluated before returning
+
+        Args:
+            func (callable): function taking the worker's ModelEvaluator and
+                the item, see imap()
+            item: item to evaluate
+            ?key: returned with the result, to tell the submissions apart.
+                Defaults to None
+        """
+        self.n_pending += 1
+        if self._evaluator is not None:
+            try:
+                self._completed.put((key, func(self._evaluator, item), None))
+            except Exception as e:
+                self._completed.put((key, None, e))
+            return
+        self._pool.apply_async(  # type: ignore
+            _call_on_worker,
+            (func, item),
+            callback=lambda result: self._completed.put((key, result, None)),
+            error_callback=lambda e: self._completed.put((key, None, e)),
+        )
+
+    def next_completed(self, poll_interval: float = 0.1) -> tuple:
+        """waits for whichever submitted item finishes first
+
+        Raises:
+            SolverCancelledError: if the pool is cancelled while waiting
+            Exception: the error raised by func on the item, if any
+
+        Returns:
+            tuple: (key, result of func) of the finished item
+        """
+        if self.n_pending == 0:
+            raise RuntimeError("No submitted item to wait for")
+        while True:
+            try:
+                (key, result, error) = self._completed.get(
+                    timeout=poll_interval
+                )
+                break
+            except queue.Empty:
+                if self._cancelled.is_set():
+                    raise SolverCancelledError("Evaluator pool cancelled")
+        self.n_pending -= 1
+        if error is not None:
+            raise error
+        return key, result
+
+    def cancel(self):
+        """stops the solves in progress and shuts the workers down, e.g. when
+        a solve hangs. Can be called from another thread: pending map() calls
+        raise SolverCancelledError. The pool can't be used afterwards
+        """
+        self._cancelled.set()
+        if self._evaluator is not None:
+            self._evaluator.fea.freecad_document.cancel()
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        logger.warning("Evaluator workers cancelled")
+
+    def close(self):
+        """closes the documents and shuts the worker processes down"""
+        if self._evaluator is not None:
+            self._evaluator.close()
+            self._evaluator = None
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        logger.debug("Evaluator workers closed")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
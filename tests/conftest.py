@@ -0,0 +1,63 @@
+"""Shared fixtures. The tests run without FreeCAD: the solves use the
+    StubBackend, and the FreeCAD module is replaced by a stand-in holding the
+    spreadsheet the optimisers read their variables from.
+
+The scripts import the package as FreecadParametricFEA, the name it is
+installed under in FreeCAD; from a checkout, genetic_FEA/ is loaded under
+that name.
+"""
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+PACKAGE = "FreecadParametricFEA"
+
+
+def import_package_from_checkout():
+    package_dir = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "genetic_FEA",
+    )
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE,
+        os.path.join(package_dir, "__init__.py"),
+        submodule_search_locations=[package_dir],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+
+
+if importlib.util.find_spec(PACKAGE) is None:
+    import_package_from_checkout()
+
+
+@pytest.fixture
+def standin_freecad(monkeypatch):
+    """registers a FreeCAD module whose documents hold one variable, Length,
+    swept over 5 steps between 10 and 30 mm
+
+    Returns:
+        the stand-in module
+    """
+    cells = {
+        "A2": "Pad", "B2": "Length", "C2": "10", "D2": "30", "E2": 5,
+        "F2": "mm", "G2": 2,
+    }
+    spreadsheet = types.SimpleNamespace(
+        Label="Spreadsheet", get=cells.__getitem__
+    )
+    document = types.SimpleNamespace(
+        Objects=[spreadsheet], saveAs=lambda filename: None
+    )
+    freecad = types.SimpleNamespace(openDocument=lambda filename: document)
+    monkeypatch.setitem(sys.modules, "FreeCAD", freecad)
+    # the scripts bind FreeCAD when they are first imported
+    for name in ("genetic_algorithm", "run_all", "bayesian_optimisation"):
+        module = sys.modules.get(f"{PACKAGE}.{name}")
+        if module is not None:
+            monkeypatch.setattr(module, "FreeCAD", freecad)
+    return freecad
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from FreecadParametricFEA.case_matrix import CaseMatrix
+
+
+def make_variables(sizes):
+    return [
+        {
+            "object_name": "Pad",
+            "constraint_name": f"Length{i}",
+            "constraint_values": np.linspace(10, 30, n) * (i + 1),
+        }
+        for (i, n) in enumerate(sizes)
+    ]
+
+
+def meshgrid_cases(variables):
+    # the test matrix as parametric.populate_test_dataframe() used to build it
+    grid = np.meshgrid(*[v["constraint_values"] for v in variables])
+    return np.stack([x.ravel() for x in grid], axis=1)
+
+
+@pytest.mark.parametrize(
+    "sizes", [(4,), (2, 3), (3, 2), (3, 2, 4), (2, 1, 3, 2)]
+)
+def test_grid_matches_meshgrid_order(sizes):
+    variables = make_variables(sizes)
+    expected = meshgrid_cases(variables)
+    matrix = CaseMatrix(variables)
+
+    assert len(matrix) == len(expected)
+    np.testing.assert_array_equal(np.array(list(matrix)), expected)
+    for i in range(len(variables)):
+        np.testing.assert_array_equal(matrix.column(i), expected[:, i])
+
+
+def test_cases_are_looked_up_by_number():
+    variables = make_variables((3, 2, 4))
+    expected = meshgrid_cases(variables)
+    matrix = CaseMatrix(variables)
+
+    for (idx, values) in matrix.cases([17, 0, 5]):
+        np.testing.assert_array_equal(values, expected[idx])
+    np.testing.assert_array_equal(matrix[-1], expected[-1])
+    with pytest.raises(IndexError):
+        matrix[len(matrix)]
+
+
+def test_sampled_design_needs_n_samples():
+    with pytest.raises(ValueError):
+        CaseMatrix(make_variables((3,)), sampling="lhs")
@@ -0,0 +1,218 @@
+import os
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from FreecadParametricFEA.result_store import ResultStore
+from FreecadParametricFEA.solver_backend import StubBackend
+
+LENGTH = ["Length [mm]"]
+STRESS = "vonMises [MPa]"
+
+
+class Individual(list):
+    def __init__(self, values):
+        super().__init__(values)
+        self.fitness = types.SimpleNamespace(valid=False, values=())
+
+
+def results_with_failures(n_results):
+    # every third solve failed, and has an infinite fitness
+    results = ResultStore()
+    results.extend(
+        {"Length [mm]": x, STRESS: 1 + x**2 if i % 3 else float("inf")}
+        for (i, x) in enumerate(np.linspace(10, 30, n_results))
+    )
+    return results
+
+
+def saved_best_values(monkeypatch, script):
+    saved = []
+    monkeypatch.setattr(
+        script,
+        "save_best_model",
+        lambda self, doc, values, names: saved.append(list(values)),
+    )
+    return saved
+
+
+def test_failed_solves_never_win_the_ga(
+    standin_freecad, tmp_path, monkeypatch
+):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    saved = saved_best_values(monkeypatch, GeneticAlgorithm)
+    model_file = str(tmp_path / "model.FCStd")
+    GeneticAlgorithm(
+        "", model_file, population_size=6, generations=3, checkpoint_every=0,
+        backend=StubBackend(failure_rate=0.5, filename=model_file),
+    ).run()
+
+    results = pd.read_csv(tmp_path / "results" / "ga_results.csv")
+    failed = ~np.isfinite(results[STRESS])
+    assert failed.any() and not failed.all()
+    best = results[~failed].sort_values(STRESS).iloc[0]
+    assert saved == [[pytest.approx(best["Length [mm]"])]]
+
+
+def test_failed_cases_never_win_run_all(
+    standin_freecad, tmp_path, monkeypatch
+):
+    from FreecadParametricFEA.run_all import RunAllAnalysis
+
+    saved = saved_best_values(monkeypatch, RunAllAnalysis)
+    model_file = str(tmp_path / "model.FCStd")
+    backend = StubBackend(failure_rate=0.5, filename=model_file)
+    RunAllAnalysis("", model_file, backend=backend).run()
+
+    log = pd.read_json(
+        os.path.join(tmp_path, "results", "results.jsonl"), lines=True
+    )
+    succeeded = log["results"].str["Msg"] == ""
+    assert succeeded.any() and not succeeded.all()
+    stress = log["results"].str["max(vonMises)"]
+    assert saved == [log.loc[stress[succeeded].idxmin(), "parameters"]]
+
+
+def test_surrogate_ignores_failed_solves(standin_freecad):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    ga = GeneticAlgorithm(
+        "", "model.FCStd", surrogate=True, surrogate_fraction=0.5
+    )
+    population = [Individual([x]) for x in np.linspace(11, 29, 6)]
+    chosen = ga.select_for_fea(
+        population, results_with_failures(12), LENGTH, [10], [30]
+    )
+
+    predicted = [
+        ind.fitness.values[0]
+        for (idx, ind) in enumerate(population)
+        if idx not in chosen
+    ]
+    assert predicted and np.all(np.isfinite(predicted))
+
+
+def test_surrogate_waits_for_enough_successful_solves(standin_freecad):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    ga = GeneticAlgorithm("", "model.FCStd", surrogate=True)
+    population = [Individual([x]) for x in np.linspace(11, 29, 6)]
+
+    chosen = ga.select_for_fea(population, ResultStore(), LENGTH, [10], [30])
+    assert chosen == list(range(6))
+    # 8 results, but only 5 successful ones
+    chosen = ga.select_for_fea(
+        population, results_with_failures(8), LENGTH, [10], [30]
+    )
+    assert chosen == list(range(6))
+
+
+def test_bo_proposals_ignore_failed_solves():
+    from FreecadParametricFEA.surrogate import propose_batch
+
+    results = results_with_failures(12)
+    X = results.column("Length [mm]")[:, None]
+    batch = propose_batch(
+        X, results.column(STRESS), ([10], [30]), 3, np.random.default_rng(0)
+    )
+
+    assert batch.shape == (3, 1)
+    assert np.all(np.isfinite(batch))
+    # the stress grows with the length, so a surrogate that learnt from the
+    # solves looks low
+    assert batch.min() < 15
+
+
+def test_stopping_ignores_failed_solves(standin_freecad):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+    from FreecadParametricFEA.stopping import StoppingCriteria
+
+    ga = GeneticAlgorithm(
+        "",
+        "model.FCStd",
+        stopping=StoppingCriteria(stagnation_generations=1, target=100),
+    )
+    population = [Individual([x]) for x in (12.0, 20.0)]
+    results = results_with_failures(12)
+    assert ga.check_stopping(population, results, [10], [30]) is None
+
+    # an improvement is still one when a failure with no usable output comes
+    # with it
+    results.extend([
+        {"Length [mm]": 10.5, STRESS: 111.25},
+        {"Length [mm]": 10.2, STRESS: float("nan")},
+    ])
+    assert ga.check_stopping(population, results, [10], [30]) is None
+
+    rows = results.to_dataframe().to_dict("records")
+    records = [
+        {"rows": rows[:12], "population": [[12.0], [20.0]]},
+        {"rows": rows[12:], "population": [[12.0], [20.0]]},
+    ]
+    ga.stopping.start()
+    assert ga.replay_stopping(records, [10], [30]) is None
+
+
+def test_failed_cases_stay_off_the_pareto_front():
+    from FreecadParametricFEA.pareto import ParetoArchive
+
+    displacement = "max(DisplacementLengths)"
+    archive = ParetoArchive([STRESS, displacement])
+    n_added = archive.update([
+        {STRESS: 0.0, displacement: 0.0, "Msg": "FEA analysis failed."},
+        {STRESS: float("inf"), displacement: float("inf")},
+        {STRESS: 120.0, displacement: 0.3, "Msg": ""},
+        {STRESS: 150.0, displacement: 0.2},
+    ])
+
+    assert n_added == 2
+    assert archive.to_dataframe()[STRESS].tolist() == [120.0, 150.0]
+
+
+def test_predicted_offspring_are_not_kept_as_elites(standin_freecad):
+    from deap import base, tools
+
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    class FitnessMin(base.Fitness):
+        weights = (-1.0,)
+
+    class Ranked(list):
+        def __init__(self, values, fitness):
+            super().__init__(values)
+            self.fitness = FitnessMin((fitness,))
+
+    toolbox = base.Toolbox()
+    toolbox.register("select", tools.selBest)
+    ga = GeneticAlgorithm("", "model.FCStd", surrogate=True)
+    # the second and fourth offspring were screened out, with a better
+    # predicted stress than any solve
+    population = [
+        Ranked([12.0], 150.0),
+        Ranked([14.0], 50.0),
+        Ranked([16.0], 120.0),
+        Ranked([18.0], 10.0),
+    ]
+    selected = ga.select_next_generation(toolbox, [], population, [1, 3])
+
+    assert selected == [[16.0], [12.0], [18.0], [14.0]]
+    assert [ind.fitness.valid for ind in selected] == [
+        True, True, False, False
+    ]
+
+
+def test_multi_objective_run_without_solves(standin_freecad, tmp_path):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    model_file = str(tmp_path / "model.FCStd")
+    GeneticAlgorithm(
+        "", model_file, generations=0, multi_objective=True,
+        backend=StubBackend(filename=model_file),
+    ).run()
+
+    front = pd.read_csv(tmp_path / "results" / "ga_pareto_front.csv")
+    assert front.empty
+    assert list(front.columns) == ["max(DisplacementLengths)", STRESS]
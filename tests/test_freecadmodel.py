@@ -0,0 +1,33 @@
+import types
+
+from FreecadParametricFEA.freecadmodel import FreecadModel
+from FreecadParametricFEA.solver_backend import SolverBackend
+
+
+def model_with(objects):
+    # a FreecadModel with its parameter bookkeeping, but no document
+    model = FreecadModel.__new__(FreecadModel)
+    SolverBackend.__init__(model, "model.FCStd")
+    model._objects = objects
+    model._pending_load_scaling = []
+    model._applied_parameters = {}
+    return model
+
+
+def test_loads_are_scaled_without_a_remesh():
+    force = types.SimpleNamespace(Force=types.SimpleNamespace(Value=100.0))
+    model = model_with({"Force": force})
+    key = ("Force", "Force")
+
+    assert not model._set_parameters({key: 250.0}, {key})
+    assert model._pending_load_scaling == [("Force", 2.5)]
+
+
+def test_non_numeric_parameters_are_remeshed():
+    load = types.SimpleNamespace(Direction="Edge1", Reversed=None)
+    model = model_with({"Load": load})
+    changed = {("Load", "Direction"): "Edge2", ("Load", "Reversed"): True}
+
+    assert model._set_parameters(changed, set(changed))
+    assert model._pending_load_scaling == []
+    assert load.Direction == "Edge2"
@@ -0,0 +1,98 @@
+import os
+import time
+
+import pytest
+
+from FreecadParametricFEA.job_queue import (
+    FileJobQueue,
+    QueueEvaluatorPool,
+    start_local_workers,
+)
+from FreecadParametricFEA.output import Output
+from FreecadParametricFEA.solver_backend import StubBackend
+from FreecadParametricFEA.variable import Variable
+from FreecadParametricFEA.worker_pool import ModelEvaluator
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    # the workers check the model hash, so the stub needs a file to hash
+    filename = tmp_path / "model.FCStd"
+    filename.write_bytes(b"stub model")
+    return str(filename)
+
+
+def queue_pool(queue_dir, backend, lease_time=60.0):
+    return QueueEvaluatorPool(
+        queue_dir,
+        backend,
+        [Variable("Pad", "Length", [10, 30])],
+        [Output("vonMises", max)],
+        fea_results_name=backend.fea_results_name,
+        solver_name=backend.solver_name,
+        lease_time=lease_time,
+        poll_interval=0.02,
+    )
+
+
+def stop(queue_dir, workers):
+    FileJobQueue(queue_dir).stop_workers()
+    for worker in workers:
+        worker.join(timeout=10)
+
+
+def test_workers_solve_the_queued_cases(tmp_path, model_file):
+    queue_dir = str(tmp_path / "queue")
+    backend = StubBackend(filename=model_file)
+    with queue_pool(queue_dir, backend) as pool:
+        workers = start_local_workers(
+            queue_dir, backend, 2, poll_interval=0.02
+        )
+        try:
+            results = pool.map(ModelEvaluator.evaluate, [[10.0], [20.0]])
+        finally:
+            stop(queue_dir, workers)
+
+    assert [case["Msg"] for case in results] == ["", ""]
+    # the stub's stress field peaks at (1 + length**2) * 1.999
+    assert [case["max(vonMises)"] for case in results] == pytest.approx(
+        [101.0 * 1.999, 401.0 * 1.999]
+    )
+
+
+def test_job_of_a_dead_worker_is_solved_again(tmp_path, model_file):
+    queue_dir = str(tmp_path / "queue")
+    backend = StubBackend(filename=model_file)
+    with queue_pool(queue_dir, backend, lease_time=0.5) as pool:
+        pool.submit(ModelEvaluator.evaluate, [20.0], key="case")
+        # a worker that takes the job and dies without renewing its lease
+        assert FileJobQueue(queue_dir).lease() is not None
+        workers = start_local_workers(
+            queue_dir, backend, 1, poll_interval=0.02
+        )
+        try:
+            (key, results) = pool.next_completed()
+        finally:
+            stop(queue_dir, workers)
+
+    assert key == "case"
+    assert results["Msg"] == ""
+
+
+def test_leases_are_timed_with_the_coordinators_clock(tmp_path):
+    worker_side = FileJobQueue(str(tmp_path))
+    coordinator_side = FileJobQueue(str(tmp_path))
+    worker_side.put({"id": "job"})
+    worker_side.lease()
+    leased = os.path.join(str(tmp_path), "leased", "job.pkl")
+
+    # a worker whose clock is a day behind
+    day_ago = time.time() - 86400
+    os.utime(leased, (day_ago, day_ago))
+    assert coordinator_side.expired_leases(lease_time=0.2) == []
+    time.sleep(0.3)
+    assert coordinator_side.expired_leases(lease_time=0.2) == ["job"]
+
+    # renewed, still with the skewed clock
+    os.utime(leased, (day_ago + 1, day_ago + 1))
+    assert coordinator_side.expired_leases(lease_time=0.2) == []
@@ -0,0 +1,83 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        "steady_state",
+        "snap_to_steps",
+        "multi_objective",
+        "surrogate",
+        "job_queue",
+    ],
+)
+def test_bo_rejects_ga_options(standin_freecad, option):
+    from FreecadParametricFEA.bayesian_optimisation import (
+        BayesianOptimisation,
+    )
+
+    with pytest.raises(ValueError, match=option):
+        BayesianOptimisation("", "model.FCStd", **{option: True})
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"surrogate": True},
+        {"checkpoint_every": 5},
+        {"snap_to_steps": True},
+        {"multi_objective": True},
+    ],
+)
+def test_steady_state_rejects_generational_options(standin_freecad, options):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    with pytest.raises(ValueError):
+        GeneticAlgorithm("", "model.FCStd", steady_state=True, **options)
+
+
+def test_steady_state_runs_without_checkpoints(standin_freecad):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    ga = GeneticAlgorithm(
+        "", "model.FCStd", steady_state=True, checkpoint_every=0
+    )
+    assert ga.steady_state
+    assert GeneticAlgorithm("", "model.FCStd").checkpoint_every == 1
+
+
+@pytest.mark.parametrize("script", ["GeneticAlgorithm", "RunAllAnalysis"])
+def test_result_cache_is_not_bypassed_by_the_job_queue(
+    standin_freecad, tmp_path, script
+):
+    from FreecadParametricFEA import genetic_algorithm, run_all
+
+    module = genetic_algorithm if script == "GeneticAlgorithm" else run_all
+    with pytest.raises(ValueError, match="job_queue"):
+        getattr(module, script)(
+            "", "model.FCStd", cache_file=str(tmp_path / "cache.db"),
+            job_queue=str(tmp_path / "queue"),
+        )
+
+
+def test_steady_state_solves_each_design_once(standin_freecad, tmp_path):
+    import random
+
+    import pandas as pd
+
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+    from FreecadParametricFEA.solver_backend import StubBackend
+
+    random.seed(0)
+    model_file = str(tmp_path / "model.FCStd")
+    GeneticAlgorithm(
+        "", model_file, population_size=4, generations=10,
+        steady_state=True, checkpoint_every=0,
+        backend=StubBackend(filename=model_file),
+    ).run()
+
+    results = pd.read_csv(
+        tmp_path / "results" / "ga_results.csv", float_precision="round_trip"
+    )
+    assert len(results) == 40
+    assert not results["Length [mm]"].duplicated().any()
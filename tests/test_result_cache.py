@@ -0,0 +1,31 @@
+import numpy as np
+
+from FreecadParametricFEA.parametric import parametric
+from FreecadParametricFEA.result_cache import ResultCache
+from FreecadParametricFEA.solver_backend import StubBackend
+
+
+def run_cached_sweep(backend, cache):
+    fea = parametric()
+    fea.set_model(backend)
+    fea.setup_fea(backend.fea_results_name, backend.solver_name)
+    fea.set_result_cache(cache)
+    fea.set_variables([{
+        "object_name": "Pad",
+        "constraint_name": "Length",
+        "constraint_values": np.linspace(10, 30, 4),
+    }])
+    return fea.run_parametric(quiet_mode=True)
+
+
+def test_backend_without_a_model_file_is_cached(tmp_path):
+    # the stub's model file doesn't exist, the cache keys on its settings
+    cache = ResultCache(str(tmp_path / "cache.db"))
+    first = StubBackend(filename=str(tmp_path / "missing.FCStd"))
+    run_cached_sweep(first, cache)
+    again = StubBackend(filename=str(tmp_path / "missing.FCStd"))
+    run_cached_sweep(again, cache)
+    other_seed = StubBackend(seed=1, filename=str(tmp_path / "missing.FCStd"))
+    run_cached_sweep(other_seed, cache)
+
+    assert (first.n_solves, again.n_solves, other_seed.n_solves) == (4, 0, 4)
@@ -0,0 +1,73 @@
+import os
+import random
+
+import pandas as pd
+
+from FreecadParametricFEA.solver_backend import StubBackend
+
+
+def read_results(model_file, name):
+    return pd.read_csv(
+        os.path.join(os.path.dirname(model_file), "results", name)
+    )
+
+
+def run_ga(model_file, generations, resume=False):
+    from FreecadParametricFEA.genetic_algorithm import GeneticAlgorithm
+
+    random.seed(1)
+    GeneticAlgorithm(
+        "", model_file, population_size=4, generations=generations,
+        resume=resume, backend=StubBackend(filename=model_file),
+    ).run()
+    return read_results(model_file, "ga_results.csv")
+
+
+def test_resumed_ga_matches_an_uninterrupted_run(standin_freecad, tmp_path):
+    uninterrupted = run_ga(
+        str(tmp_path / "full" / "model.FCStd"), generations=4
+    )
+
+    model_file = str(tmp_path / "resumed" / "model.FCStd")
+    run_ga(model_file, generations=2)
+    resumed = run_ga(model_file, generations=4, resume=True)
+
+    pd.testing.assert_frame_equal(resumed, uninterrupted, check_exact=True)
+
+
+def test_resume_from_the_log_keeps_the_solved_generations(
+    standin_freecad, tmp_path
+):
+    model_file = str(tmp_path / "model.FCStd")
+    first_run = run_ga(model_file, generations=2)
+    os.remove(os.path.join(tmp_path, "results", "ga_checkpoint.pkl"))
+
+    resumed = run_ga(model_file, generations=3, resume=True)
+
+    pd.testing.assert_frame_equal(
+        resumed.iloc[: len(first_run)], first_run, check_exact=True
+    )
+    assert len(resumed) == 12
+
+
+def run_bo(model_file, n_evaluations, resume=False):
+    from FreecadParametricFEA.bayesian_optimisation import BayesianOptimisation
+
+    BayesianOptimisation(
+        "", model_file, n_evaluations=n_evaluations, n_initial=4,
+        batch_size=2, resume=resume, seed=0,
+        backend=StubBackend(filename=model_file),
+    ).run()
+    return read_results(model_file, "bo_results.csv")
+
+
+def test_resumed_bo_matches_an_uninterrupted_run(standin_freecad, tmp_path):
+    uninterrupted = run_bo(
+        str(tmp_path / "full" / "model.FCStd"), n_evaluations=10
+    )
+
+    model_file = str(tmp_path / "resumed" / "model.FCStd")
+    run_bo(model_file, n_evaluations=6)
+    resumed = run_bo(model_file, n_evaluations=10, resume=True)
+
+    pd.testing.assert_frame_equal(resumed, uninterrupted, check_exact=True)
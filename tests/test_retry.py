@@ -0,0 +1,130 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from FreecadParametricFEA.freecadmodel import _ccx_failure_cause
+from FreecadParametricFEA.parametric import parametric
+from FreecadParametricFEA.solver_backend import (
+    FILE_LOCK,
+    MESH_FAILURE,
+    MISSING_RESULTS,
+    PROCESS_CRASH,
+    SOLVER_DIVERGENCE,
+    SOLVER_ERROR,
+    ZERO_FIELD,
+    RetryPolicy,
+    SolverCancelledError,
+    SolverFailure,
+    StubBackend,
+)
+
+
+@pytest.mark.parametrize(
+    "output, returncode, cause",
+    [
+        (
+            "*ERROR in e_c3d: nonpositive jacobian determinant",
+            201,
+            MESH_FAILURE,
+        ),
+        (" *ERROR: too many cutbacks", 201, SOLVER_DIVERGENCE),
+        (
+            "*ERROR: increment size smaller than minimum",
+            201,
+            SOLVER_DIVERGENCE,
+        ),
+        ("*ERROR reading *STEP: card not recognised", 1, SOLVER_ERROR),
+        ("Permission denied: ccx.frd", 1, FILE_LOCK),
+        ("", 3, PROCESS_CRASH),
+        ("*ERROR: too many cutbacks", -9, PROCESS_CRASH),
+        ("", 0, MISSING_RESULTS),
+    ],
+)
+def test_ccx_failures_are_classified(output, returncode, cause):
+    assert _ccx_failure_cause(output, returncode) == cause
+
+
+def test_only_transient_failures_are_retried():
+    policy = RetryPolicy(max_retries=2)
+
+    assert policy.should_retry(SolverFailure(PROCESS_CRASH, ""), 0)
+    assert policy.should_retry(SolverFailure(FILE_LOCK, ""), 1)
+    assert not policy.should_retry(SolverFailure(FILE_LOCK, ""), 2)
+    for cause in (MESH_FAILURE, SOLVER_DIVERGENCE, SOLVER_ERROR, ZERO_FIELD):
+        assert not policy.should_retry(SolverFailure(cause, ""), 0)
+
+
+def test_backoff_grows_up_to_its_cap():
+    policy = RetryPolicy(backoff=1.0, backoff_factor=2.0, max_backoff=5.0)
+
+    assert [policy.delay(n) for n in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_perturbation_is_reproducible():
+    parameters = {("Pad", "Length"): 20.0}
+
+    assert RetryPolicy().perturb(parameters, 0) == parameters
+    policy = RetryPolicy(perturbation=1e-3)
+    perturbed = policy.perturb(parameters, 0)
+    assert perturbed == policy.perturb(parameters, 0)
+    assert perturbed != parameters
+    assert perturbed[("Pad", "Length")] == pytest.approx(20.0, rel=1e-3)
+
+
+def test_failure_cause_survives_pickling():
+    failure = pickle.loads(
+        pickle.dumps(SolverFailure(FILE_LOCK, "ccx.frd is locked"))
+    )
+
+    assert failure.cause == FILE_LOCK
+    assert failure.transient
+    assert str(failure) == "ccx.frd is locked"
+
+
+def run_sweep(backend, tmp_path):
+    fea = parametric()
+    fea.set_model(backend)
+    fea.setup_fea(
+        backend.fea_results_name,
+        backend.solver_name,
+        retry_policy=RetryPolicy(backoff=0.0),
+    )
+    fea.set_variables([{
+        "object_name": "Pad",
+        "constraint_name": "Length",
+        "constraint_values": np.linspace(10, 30, 8),
+    }])
+    return fea.run_parametric(
+        quiet_mode=True, results_file=str(tmp_path / "results.jsonl")
+    )
+
+
+def test_transient_failures_are_solved_again(tmp_path):
+    results = run_sweep(StubBackend(transient_failure_rate=0.5), tmp_path)
+
+    retried = results[(results["Msg"] == "") & (results["FEA_Retries"] > 0)]
+    assert len(retried) > 0
+    for (n_retries, failures) in zip(
+        retried["FEA_Retries"], retried["FEA_Failures"]
+    ):
+        assert failures.split(",") == [PROCESS_CRASH] * n_retries
+
+
+def test_deterministic_failures_fail_fast(tmp_path):
+    results = run_sweep(StubBackend(failure_rate=1.0), tmp_path)
+
+    assert (results["Msg"] != "").all()
+    assert (results["FEA_Retries"] == 0).all()
+    assert (results["FEA_Failures"] == ZERO_FIELD).all()
+
+
+def test_cancel_between_solves_stops_the_next_one():
+    backend = StubBackend()
+    backend.apply_parameters({("Pad", "Length"): 20.0})
+
+    backend.cancel()
+    with pytest.raises(SolverCancelledError):
+        backend.run_fea()
+    # the request is used up by the solve it stopped
+    assert backend.run_fea().getPropertyByName("vonMises")[0] == 401.0